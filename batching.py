@@ -0,0 +1,292 @@
+"""
+Moteur de génération par lots multi-séquences pour llama.cpp
+Décode plusieurs prompts simultanément dans un même contexte (un seq_id par conversation)
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+import numpy as np
+import llama_cpp
+from config import logger
+
+
+class BatchNotApplicable(ValueError):
+    """Le lot ne peut pas être généré ensemble (levée avant tout décodage)"""
+
+
+def _model_param(model, *names) -> Optional[int]:
+    """Lit un hyperparamètre du modèle via la première fonction llama.cpp disponible"""
+    for name in names:
+        fn = getattr(llama_cpp, name, None)
+        if fn is not None:
+            return int(fn(model))
+    return None
+
+
+def estimate_kv_cache_mb(llm, n_ctx: int) -> Optional[int]:
+    """
+    Estime la taille (Mo) du cache KV d'un contexte de n_ctx tokens (K et V en f16).
+    Retourne None si les hyperparamètres du modèle ne sont pas exposés par llama_cpp.
+    """
+    n_layer = _model_param(llm.model, 'llama_model_n_layer', 'llama_n_layer')
+    n_embd = _model_param(llm.model, 'llama_model_n_embd', 'llama_n_embd')
+    if not n_layer or not n_embd:
+        return None
+    n_head = _model_param(llm.model, 'llama_model_n_head', 'llama_n_head')
+    n_head_kv = _model_param(llm.model, 'llama_model_n_head_kv', 'llama_n_head_kv')
+    # Attention groupée : K et V n'ont que n_head_kv têtes
+    n_embd_kv = n_embd * n_head_kv // n_head if n_head and n_head_kv else n_embd
+    kv_bytes = 2 * n_layer * n_ctx * n_embd_kv * 2
+    return (kv_bytes + 1024 * 1024 - 1) // (1024 * 1024)
+
+
+@dataclass
+class BatchRequest:
+    """Une séquence à générer dans le lot"""
+    prompt: str
+    max_tokens: int = 400
+    temperature: float = 0.8
+    top_p: float = 0.95
+    stop: List[str] = field(default_factory=list)
+    on_token: Optional[Callable[[str], None]] = None
+    should_stop: Optional[Callable[[], bool]] = None
+
+
+class _SequenceState:
+    """État de génération d'une séquence"""
+
+    def __init__(self, seq_id: int, request: BatchRequest, prompt_tokens: List[int]):
+        self.seq_id = seq_id
+        self.request = request
+        self.prompt_tokens = prompt_tokens
+        self.n_past = 0
+        self.n_generated = 0
+        self.raw = b""
+        self.text = ""
+        self.emitted = 0
+        self.finished = False
+        self.pending_token: Optional[int] = None
+
+    def _stop_hold_back(self) -> int:
+        """Longueur du suffixe du texte pouvant encore devenir une séquence d'arrêt"""
+        hold = 0
+        for stop in self.request.stop:
+            for k in range(min(len(stop) - 1, len(self.text)), 0, -1):
+                if self.text.endswith(stop[:k]):
+                    hold = max(hold, k)
+                    break
+        return hold
+
+    def append(self, piece: bytes):
+        """Ajoute un token décodé, détecte les séquences d'arrêt et émet le texte sûr"""
+        self.raw += piece
+        self.text = self.raw.decode("utf-8", errors="ignore")
+
+        cut = -1
+        for stop in self.request.stop:
+            idx = self.text.find(stop)
+            if idx != -1 and (cut == -1 or idx < cut):
+                cut = idx
+        if cut != -1:
+            self.text = self.text[:cut]
+            self.finished = True
+            self._emit(len(self.text))
+        else:
+            self._emit(len(self.text) - self._stop_hold_back())
+
+    def finish(self):
+        self.finished = True
+        self._emit(len(self.text))
+
+    def _emit(self, upto: int):
+        if upto > self.emitted:
+            if self.request.on_token is not None:
+                self.request.on_token(self.text[self.emitted:upto])
+            self.emitted = upto
+
+
+class BatchedGenerator:
+    """Génère plusieurs séquences en parallèle avec llama_decode et un seq_id par requête"""
+
+    def __init__(self, llm, n_ctx: int, n_batch: int, n_seq_max: int, seed: Optional[int] = None):
+        self.llm = llm
+        self.n_batch = n_batch
+        self.n_seq_max = n_seq_max
+        self.n_vocab = llm.n_vocab()
+        self.eos_token = llm.token_eos()
+        self._rng = np.random.default_rng(seed)
+
+        # Contexte dédié partageant les poids du modèle déjà chargé
+        cparams = type(llm.context_params).from_buffer_copy(llm.context_params)
+        cparams.n_ctx = n_ctx
+        cparams.n_batch = n_batch
+        if hasattr(cparams, 'n_ubatch'):
+            cparams.n_ubatch = min(int(cparams.n_ubatch) or n_batch, n_batch)
+        if hasattr(cparams, 'n_seq_max'):
+            cparams.n_seq_max = n_seq_max
+        # Cache KV partagé entre séquences quand l'option existe : une conversation longue
+        # peut alors utiliser la place laissée par les autres
+        if hasattr(cparams, 'kv_unified'):
+            cparams.kv_unified = True
+
+        new_context = getattr(llama_cpp, 'llama_init_from_model', None) or llama_cpp.llama_new_context_with_model
+        self.ctx = new_context(llm.model, cparams)
+        if not self.ctx:
+            raise RuntimeError("Impossible de créer le contexte de génération par lots")
+
+        # llama.cpp peut arrondir n_ctx : les limites du lot suivent la taille réellement allouée
+        self.n_ctx = int(llama_cpp.llama_n_ctx(self.ctx))
+        n_ctx_seq = getattr(llama_cpp, 'llama_n_ctx_seq', None)
+        if n_ctx_seq is not None:
+            self.n_ctx_seq = int(n_ctx_seq(self.ctx))
+        elif hasattr(cparams, 'kv_unified') and not cparams.kv_unified:
+            self.n_ctx_seq = self.n_ctx // n_seq_max
+        else:
+            self.n_ctx_seq = self.n_ctx
+
+        self.batch = llama_cpp.llama_batch_init(n_batch, 0, n_seq_max)
+        logger.info(f"Moteur de génération par lots prêt (n_ctx={self.n_ctx}, par séquence={self.n_ctx_seq}, "
+                    f"n_batch={n_batch}, séquences max={n_seq_max})")
+
+    def close(self):
+        """Libère le contexte et le batch"""
+        if getattr(self, 'batch', None) is not None:
+            llama_cpp.llama_batch_free(self.batch)
+            self.batch = None
+        if getattr(self, 'ctx', None):
+            llama_cpp.llama_free(self.ctx)
+            self.ctx = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def _clear_kv(self):
+        for name in ('llama_kv_self_clear', 'llama_kv_cache_clear'):
+            fn = getattr(llama_cpp, name, None)
+            if fn is not None:
+                fn(self.ctx)
+                return
+        memory = llama_cpp.llama_get_memory(self.ctx)
+        llama_cpp.llama_memory_clear(memory, True)
+
+    def _sample(self, index: int, request: BatchRequest) -> int:
+        """Échantillonne le prochain token (température + top-p) à partir des logits du batch"""
+        logits_ptr = llama_cpp.llama_get_logits_ith(self.ctx, index)
+        logits = np.ctypeslib.as_array(logits_ptr, shape=(self.n_vocab,)).astype(np.float64)
+
+        if request.temperature <= 0:
+            return int(np.argmax(logits))
+
+        logits /= request.temperature
+        logits -= logits.max()
+        probs = np.exp(logits)
+        probs /= probs.sum()
+
+        if request.top_p < 1.0:
+            order = np.argsort(-probs)
+            cumulative = np.cumsum(probs[order])
+            keep = order[:int(np.searchsorted(cumulative, request.top_p)) + 1]
+            kept = probs[keep] / probs[keep].sum()
+            return int(self._rng.choice(keep, p=kept))
+        return int(self._rng.choice(self.n_vocab, p=probs))
+
+    def _decode(self, entries):
+        """Décode une liste (token, pos, seq_id, logits) et retourne {seq_id: index des logits}"""
+        batch = self.batch
+        logit_index: Dict[int, int] = {}
+        for i, (token, pos, seq_id, want_logits) in enumerate(entries):
+            batch.token[i] = token
+            batch.pos[i] = pos
+            batch.n_seq_id[i] = 1
+            batch.seq_id[i][0] = seq_id
+            batch.logits[i] = want_logits
+            if want_logits:
+                logit_index[seq_id] = i
+        batch.n_tokens = len(entries)
+
+        ret = llama_cpp.llama_decode(self.ctx, batch)
+        if ret != 0:
+            raise RuntimeError(f"llama_decode a échoué (code {ret})")
+        return logit_index
+
+    def _consume(self, seq: _SequenceState, token: int):
+        """Traite un token échantillonné pour une séquence"""
+        seq.n_generated += 1
+        if token == self.eos_token:
+            seq.finish()
+            return
+        seq.append(self.llm.detokenize([token]))
+        if seq.finished:
+            return
+        if seq.n_generated >= seq.request.max_tokens:
+            seq.finish()
+            return
+        if seq.request.should_stop is not None and seq.request.should_stop():
+            logger.warning(f"Séquence {seq.seq_id} interrompue (échéance ou annulation)")
+            seq.finish()
+            return
+        seq.pending_token = token
+
+    def generate(self, requests: List[BatchRequest]) -> List[str]:
+        """Génère toutes les requêtes du lot et retourne les textes dans le même ordre"""
+        if len(requests) > self.n_seq_max:
+            raise BatchNotApplicable(f"Trop de séquences pour le lot ({len(requests)} > {self.n_seq_max})")
+
+        sequences = []
+        total_tokens = 0
+        for seq_id, request in enumerate(requests):
+            tokens = list(self.llm.tokenize(request.prompt.encode("utf-8"), special=True))
+            seq_tokens = len(tokens) + request.max_tokens
+            # Chaque séquence est aussi bornée individuellement (positions et part du cache KV)
+            if seq_tokens > self.n_ctx_seq:
+                raise BatchNotApplicable(
+                    f"Séquence {seq_id} trop longue pour le lot ({seq_tokens} > {self.n_ctx_seq} tokens)")
+            total_tokens += seq_tokens
+            sequences.append(_SequenceState(seq_id, request, tokens))
+
+        # Le cache KV est partagé entre toutes les séquences du contexte
+        if total_tokens > self.n_ctx:
+            raise BatchNotApplicable(f"Lot trop long pour le contexte ({total_tokens} > {self.n_ctx} tokens)")
+
+        self._clear_kv()
+
+        # Pré-remplissage des prompts par tranches de n_batch tokens
+        entries = []
+        owners = []
+        for seq in sequences:
+            for pos, token in enumerate(seq.prompt_tokens):
+                is_last = pos == len(seq.prompt_tokens) - 1
+                entries.append((token, pos, seq.seq_id, is_last))
+                owners.append(seq)
+                if len(entries) == self.n_batch:
+                    self._prefill(entries, owners)
+                    entries, owners = [], []
+        if entries:
+            self._prefill(entries, owners)
+
+        # Décodage : un token par séquence active à chaque appel
+        while True:
+            active = [seq for seq in sequences if not seq.finished and seq.pending_token is not None]
+            if not active:
+                break
+            entries = []
+            for seq in active:
+                entries.append((seq.pending_token, seq.n_past, seq.seq_id, True))
+                seq.n_past += 1
+                seq.pending_token = None
+            logit_index = self._decode(entries)
+            for seq in active:
+                self._consume(seq, self._sample(logit_index[seq.seq_id], seq.request))
+
+        return [seq.text for seq in sequences]
+
+    def _prefill(self, entries, owners):
+        logit_index = self._decode(entries)
+        counts = Counter(seq.seq_id for seq in owners)
+        for seq in {seq.seq_id: seq for seq in owners}.values():
+            seq.n_past += counts[seq.seq_id]
+            if seq.seq_id in logit_index:
+                self._consume(seq, self._sample(logit_index[seq.seq_id], seq.request))
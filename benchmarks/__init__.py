@@ -0,0 +1,3 @@
+"""
+Benchmarks hors ligne du bot Kira (sans Discord ni vrai modèle)
+"""
@@ -0,0 +1,169 @@
+"""
+Benchmark hors ligne de generate_reply
+Base SQLite synthétique + faux backend Llama, mesure latence (p50/p95/p99) et débit
+selon le niveau de concurrence.
+
+Usage :
+    python -m benchmarks.bench_generate_reply --users 50 --messages 200 --concurrency 1,2,4,8
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark hors ligne de generate_reply")
+    parser.add_argument("--users", type=int, default=20, help="Nombre d'utilisateurs synthétiques")
+    parser.add_argument("--messages", type=int, default=100, help="Messages d'historique par utilisateur")
+    parser.add_argument("--requests", type=int, default=64, help="Requêtes par niveau de concurrence")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Niveaux de concurrence (séparés par des virgules)")
+    parser.add_argument("--context-limit", type=int, default=10, help="Échanges d'historique demandés par prompt")
+    parser.add_argument("--n-ctx", type=int, default=4096, help="Taille de contexte simulée")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0, help="Vitesse de génération simulée")
+    parser.add_argument("--prompt-eval-ms", type=float, default=0.2, help="Coût simulé par token de prompt (ms)")
+    parser.add_argument("--reply-tokens", type=int, default=40, help="Longueur des réponses simulées (tokens)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", dest="json_path", help="Écrit les résultats dans ce fichier JSON")
+    return parser.parse_args()
+
+
+def _prepare_environment(tmp_dir: str):
+    """Isole le benchmark : bases et logs temporaires, pas de chargement du vrai modèle"""
+    model_path = os.path.join(tmp_dir, "fake-model.gguf")
+    open(model_path, "wb").close()
+
+    os.environ["DB_PATH"] = os.path.join(tmp_dir, "neuro.db")
+    os.environ["DATA_DIR"] = tmp_dir
+    os.environ["MODEL_PATH"] = model_path
+    # Ni logs.db ni fichiers de log du dépôt : journalisation avancée coupée, le reste dans tmp_dir
+    os.environ["LOG_DIR"] = tmp_dir
+    os.environ["LOG_DB_PATH"] = os.path.join(tmp_dir, "logs.db")
+    os.environ["ADVANCED_LOGGING"] = "false"
+    os.environ["MODEL_AUTOLOAD"] = "false"
+    os.environ["STREAM_REPLIES"] = "false"
+    os.environ["BATCH_DECODING"] = "false"
+    os.environ["INFERENCE_MAX_QUEUE"] = "100000"
+    os.environ.setdefault("DISCORD_TOKEN", "benchmark")
+    os.environ.setdefault("AUTH_SECRET", "benchmark")
+
+    # Les logs INFO par requête fausseraient les mesures
+    logging.getLogger("kira_bot").setLevel(logging.WARNING)
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+async def _run_level(model, user_ids, concurrency: int, n_requests: int, context_limit: int, rng):
+    """Lance n_requests appels à generate_reply avec au plus `concurrency` en vol"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        user_id = rng.choice(user_ids)
+        async with semaphore:
+            start = time.perf_counter()
+            reply = await model.generate_reply(user_id, f"Question de benchmark numéro {i} ?", context_limit)
+            latencies.append(time.perf_counter() - start)
+            if reply.startswith("❌") or reply in (model.BUSY_MESSAGE, model.TIMEOUT_MESSAGE):
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n_requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "throughput_rps": n_requests / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    args = parse_args()
+    tmp_dir = tempfile.mkdtemp(prefix="kira-bench-")
+    _prepare_environment(tmp_dir)
+
+    from config import config, advanced_log_manager
+    if os.path.abspath(config.DB_PATH) != os.path.abspath(os.environ["DB_PATH"]):
+        # Un .env peut écraser DB_PATH : on refuse d'écrire dans la vraie base
+        print(f"❌ DB_PATH pointe vers {config.DB_PATH} (fichier .env ?) - benchmark annulé")
+        return 1
+    if advanced_log_manager is not None and not advanced_log_manager.db_path.startswith(tmp_dir):
+        # Même garde pour les logs avancés réactivés par un .env
+        print(f"❌ LOG_DB_PATH pointe vers {advanced_log_manager.db_path} (fichier .env ?) - benchmark annulé")
+        return 1
+
+    import database  # noqa: F401 - crée le schéma dans la base temporaire
+    import model
+    from benchmarks.fake_llama import FakeLlama
+    from benchmarks.synthetic_db import populate
+
+    build_start = time.perf_counter()
+    user_ids = populate(config.DB_PATH, args.users, args.messages, seed=args.seed)
+    print(f"Base synthétique : {args.users} utilisateurs x {args.messages} messages "
+          f"({time.perf_counter() - build_start:.1f}s) -> {config.DB_PATH}")
+
+    fake = FakeLlama(
+        n_ctx=args.n_ctx,
+        tokens_per_sec=args.tokens_per_sec,
+        prompt_eval_ms_per_token=args.prompt_eval_ms,
+        reply_tokens=args.reply_tokens,
+    )
+    model.model_manager._install_llm(fake, 'cpu_fallback', {
+        'system_info': 'benchmark',
+        'cuda': False,
+        'llm_config_used': {'n_ctx': args.n_ctx},
+        'module_path': None,
+    })
+
+    rng = random.Random(args.seed)
+    levels = [int(x) for x in args.concurrency.split(",") if x.strip()]
+    results = []
+
+    print(f"{'conc.':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'erreurs':>8}")
+    for concurrency in levels:
+        result = asyncio.run(_run_level(model, user_ids, concurrency, args.requests, args.context_limit, rng))
+        results.append(result)
+        print(f"{result['concurrency']:>5} {result['throughput_rps']:>8.2f} {result['p50_ms']:>9.1f} "
+              f"{result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['errors']:>8}")
+
+    cache_stats = model.model_manager.get_prompt_cache_stats()
+    reuse = fake.prompt_tokens_total - fake.prompt_tokens_evaluated
+    print(f"Cache de prompt : {cache_stats.get('reuse_percent', 0):.1f}% de tokens réutilisés "
+          f"({reuse}/{fake.prompt_tokens_total} tokens évités côté backend)")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "args": vars(args),
+                "results": results,
+                "prompt_cache": cache_stats,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"Résultats écrits dans {args.json_path}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
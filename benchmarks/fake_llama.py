@@ -0,0 +1,131 @@
+"""
+Faux backend Llama déterministe pour les benchmarks hors ligne
+Simule le coût d'évaluation du prompt (avec réutilisation du préfixe KV) et la vitesse de génération
+"""
+import threading
+import time
+from typing import List, Optional
+
+# Texte généré en boucle (la réponse s'arrête après reply_tokens tokens)
+_REPLY_TEXT = (
+    "Ha, excellente question ! Franchement je pense que tu devrais essayer, "
+    "mais raconte-moi d'abord comment s'est passée ta journée ? "
+)
+
+_CHUNK_BYTES = 4
+
+
+class _TokenArray(list):
+    """Liste de tokens exposant tolist() comme le tableau NumPy de llama_cpp"""
+
+    def tolist(self):
+        return list(self)
+
+
+class _FakeState:
+    """État KV sauvegardé (copie des tokens évalués)"""
+
+    def __init__(self, tokens: List[int]):
+        self.tokens = list(tokens)
+        self.llama_state_size = len(tokens) * 1024
+
+
+class FakeLlama:
+    """Imite l'API de llama_cpp.Llama utilisée par ModelManager"""
+
+    def __init__(self, n_ctx: int = 4096, tokens_per_sec: float = 30.0,
+                 prompt_eval_ms_per_token: float = 0.5, reply_tokens: int = 40):
+        self._n_ctx = n_ctx
+        self.tokens_per_sec = tokens_per_sec
+        self.prompt_eval_ms_per_token = prompt_eval_ms_per_token
+        self.reply_tokens = reply_tokens
+        self._tokens: List[int] = []
+        self._lock = threading.Lock()
+        self.prompt_tokens_evaluated = 0
+        self.prompt_tokens_total = 0
+
+    # --- Tokenizer (blocs de 4 octets, réversible et sans état) ---
+
+    def tokenize(self, text: bytes, add_bos: bool = True, special: bool = False) -> List[int]:
+        tokens = [1] if add_bos else []
+        for i in range(0, len(text), _CHUNK_BYTES):
+            chunk = text[i:i + _CHUNK_BYTES]
+            tokens.append((len(chunk) << 32) | int.from_bytes(chunk, "big"))
+        return tokens
+
+    def detokenize(self, tokens: List[int]) -> bytes:
+        out = b""
+        for token in tokens:
+            length = token >> 32
+            if length:
+                out += (token & 0xFFFFFFFF).to_bytes(length, "big")
+        return out
+
+    def n_ctx(self) -> int:
+        return self._n_ctx
+
+    # --- Contexte KV ---
+
+    @property
+    def _input_ids(self):
+        return _TokenArray(self._tokens)
+
+    def reset(self):
+        self._tokens = []
+
+    def eval(self, tokens: List[int]):
+        self._simulate_prompt_eval(len(tokens))
+        self._tokens.extend(tokens)
+
+    def save_state(self):
+        return _FakeState(self._tokens)
+
+    def load_state(self, state: _FakeState):
+        self._tokens = list(state.tokens)
+
+    def _simulate_prompt_eval(self, n_tokens: int):
+        if n_tokens > 0 and self.prompt_eval_ms_per_token > 0:
+            time.sleep(n_tokens * self.prompt_eval_ms_per_token / 1000.0)
+
+    # --- Génération ---
+
+    def _prepare_prompt(self, prompt: str) -> int:
+        """Évalue seulement la partie du prompt absente du cache KV (comme llama.cpp)"""
+        tokens = self.tokenize(prompt.encode("utf-8"), special=True)
+        reused = 0
+        for a, b in zip(self._tokens, tokens):
+            if a != b:
+                break
+            reused += 1
+        reused = min(reused, len(tokens) - 1)
+        if len(tokens) >= self._n_ctx:
+            raise ValueError(f"Requested tokens ({len(tokens)}) exceed context window of {self._n_ctx}")
+        self._simulate_prompt_eval(len(tokens) - reused)
+        self.prompt_tokens_total += len(tokens)
+        self.prompt_tokens_evaluated += len(tokens) - reused
+        self._tokens = tokens
+        return len(tokens)
+
+    def _generate_pieces(self, max_tokens: int):
+        reply = self.tokenize(_REPLY_TEXT.encode("utf-8"), add_bos=False)
+        n = min(self.reply_tokens, max_tokens)
+        delay = 1.0 / self.tokens_per_sec if self.tokens_per_sec > 0 else 0.0
+        for i in range(n):
+            token = reply[i % len(reply)]
+            if delay:
+                time.sleep(delay)
+            self._tokens.append(token)
+            yield self.detokenize([token]).decode("utf-8", errors="ignore")
+
+    def __call__(self, prompt: str, max_tokens: int = 16, stream: bool = False,
+                 stop: Optional[List[str]] = None, **kwargs):
+        with self._lock:
+            self._prepare_prompt(prompt)
+            if stream:
+                return self._stream(max_tokens)
+            text = "".join(self._generate_pieces(max_tokens))
+            return {"choices": [{"text": text, "finish_reason": "length"}]}
+
+    def _stream(self, max_tokens: int):
+        for piece in self._generate_pieces(max_tokens):
+            yield {"choices": [{"text": piece, "finish_reason": None}]}
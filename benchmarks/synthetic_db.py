@@ -0,0 +1,59 @@
+"""
+Génération d'une base neuro.db synthétique pour les benchmarks
+"""
+import random
+import sqlite3
+
+_USER_MESSAGES = [
+    "Salut Kira, tu vas bien ?",
+    "Tu peux m'expliquer comment marche la photosynthèse ?",
+    "J'ai eu une journée compliquée au travail aujourd'hui.",
+    "Quel film tu me conseilles pour ce soir ?",
+    "Tu te souviens de ce que je t'ai dit hier ?",
+    "Raconte-moi une blague sur les développeurs.",
+]
+
+_BOT_RESPONSES = [
+    "Toujours en forme, et toi ? Raconte-moi tout !",
+    "Les plantes transforment la lumière en sucre, un peu comme toi avec le café.",
+    "Oh non ! Tu veux en parler ou je te change les idées ?",
+    "Un bon vieux film de science-fiction, ça ne rate jamais.",
+    "Évidemment, ma mémoire est plus fiable que celle d'un poisson rouge !",
+    "Pourquoi les devs confondent Halloween et Noël ? Parce que OCT 31 = DEC 25.",
+]
+
+_FACTS = [
+    "aime les chats",
+    "travaille comme développeur",
+    "habite à Lyon",
+    "joue de la guitare",
+    "préfère le thé au café",
+]
+
+
+def populate(db_path: str, users: int, messages: int, facts_per_user: int = 3, seed: int = 42) -> list:
+    """Remplit les tables memory et facts (créées au préalable) et retourne les user_id"""
+    rng = random.Random(seed)
+    user_ids = [str(100000000000000000 + i) for i in range(users)]
+
+    memory_rows = []
+    fact_rows = []
+    for user_id in user_ids:
+        for i in range(messages):
+            k = rng.randrange(len(_USER_MESSAGES))
+            memory_rows.append((user_id, f"{_USER_MESSAGES[k]} ({i})", _BOT_RESPONSES[k]))
+        for fact in rng.sample(_FACTS, min(facts_per_user, len(_FACTS))):
+            fact_rows.append((user_id, fact))
+
+    # Messages entrelacés entre utilisateurs comme en production
+    rng.shuffle(memory_rows)
+
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO memory (user_id, user_input, bot_response) VALUES (?, ?, ?)",
+            memory_rows
+        )
+        conn.executemany("INSERT INTO facts (user_id, fact) VALUES (?, ?)", fact_rows)
+        conn.commit()
+
+    return user_ids
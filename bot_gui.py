@@ -3,12 +3,11 @@ import time
 import threading
 import asyncio
 import sqlite3
-import psutil
 import traceback
-import pynvml
 import json
 
 from bot import start_bot, stop_bot  # Utilise les vraies fonctions du bot
+from telemetry import telemetry
 
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QPushButton, QTextEdit)
@@ -74,14 +73,14 @@ class DiscordBotThread(threading.Thread):
 
 def get_stats(bot_start_time, web_enabled=True):
     try:
-        # CPU, RAM, disque
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        ram = psutil.virtual_memory()
-        ram_used = ram.used / (1024**3)
-        ram_total = ram.total / (1024**3)
-        ram_percent = ram.percent
-
-        boot_time = psutil.boot_time()
+        # CPU, RAM, disque : dernier instantané de la télémétrie partagée avec le bot
+        snapshot = telemetry.latest()
+        cpu_percent = snapshot.cpu_percent or 0.0
+        ram_used = snapshot.ram_used_gb or 0.0
+        ram_total = snapshot.ram_total_gb or 0.0
+        ram_percent = snapshot.ram_percent or 0.0
+
+        boot_time = snapshot.boot_time or time.time()
         uptime_sec = int(time.time() - boot_time)
         days = uptime_sec // 86400
         hours = (uptime_sec % 86400) // 3600
@@ -98,26 +97,23 @@ def get_stats(bot_start_time, web_enabled=True):
         else:
             uptime_bot_str = "N/A"
 
-        disk = psutil.disk_usage('D:')
-        disk_used = disk.used / (1024**3)
-        disk_total = disk.total / (1024**3)
-        disk_percent = disk.percent
-
-        # GPU stats avec pynvml
-        pynvml.nvmlInit()
-        handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-        gpu_name = pynvml.nvmlDeviceGetName(handle)
-        if isinstance(gpu_name, bytes):
-            gpu_name = gpu_name.decode()
-        util = pynvml.nvmlDeviceGetUtilizationRates(handle)
-        mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-        temp = pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
-        pynvml.nvmlShutdown()
-
-        gpu_util = util.gpu
-        vram_used = mem_info.used / (1024**2)
-        vram_total = mem_info.total / (1024**2)
-        vram_percent = (mem_info.used / mem_info.total) * 100
+        # Disque de la base de données
+        disk_used = snapshot.disk_used_gb or 0.0
+        disk_total = snapshot.disk_total_gb or 0.0
+        disk_percent = snapshot.disk_percent or 0.0
+
+        gpu = snapshot.gpu
+        if gpu:
+            gpu_name = gpu.name
+            gpu_util = gpu.utilization_gpu
+            temp = gpu.temperature_c
+            vram_used = gpu.vram_used_mb
+            vram_total = gpu.vram_total_mb
+            vram_percent = gpu.vram_usage_percent
+        else:
+            gpu_name = "Non disponible"
+            gpu_util = temp = 0
+            vram_used = vram_total = vram_percent = 0.0
 
         # Base SQLite (exemple, adapte à ta vraie table memory)
         try:
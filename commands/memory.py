@@ -1,6 +1,7 @@
 from memory import save_fact, get_facts, clear_all_memory, clear_facts, clear_memory
 from auth_decorators import require_role_and_2fa, require_authorized_role
 from config import config, logger
+import asyncio
 
 def setup(bot):
     @bot.command()
@@ -13,12 +14,13 @@ def setup(bot):
 
         try:
             if target.lower() == "all":
-                deleted_count = clear_all_memory()
+                # Attend le thread écrivain (éventuellement derrière un lot d'archivage) hors de la boucle
+                deleted_count = await asyncio.to_thread(clear_all_memory)
                 await ctx.send(f"🧠 Toute la mémoire a été supprimée ({deleted_count} entrées).")
                 logger.info(f"Mémoire complète réinitialisée par {ctx.author.id}")
             elif ctx.message.mentions:
                 user_id = str(ctx.message.mentions[0].id)
-                deleted_count = clear_memory(user_id)
+                deleted_count = await asyncio.to_thread(clear_memory, user_id)
                 await ctx.send(f"🧠 Mémoire de <@{user_id}> supprimée ({deleted_count} entrées).")
                 logger.info(f"Mémoire de {user_id} réinitialisée par {ctx.author.id}")
             else:
@@ -1,7 +1,8 @@
 from auth_decorators import require_authorized_role
 from model import model_manager, LLM_PROFILES
-import pynvml
+from telemetry import telemetry
 import os
+import asyncio
 
 def setup(bot):
     @bot.command()
@@ -76,20 +77,20 @@ def setup(bot):
 async def analyze_vram(ctx):
     """Analyse l'utilisation VRAM actuelle"""
     try:
-        # Récupérer les informations du modèle
+        # Profil du modèle et dernier instantané de télémétrie (aucun appel NVML ici)
         current_profile = model_manager.get_current_profile()
         recommended_profile_key = model_manager.get_recommended_profile()
+        gpu_info = telemetry.latest().gpu
         
-        if not current_profile or not current_profile['gpu_info']:
+        if not current_profile or not gpu_info:
             await ctx.send("❌ Informations GPU non disponibles")
             return
         
-        gpu_info = current_profile['gpu_info']
-        gpu_name = gpu_info['name']
-        vram_used = gpu_info['vram_used_mb']
-        vram_total = gpu_info['vram_total_mb']
-        vram_free = gpu_info['vram_free_mb']
-        vram_percent = gpu_info['vram_usage_percent']
+        gpu_name = gpu_info.name
+        vram_used = gpu_info.vram_used_mb
+        vram_total = gpu_info.vram_total_mb
+        vram_free = gpu_info.vram_free_mb
+        vram_percent = gpu_info.vram_usage_percent
         
         # Analyse du statut
         if vram_percent > 90:
@@ -149,8 +150,9 @@ async def apply_optimization(ctx):
         current_profile_name = LLM_PROFILES[current_profile_key]['name']
         recommended_profile_name = LLM_PROFILES[recommended_profile_key]['name']
         
-        # Appliquer le changement de profil
-        success = model_manager.change_profile(recommended_profile_key)
+        # Appliquer le changement de profil (chargement hors de l'event loop, sans interruption)
+        await ctx.send(f"🔄 Chargement du profil {recommended_profile_name}...")
+        success = await asyncio.to_thread(model_manager.change_profile, recommended_profile_key)
         
         if success:
             msg = (
@@ -228,7 +230,7 @@ async def show_current_profile(ctx):
             return
         
         profile = current_profile['config']
-        gpu_info = current_profile['gpu_info']
+        gpu_info = telemetry.latest().gpu
         
         msg = (
             "```\n"
@@ -247,9 +249,9 @@ async def show_current_profile(ctx):
         
         if gpu_info:
             msg += (
-                f"\n🖥️ GPU: {gpu_info['name']}\n"
-                f"🧮 VRAM: {gpu_info['vram_used_mb']} MB / {gpu_info['vram_total_mb']} MB\n"
-                f"💾 VRAM libre: {gpu_info['vram_free_mb']} MB\n"
+                f"\n🖥️ GPU: {gpu_info.name}\n"
+                f"🧮 VRAM: {gpu_info.vram_used_mb} MB / {gpu_info.vram_total_mb} MB\n"
+                f"💾 VRAM libre: {gpu_info.vram_free_mb} MB\n"
             )
         
         msg += "```"
@@ -299,8 +301,9 @@ async def set_profile(ctx, profile_name):
             await ctx.send(f"✅ Le profil `{LLM_PROFILES[profile_key]['name']}` est déjà actif")
             return
         
-        # Changer le profil
-        success = model_manager.change_profile(profile_key)
+        # Changer le profil (chargement hors de l'event loop, sans interruption)
+        await ctx.send(f"🔄 Chargement du profil {LLM_PROFILES[profile_key]['name']}...")
+        success = await asyncio.to_thread(model_manager.change_profile, profile_key)
         
         if success:
             new_profile = LLM_PROFILES[profile_key]
@@ -521,7 +524,7 @@ async def optimize_for_task(ctx, task_type):
         
         await ctx.send(f"🔧 Optimisation pour tâche: **{task_descriptions[task_type]}**")
         
-        success = model_manager.optimize_for_task(task_type)
+        success = await asyncio.to_thread(model_manager.optimize_for_task, task_type)
         
         if success:
             current_profile = model_manager.get_current_profile()
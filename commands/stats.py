@@ -1,23 +1,27 @@
 from discord.ext.commands import has_role
 from config import AUTHORIZED_ROLE
-import psutil
 import time
-import sqlite3
-from gpu_utils import get_gpu_info, is_gpu_available
-from model import model_manager
+from model import model_manager, inference_scheduler
+from memory import history_cache
+from stats_service import stats_service
+from telemetry import telemetry
 
 def setup(bot):
     @bot.command()
     @has_role(AUTHORIZED_ROLE)
     async def stats(ctx):
         try:
-            cpu_percent = psutil.cpu_percent(interval=1)
-            ram = psutil.virtual_memory()
-            ram_used = round(ram.used / (1024**3), 2)
-            ram_total = round(ram.total / (1024**3), 2)
-            ram_percent = ram.percent
+            # Valeurs échantillonnées en arrière-plan (service démarré par on_ready) :
+            # aucune attente ni requête SQL ici
+            system = telemetry.latest()
+            counters = stats_service.get_counters()
 
-            boot_time = psutil.boot_time()
+            cpu_percent = system.cpu_percent or 0.0
+            ram_used = round(system.ram_used_gb or 0.0, 2)
+            ram_total = round(system.ram_total_gb or 0.0, 2)
+            ram_percent = system.ram_percent or 0.0
+
+            boot_time = system.boot_time or time.time()
             uptime_sec = int(time.time() - boot_time)
             days = uptime_sec // 86400
             hours = (uptime_sec % 86400) // 3600
@@ -30,13 +34,12 @@ def setup(bot):
             bot_minutes = (uptime_bot % 3600) // 60
             bot_uptime_str = f"{bot_days}j {bot_hours}h {bot_minutes}m"
 
-            disk = psutil.disk_usage('D:')
-            disk_used = round(disk.used / (1024**3), 2)
-            disk_total = round(disk.total / (1024**3), 2)
-            disk_percent = disk.percent
+            disk_used = round(system.disk_used_gb or 0.0, 2)
+            disk_total = round(system.disk_total_gb or 0.0, 2)
+            disk_percent = system.disk_percent or 0.0
 
             # GPU Info
-            gpu_info = get_gpu_info()
+            gpu_info = system.gpu
             if gpu_info:
                 gpu_name = gpu_info.name
                 gpu_util = gpu_info.utilization_gpu
@@ -53,7 +56,17 @@ def setup(bot):
                 temp = 0
 
             # Informations sur le modèle LLM
-            llm_status = "✅ Initialisé" if model_manager.is_ready() else "❌ Non initialisé"
+            model_status = model_manager.get_status()
+            if model_status == 'ready':
+                llm_status = "✅ Initialisé"
+                if model_manager.load_time is not None:
+                    llm_status += f" (chargé en {model_manager.load_time:.1f}s)"
+            elif model_status == 'swapping':
+                llm_status = "🔄 Changement de profil en cours"
+            elif model_status == 'loading':
+                llm_status = "⏳ Chargement en cours"
+            else:
+                llm_status = "❌ Non initialisé"
             
             # Informations sur le profil et le contexte
             current_profile = model_manager.get_current_profile()
@@ -85,13 +98,9 @@ def setup(bot):
                 gpu_layers = "N/A"
                 batch_size = "N/A"
 
-            conn = sqlite3.connect(bot.DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM memory")
-            total_msgs = cursor.fetchone()[0]
-            cursor.execute("SELECT COUNT(DISTINCT user_id) FROM memory")
-            user_count = cursor.fetchone()[0]
-            conn.close()
+            total_msgs = counters.get('messages', 0)
+            user_count = counters.get('users', 0)
+            archived_msgs = counters.get('archived', 0)
 
             # Statut VRAM avec recommandations
             vram_status = "🟢 Optimal"
@@ -144,15 +153,57 @@ def setup(bot):
             except Exception:
                 pass
 
+            # Réutilisation du cache KV (préfixe persona)
+            try:
+                cache_stats = model_manager.get_prompt_cache_stats()
+                msg += (
+                    f"   ♻️ Cache persona : {cache_stats['persona_tokens']} tokens\n"
+                    f"   ⏭️ Tokens évités : {cache_stats['reused_tokens']:,} / {cache_stats['prompt_tokens']:,} "
+                    f"({cache_stats['reuse_percent']:.1f}%)\n"
+                )
+                user_states = cache_stats['user_states']
+                msg += (
+                    f"   🗃️ États KV      : {user_states['entries']} utilisateurs, "
+                    f"{user_states['size_mb']:.0f} / {user_states['max_mb']:.0f} Mo\n"
+                )
+            except Exception:
+                pass
+
+            # File d'inférence
+            try:
+                queue_stats = inference_scheduler.get_stats()
+                msg += (
+                    f"   📥 File          : {queue_stats['depth']} / {queue_stats['max_depth']}"
+                    f"{' (génération en cours)' if queue_stats['busy'] else ''}\n"
+                    f"   ⏱️ Attente       : moy {queue_stats['avg_wait_s']:.2f}s, p95 {queue_stats['p95_wait_s']:.2f}s\n"
+                    f"   ⚙️ Service       : moy {queue_stats['avg_service_s']:.2f}s, p95 {queue_stats['p95_service_s']:.2f}s\n"
+                    f"   🚫 Refus/expirées : {queue_stats['rejected']} / {queue_stats['expired']}\n"
+                )
+                if queue_stats['batches']:
+                    msg += f"   📦 Lots          : {queue_stats['batches']} (taille moy {queue_stats['avg_batch_size']:.1f})\n"
+            except Exception:
+                pass
+
             msg += (
                 "\n"
                 "🧠 MÉMOIRE DE KIRA\n"
                 "────────────────────────────\n"
                 f"🗂️ Disque mémoire  : {disk_used:.2f} Go / {disk_total:.2f} Go ({disk_percent}%)\n"
                 f"💬 Messages db     : {total_msgs}\n"
+                f"📦 Archivés        : {archived_msgs}\n"
                 f"👤 Utilisateurs db : {user_count}\n"
-                "```"
             )
+            try:
+                hist = history_cache.stats()
+                lookups = hist['hits'] + hist['misses']
+                hit_rate = 100 * hist['hits'] / lookups if lookups else 0.0
+                msg += (
+                    f"⚡ Cache historique : {hist['users']} utilisateurs, {hist['bytes'] / 1024**2:.1f} Mo, "
+                    f"{hit_rate:.0f}% de hits\n"
+                )
+            except Exception:
+                pass
+            msg += "```"
             await ctx.send(msg)
 
         except Exception as e:
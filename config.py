@@ -8,7 +8,7 @@ def setup_logging():
     log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     
     # Créer le dossier logs s'il n'existe pas
-    log_dir = os.path.join(os.path.dirname(__file__), "logs")
+    log_dir = os.getenv("LOG_DIR", os.path.join(os.path.dirname(__file__), "logs"))
     os.makedirs(log_dir, exist_ok=True)
     
     logging.basicConfig(
@@ -26,11 +26,13 @@ def setup_logging():
 
 def setup_advanced_logging():
     """Configure le système de logging avancé"""
+    if os.getenv("ADVANCED_LOGGING", "true").lower() not in ("1", "true", "yes", "on"):
+        return None
     try:
         from tools.advanced_logging import init_advanced_logging
         
         # Chemin de la base de données des logs
-        log_db_path = os.path.join(os.path.dirname(__file__), "data", "logs.db")
+        log_db_path = os.getenv("LOG_DB_PATH", os.path.join(os.path.dirname(__file__), "data", "logs.db"))
         log_config_path = os.path.join(os.path.dirname(__file__), "JSON", "log_config.json")
         
         # Initialise le gestionnaire de logs avancé
@@ -78,11 +80,74 @@ class Config:
         # Base de données (portable)
         self.DB_PATH = os.getenv("DB_PATH", os.path.join(self.data_dir, "neuro.db"))
         
+        # Écritures SQLite différées (fenêtre de regroupement en ms) et threads lecteurs
+        self.DB_WRITE_FLUSH_MS = float(os.getenv("DB_WRITE_FLUSH_MS", "5"))
+        self.DB_READER_THREADS = int(os.getenv("DB_READER_THREADS", "2"))
+        
+        # Cache mémoire des derniers échanges par utilisateur (échanges par utilisateur, plafond global en Mo)
+        self.HISTORY_CACHE_TURNS = int(os.getenv("HISTORY_CACHE_TURNS", "50"))
+        self.HISTORY_CACHE_MB = int(os.getenv("HISTORY_CACHE_MB", "64"))
+        
+        # Faits injectés dans le prompt (nombre maximum et budget en tokens)
+        self.FACTS_TOP_K = int(os.getenv("FACTS_TOP_K", "8"))
+        self.FACTS_TOKEN_BUDGET = int(os.getenv("FACTS_TOKEN_BUDGET", "256"))
+        
+        # Mémoire sémantique à long terme (embeddings llama.cpp, CPU par défaut, modèle principal si non précisé)
+        self.SEMANTIC_MEMORY = os.getenv("SEMANTIC_MEMORY", "false").lower() in ("1", "true", "yes", "on")
+        self.EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH")
+        self.EMBEDDING_N_CTX = int(os.getenv("EMBEDDING_N_CTX", "512"))
+        self.EMBEDDING_N_GPU_LAYERS = int(os.getenv("EMBEDDING_N_GPU_LAYERS", "0"))
+        self.SEMANTIC_TOP_K = int(os.getenv("SEMANTIC_TOP_K", "3"))
+        self.SEMANTIC_MIN_SCORE = float(os.getenv("SEMANTIC_MIN_SCORE", "0.35"))
+        self.SEMANTIC_TOKEN_BUDGET = int(os.getenv("SEMANTIC_TOKEN_BUDGET", "256"))
+        
+        # Résumés glissants des anciens échanges (générés quand le modèle est inactif)
+        self.SUMMARY_ENABLED = os.getenv("SUMMARY_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+        self.SUMMARY_INTERVAL = float(os.getenv("SUMMARY_INTERVAL", "60"))
+        self.SUMMARY_KEEP_TURNS = int(os.getenv("SUMMARY_KEEP_TURNS", "6"))
+        self.SUMMARY_MIN_TURNS = int(os.getenv("SUMMARY_MIN_TURNS", "10"))
+        self.SUMMARY_BATCH_TURNS = int(os.getenv("SUMMARY_BATCH_TURNS", "40"))
+        self.SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "200"))
+        
+        # Rétention de la mémoire (0 = illimité) et maintenance périodique de la base (désactivée par défaut)
+        self.RETENTION_ENABLED = os.getenv("RETENTION_ENABLED", "false").lower() in ("1", "true", "yes", "on")
+        self.RETENTION_MAX_AGE_DAYS = int(os.getenv("RETENTION_MAX_AGE_DAYS", "0"))
+        self.RETENTION_MAX_PER_USER = int(os.getenv("RETENTION_MAX_PER_USER", "10000"))
+        self.RETENTION_INTERVAL_HOURS = float(os.getenv("RETENTION_INTERVAL_HOURS", "6"))
+        # Conversion unique en auto_vacuum incrémental : VACUUM complet, bloque les écritures le temps de la copie
+        self.RETENTION_ENABLE_INCREMENTAL_VACUUM = os.getenv("RETENTION_ENABLE_INCREMENTAL_VACUUM", "false").lower() in ("1", "true", "yes", "on")
+        
         # Modèle par défaut (configurable)
         default_model = "zephyr-7b-beta.Q5_K_M.gguf"
         self.MODEL_PATH = os.getenv("MODEL_PATH", 
                                    os.path.join(self.models_dir, default_model))
         
+        # Chargement automatique du modèle en arrière-plan à l'import de model.py
+        self.MODEL_AUTOLOAD = os.getenv("MODEL_AUTOLOAD", "true").lower() in ("1", "true", "yes", "on")
+        
+        # Budget mémoire du cache des états KV par utilisateur (Mo)
+        self.KV_STATE_CACHE_MB = int(os.getenv("KV_STATE_CACHE_MB", "1024"))
+        
+        # Réponses Discord en streaming (message publié tôt puis édité)
+        self.STREAM_REPLIES = os.getenv("STREAM_REPLIES", "true").lower() in ("1", "true", "yes", "on")
+        self.STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.5"))
+        
+        # File d'inférence (profondeur maximale et échéance par requête en secondes)
+        self.INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "8"))
+        self.INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "120"))
+        
+        # Génération par lots multi-séquences (contexte llama.cpp supplémentaire, coûte de la VRAM)
+        self.BATCH_DECODING = os.getenv("BATCH_DECODING", "false").lower() in ("1", "true", "yes", "on")
+        self.BATCH_MAX_SEQUENCES = int(os.getenv("BATCH_MAX_SEQUENCES", "4"))
+        # Taille (tokens) du cache KV du contexte de lots, partagée entre ses séquences
+        self.BATCH_N_CTX = int(os.getenv("BATCH_N_CTX", "4096"))
+        
+        # Marge VRAM (Mo) exigée pour charger un nouveau profil à côté de l'actuel
+        self.SWAP_VRAM_MARGIN_MB = int(os.getenv("SWAP_VRAM_MARGIN_MB", "512"))
+        
+        # Cadence (secondes) de l'échantillonneur matériel partagé NVML/psutil
+        self.TELEMETRY_INTERVAL = float(os.getenv("TELEMETRY_INTERVAL", "2"))
+        
         # Configuration LLM déplacée vers model.py pour gestion automatique
         # Les profils sont maintenant gérés automatiquement selon la VRAM disponible
         
@@ -1,13 +1,117 @@
 """
 Module de gestion de base de données avec context manager et pool de connexions
 """
+import asyncio
+import atexit
+import queue
 import sqlite3
 import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Generator
+from typing import Generator, Optional
 from config import config, logger
 
 
+def _migrate_facts_fts(conn: sqlite3.Connection):
+    """Index plein texte FTS5 des faits, synchronisé par triggers (ignoré si FTS5 est absent)"""
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS facts_fts USING fts5(
+                fact, content='facts', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"FTS5 indisponible dans ce SQLite, classement des faits en mode dégradé: {e}")
+        return
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS facts_fts_ai AFTER INSERT ON facts BEGIN
+            INSERT INTO facts_fts(rowid, fact) VALUES (new.id, new.fact);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS facts_fts_ad AFTER DELETE ON facts BEGIN
+            INSERT INTO facts_fts(facts_fts, rowid, fact) VALUES ('delete', old.id, old.fact);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS facts_fts_au AFTER UPDATE ON facts BEGIN
+            INSERT INTO facts_fts(facts_fts, rowid, fact) VALUES ('delete', old.id, old.fact);
+            INSERT INTO facts_fts(rowid, fact) VALUES (new.id, new.fact);
+        END
+    """)
+    # Indexe les faits existants
+    conn.execute("INSERT INTO facts_fts(facts_fts) VALUES ('rebuild')")
+
+
+# Migrations du schéma : (version, description, instructions SQL idempotentes ou fonction(conn))
+# Ne jamais modifier une migration publiée, en ajouter une nouvelle à la suite
+MIGRATIONS = [
+    (1, "index (user_id, id DESC) pour l'historique par utilisateur", [
+        "CREATE INDEX IF NOT EXISTS idx_memory_user_id_id ON memory(user_id, id DESC)",
+        # Redondant avec le préfixe du nouvel index
+        "DROP INDEX IF EXISTS idx_memory_user_id",
+    ]),
+    (2, "index plein texte FTS5 des faits", _migrate_facts_fts),
+    (3, "correspondance échanges -> lignes de la matrice de vecteurs sémantiques", [
+        """CREATE TABLE IF NOT EXISTS memory_vectors (
+            memory_id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            row INTEGER
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_memory_vectors_user_id ON memory_vectors(user_id)",
+    ]),
+    (4, "résumés glissants des conversations", [
+        """CREATE TABLE IF NOT EXISTS memory_summaries (
+            user_id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            last_memory_id INTEGER NOT NULL,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )""",
+    ]),
+    (5, "compteurs maintenus par triggers et table d'archive compressée", [
+        "CREATE TABLE IF NOT EXISTS memory_counters (key TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+        "CREATE TABLE IF NOT EXISTS memory_user_counts (user_id TEXT PRIMARY KEY, messages INTEGER NOT NULL)",
+        """CREATE TABLE IF NOT EXISTS memory_archive (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            timestamp DATETIME,
+            payload BLOB NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_memory_archive_user_id ON memory_archive(user_id)",
+        # Valeurs initiales (seul parcours complet de la table, une fois)
+        "DELETE FROM memory_user_counts",
+        "INSERT INTO memory_user_counts (user_id, messages) SELECT user_id, COUNT(*) FROM memory GROUP BY user_id",
+        """INSERT OR REPLACE INTO memory_counters (key, value) VALUES
+            ('messages', (SELECT COUNT(*) FROM memory)),
+            ('users', (SELECT COUNT(*) FROM memory_user_counts)),
+            ('archived', (SELECT COUNT(*) FROM memory_archive))""",
+        """CREATE TRIGGER IF NOT EXISTS memory_counters_ai AFTER INSERT ON memory BEGIN
+            UPDATE memory_counters SET value = value + 1 WHERE key = 'messages';
+            INSERT INTO memory_user_counts (user_id, messages) VALUES (new.user_id, 1)
+                ON CONFLICT(user_id) DO UPDATE SET messages = messages + 1;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS memory_counters_ad AFTER DELETE ON memory BEGIN
+            UPDATE memory_counters SET value = value - 1 WHERE key = 'messages';
+            UPDATE memory_user_counts SET messages = messages - 1 WHERE user_id = old.user_id;
+            DELETE FROM memory_user_counts WHERE user_id = old.user_id AND messages <= 0;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS memory_user_counts_ai AFTER INSERT ON memory_user_counts BEGIN
+            UPDATE memory_counters SET value = value + 1 WHERE key = 'users';
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS memory_user_counts_ad AFTER DELETE ON memory_user_counts BEGIN
+            UPDATE memory_counters SET value = value - 1 WHERE key = 'users';
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS memory_archive_ai AFTER INSERT ON memory_archive BEGIN
+            UPDATE memory_counters SET value = value + 1 WHERE key = 'archived';
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS memory_archive_ad AFTER DELETE ON memory_archive BEGIN
+            UPDATE memory_counters SET value = value - 1 WHERE key = 'archived';
+        END""",
+    ]),
+]
+
+
 class DatabaseManager:
     """Gestionnaire de base de données avec pool de connexions"""
     
@@ -33,11 +137,7 @@ class DatabaseManager:
                     )
                 """)
                 
-                # Index pour la table memory
-                cursor.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_memory_user_id ON memory(user_id)
-                """)
-                
+                # Index pour la table memory (l'index par utilisateur est créé par les migrations)
                 cursor.execute("""
                     CREATE INDEX IF NOT EXISTS idx_memory_timestamp ON memory(timestamp)
                 """)
@@ -58,12 +158,53 @@ class DatabaseManager:
                 """)
                 
                 conn.commit()
+                
+                # Évolutions du schéma versionnées par PRAGMA user_version
+                self._apply_migrations(conn)
                 logger.info("Base de données initialisée avec succès")
                 
         except Exception as e:
             logger.error(f"Erreur lors de l'initialisation de la base de données: {e}")
             raise
     
+    def get_schema_version(self) -> int:
+        """Version du schéma appliquée à la base (PRAGMA user_version)"""
+        with self.get_connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    def _apply_migrations(self, conn: sqlite3.Connection):
+        """Applique dans l'ordre les migrations dont la version dépasse user_version"""
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        latest = MIGRATIONS[-1][0] if MIGRATIONS else 0
+        if current > latest:
+            logger.warning(f"Schéma de base en version {current}, plus récent que ce code (version {latest})")
+            return
+        
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            # Une transaction par migration : le schéma et user_version avancent ensemble
+            conn.execute("BEGIN")
+            try:
+                if callable(statements):
+                    statements(conn)
+                else:
+                    for statement in statements:
+                        conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                logger.error(f"Échec de la migration {version} ({description})")
+                raise
+            logger.info(f"Migration {version} appliquée : {description}")
+    
+    def has_table(self, name: str) -> bool:
+        """Indique si une table (ou table virtuelle) existe dans la base"""
+        with self.get_connection() as conn:
+            row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()
+            return row is not None
+    
     @contextmanager
     def get_connection(self) -> Generator[sqlite3.Connection, None, None]:
         """Context manager pour obtenir une connexion à la base de données"""
@@ -98,9 +239,181 @@ class DatabaseManager:
             delattr(self._local, 'connection')
 
 
+class WriteBehindQueue:
+    """
+    Thread écrivain unique : les écritures sont mises en file et regroupées
+    dans une seule transaction toutes les flush_interval secondes
+    """
+    
+    _STOP = object()
+    
+    def __init__(self, manager: DatabaseManager, flush_interval: float = 0.005, max_batch: int = 256):
+        self.manager = manager
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+        self.committed = 0
+        self.failed = 0
+        self.batches = 0
+    
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._start_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="kira-db-writer", daemon=True)
+                    self._thread.start()
+    
+    def submit(self, sql: str, params: tuple = ()) -> Future:
+        """Met une écriture en file ; le Future est résolu (rowcount) une fois la transaction validée"""
+        future = Future()
+        with self._inflight_lock:
+            self._inflight += 1
+        future.add_done_callback(self._done)
+        self._ensure_thread()
+        self._queue.put((sql, params, future))
+        return future
+    
+    def _done(self, _future):
+        with self._inflight_lock:
+            self._inflight -= 1
+    
+    def pending(self) -> int:
+        """Nombre d'écritures soumises et pas encore validées (y compris le lot en cours)"""
+        return self._inflight
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Attend que toutes les écritures déjà soumises soient validées"""
+        if self._thread is None or not self._thread.is_alive():
+            return self.pending() == 0
+        try:
+            self.submit("SELECT 1").result(timeout=timeout)
+            return True
+        except Exception:
+            return False
+    
+    def close(self, timeout: float = 5.0):
+        """Vide la file puis arrête le thread écrivain"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout=timeout)
+    
+    def submit_job(self, job) -> Future:
+        """
+        Exécute job(conn) seul sur la connexion de l'écrivain, dans l'ordre de la file,
+        puis valide ; pour les écritures qui doivent être atomiques ou hors transaction (VACUUM)
+        """
+        return self.submit(job)
+    
+    def _run(self):
+        next_item = None
+        while True:
+            item = next_item if next_item is not None else self._queue.get()
+            next_item = None
+            if item is self._STOP:
+                return
+            if callable(item[0]):
+                self._run_job(item)
+                continue
+            batch = [item]
+            # Regroupe ce qui arrive pendant la fenêtre de flush
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stop = True
+                    break
+                if callable(item[0]):
+                    # Un job s'exécute seul, après la validation du lot courant
+                    next_item = item
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+    
+    def _run_job(self, item):
+        job, _, future = item
+        with self.manager.get_connection() as conn:
+            try:
+                result = job(conn)
+                if conn.in_transaction:
+                    conn.commit()
+            except Exception as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                self.failed += 1
+                future.set_exception(e)
+                return
+        self.committed += 1
+        future.set_result(result)
+    
+    def _commit(self, batch):
+        """Exécute le lot dans une transaction ; en cas d'échec, rejoue chaque écriture isolément"""
+        with self.manager.get_connection() as conn:
+            try:
+                results = [conn.execute(sql, params).rowcount for sql, params, _ in batch]
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.warning(f"Échec du lot d'écritures ({len(batch)}), nouvelle tentative une par une: {e}")
+                self._commit_one_by_one(conn, batch)
+                return
+        self.batches += 1
+        self.committed += len(batch)
+        for (_, _, future), rowcount in zip(batch, results):
+            future.set_result(rowcount)
+    
+    def _commit_one_by_one(self, conn, batch):
+        for sql, params, future in batch:
+            try:
+                rowcount = conn.execute(sql, params).rowcount
+                conn.commit()
+                self.committed += 1
+                future.set_result(rowcount)
+            except Exception as e:
+                conn.rollback()
+                self.failed += 1
+                future.set_exception(e)
+    
+    def get_stats(self):
+        return {
+            'pending': self.pending(),
+            'committed': self.committed,
+            'failed': self.failed,
+            'batches': self.batches,
+            'avg_batch_size': self.committed / self.batches if self.batches else 0.0,
+        }
+
+
 # Instance globale du gestionnaire de base de données
 db_manager = DatabaseManager(config.DB_PATH)
 
+# Écritures différées et pool de lecteurs (chaque thread a sa propre connexion WAL)
+db_writer = WriteBehindQueue(db_manager, flush_interval=config.DB_WRITE_FLUSH_MS / 1000.0)
+db_reader_pool = ThreadPoolExecutor(max_workers=config.DB_READER_THREADS, thread_name_prefix="kira-db-reader")
+
+def _shutdown_db_threads():
+    """Valide les écritures en attente avant la sortie du processus"""
+    db_writer.close()
+    db_reader_pool.shutdown(wait=False)
+
+atexit.register(_shutdown_db_threads)
+
+async def run_read(func, *args):
+    """Exécute une lecture bloquante sur le pool de lecteurs sans bloquer la boucle asyncio"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_reader_pool, lambda: func(*args))
+
 # Context manager pour compatibilité
 @contextmanager
 def get_db_connection():
@@ -1,4 +1,6 @@
 from .on_message import setup as setup_on_message
+from .on_ready import setup as setup_on_ready
 
 def setup_all_events(bot):
-    setup_on_message(bot)
\ No newline at end of file
+    setup_on_message(bot)
+    setup_on_ready(bot)
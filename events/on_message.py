@@ -1,9 +1,10 @@
-from model import generate_reply
+from model import generate_reply, generate_reply_stream
 from utils import shorten_response
 from memory import get_history
 from web import duckduckgo_search
-from config import logger
+from config import config, logger
 import re
+import time
 
 def setup(bot):
     @bot.event
@@ -42,10 +43,16 @@ def setup(bot):
                         if web_info and not web_info.startswith("❌"):
                             prompt += f"\n\nInformation trouvée : {web_info}"
                     
-                    reply = await generate_reply(user_id, prompt, context_limit=bot.current_context_limit)
-                    reply = shorten_response(reply)
+                    reply = None
+                    if config.STREAM_REPLIES:
+                        # Réponse publiée puis éditée au fil de la génération
+                        await _stream_reply(message, user_id, prompt, bot.current_context_limit)
+                    else:
+                        reply = await generate_reply(user_id, prompt, context_limit=bot.current_context_limit)
+                        reply = shorten_response(reply)
                 
-                await message.reply(reply)
+                if reply is not None:
+                    await message.reply(reply)
                 logger.info(f"Réponse envoyée à {user_id}")
                 
             except Exception as e:
@@ -57,6 +64,41 @@ def setup(bot):
 
         await bot.process_commands(message)
 
+async def _stream_reply(message, user_id: str, prompt: str, context_limit: int):
+    """Publie la réponse dès la première phrase puis l'édite à intervalle limité"""
+    sent = None
+    shown = ""
+    reply = ""
+    last_edit = 0.0
+
+    async for partial in generate_reply_stream(user_id, prompt, context_limit=context_limit):
+        reply = partial
+        if not partial:
+            continue
+        now = time.monotonic()
+        if sent is None:
+            # Premier envoi dès qu'une phrase est complète
+            if _has_complete_sentence(partial):
+                shown = shorten_response(partial)
+                sent = await message.reply(shown)
+                last_edit = now
+        elif now - last_edit >= config.STREAM_EDIT_INTERVAL:
+            content = shorten_response(partial)
+            if content and content != shown:
+                await sent.edit(content=content)
+                shown = content
+                last_edit = now
+
+    final = shorten_response(reply) or "…"
+    if sent is None:
+        await message.reply(final)
+    elif final != shown:
+        await sent.edit(content=final)
+
+def _has_complete_sentence(text: str) -> bool:
+    """Vérifie si le texte contient au moins une phrase terminée"""
+    return bool(re.search(r'[.!?…](\s|$)', text)) or len(text) >= 120
+
 def _should_search_web(prompt: str) -> bool:
     """Détermine si une recherche web est nécessaire"""
     web_keywords = [
@@ -0,0 +1,47 @@
+from model import model_manager
+from summarizer import conversation_summarizer
+from retention import retention_manager
+from stats_service import stats_service
+from config import config, logger
+import asyncio
+import time
+import discord
+
+def setup(bot):
+    @bot.event
+    async def on_ready():
+        """Connexion Discord établie : signale le chargement du modèle si nécessaire"""
+        online_after = time.time() - getattr(bot, "bot_start_time", time.time())
+        logger.info(f"Connecté à Discord en tant que {bot.user} ({online_after:.1f}s après le démarrage)")
+
+        if config.SUMMARY_ENABLED:
+            conversation_summarizer.start()
+        if config.RETENTION_ENABLED:
+            retention_manager.start()
+        stats_service.start()
+
+        if model_manager.is_ready():
+            await bot.change_presence(status=discord.Status.online)
+            return
+
+        await bot.change_presence(
+            status=discord.Status.idle,
+            activity=discord.Game("Chargement du modèle…")
+        )
+
+        # on_ready peut être rappelé après une reconnexion : une seule attente
+        if getattr(bot, "_model_wait_task", None) is None:
+            bot._model_wait_task = asyncio.create_task(_wait_for_model(bot))
+
+async def _wait_for_model(bot):
+    """Passe le bot en ligne une fois le modèle chargé"""
+    ready = await model_manager.wait_until_loaded()
+    if ready:
+        logger.info(f"Kira opérationnelle (modèle chargé en {model_manager.load_time:.1f}s)")
+        await bot.change_presence(status=discord.Status.online)
+    else:
+        logger.error(f"Modèle indisponible: {model_manager.load_error}")
+        await bot.change_presence(
+            status=discord.Status.dnd,
+            activity=discord.Game("Modèle indisponible")
+        )
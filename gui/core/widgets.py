@@ -6,8 +6,7 @@ Widgets personnalisés standardisés pour l'interface Kira-Bot
 import math
 from typing import Optional, Dict, Any, List
 from .qt_imports import *
-from gpu_utils import get_gpu_info, get_vram_info, get_gpu_temperature
-import psutil
+from telemetry import telemetry
 
 # =============================================================================
 # INDICATEURS CIRCULAIRES
@@ -165,7 +164,7 @@ class SystemStatusCard(StatusCard):
         super().__init__(self._getTitle(), self._getIcon())
         self.timer = QTimer()
         self.timer.timeout.connect(self._updateStatus)
-        self.timer.start(2000)  # Mise à jour toutes les 2 secondes
+        self.timer.start(int(telemetry.interval * 1000))  # Au rythme de la télémétrie
         
     def _getTitle(self) -> str:
         titles = {
@@ -186,30 +185,30 @@ class SystemStatusCard(StatusCard):
         return icons.get(self.system_type, '📊')
         
     def _updateStatus(self):
-        """Met à jour automatiquement le statut"""
+        """Met à jour automatiquement le statut depuis le dernier instantané de télémétrie"""
         try:
+            snapshot = telemetry.latest()
             if self.system_type == 'cpu':
-                value = psutil.cpu_percent(interval=0.1)
+                value = snapshot.cpu_percent or 0.0
                 self.updateValue(f"{value:.1f}%")
                 
             elif self.system_type == 'ram':
-                ram = psutil.virtual_memory()
-                used_gb = ram.used / (1024**3)
-                total_gb = ram.total / (1024**3)
+                used_gb = snapshot.ram_used_gb or 0.0
+                total_gb = snapshot.ram_total_gb or 0.0
                 self.updateValue(f"{used_gb:.1f}G / {total_gb:.1f}G")
                 
             elif self.system_type == 'gpu':
-                gpu_info = get_gpu_info()
+                gpu_info = snapshot.gpu
                 if gpu_info:
                     self.updateValue(f"{gpu_info.utilization_gpu}% - {gpu_info.temperature_c}°C")
                 else:
                     self.updateValue("Non disponible")
                     
             elif self.system_type == 'vram':
-                vram_info = get_vram_info()
-                if vram_info:
-                    used_gb = vram_info['used_mb'] / 1024
-                    total_gb = vram_info['total_mb'] / 1024
+                gpu_info = snapshot.gpu
+                if gpu_info:
+                    used_gb = gpu_info.vram_used_mb / 1024
+                    total_gb = gpu_info.vram_total_mb / 1024
                     self.updateValue(f"{used_gb:.1f}G / {total_gb:.1f}G")
                 else:
                     self.updateValue("Non disponible")
@@ -345,21 +344,21 @@ class SystemMonitorPanel(QWidget):
         # Timer pour les indicateurs circulaires
         self.timer = QTimer()
         self.timer.timeout.connect(self._updateIndicators)
-        self.timer.start(1000)
+        self.timer.start(int(telemetry.interval * 1000))
         
     def _updateIndicators(self):
         """Met à jour les indicateurs circulaires"""
         try:
+            snapshot = telemetry.latest()
+            
             # CPU
-            cpu_percent = psutil.cpu_percent(interval=0.1)
-            self.cpu_indicator.setValue(cpu_percent)
+            self.cpu_indicator.setValue(snapshot.cpu_percent or 0.0)
             
             # RAM
-            ram = psutil.virtual_memory()
-            self.ram_indicator.setValue(ram.percent)
+            self.ram_indicator.setValue(snapshot.ram_percent or 0.0)
             
             # GPU
-            gpu_info = get_gpu_info()
+            gpu_info = snapshot.gpu
             if gpu_info:
                 self.gpu_indicator.setValue(gpu_info.utilization_gpu)
                 self.temp_indicator.setValue(gpu_info.temperature_c)
@@ -50,11 +50,12 @@ try:
 except ImportError:
     PSUTIL_AVAILABLE = False
 
+# Télémétrie matérielle partagée avec le bot (même processus)
 try:
-    import pynvml
-    PYNVML_AVAILABLE = True
+    from telemetry import telemetry
+    TELEMETRY_AVAILABLE = True
 except ImportError:
-    PYNVML_AVAILABLE = False
+    TELEMETRY_AVAILABLE = False
 
 # Import des modules du bot
 try:
@@ -685,53 +686,23 @@ class MainInterface(QMainWindow):
     def update_stats(self):
         """Mise à jour des statistiques"""
         try:
-            # CPU
-            cpu_percent = psutil.cpu_percent(interval=0.1)
-            self.cpu_indicator.setValue(cpu_percent)
+            # Dernier instantané de la télémétrie partagée : aucun appel NVML/psutil ici
+            snapshot = telemetry.latest() if TELEMETRY_AVAILABLE else None
             
-            # RAM
-            ram = psutil.virtual_memory()
-            ram_percent = ram.percent
-            ram_used = ram.used / (1024**3)
-            ram_total = ram.total / (1024**3)
-            self.ram_indicator.setValue(ram_percent, f"{ram_used:.1f}G")
+            if snapshot:
+                # CPU
+                self.cpu_indicator.setValue(snapshot.cpu_percent or 0.0)
+                
+                # RAM
+                ram_used = snapshot.ram_used_gb or 0.0
+                self.ram_indicator.setValue(snapshot.ram_percent or 0.0, f"{ram_used:.1f}G")
             
             # GPU & VRAM
-            try:
-                pynvml.nvmlInit()
-                handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-                gpu_name = pynvml.nvmlDeviceGetName(handle)
-                if isinstance(gpu_name, bytes):
-                    gpu_name = gpu_name.decode()
-                    
-                util = pynvml.nvmlDeviceGetUtilizationRates(handle)
-                mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-                temp = pynvml.nvmlDeviceGetTemperature(handle, pynvml.NVML_TEMPERATURE_GPU)
-                
-                # Conversion sécurisée des valeurs
-                try:
-                    gpu_util = float(util.gpu) if util.gpu else 0.0
-                    temp_val = float(temp) if temp else 0.0
-                except (ValueError, TypeError):
-                    gpu_util = 0.0
-                    temp_val = 0.0
-                
-                self.gpu_indicator.setValue(gpu_util, f"{temp_val:.0f}°C")
-                
-                # Conversion sécurisée VRAM
-                try:
-                    vram_used = float(mem_info.used) / (1024**2)
-                    vram_total = float(mem_info.total) / (1024**2)
-                    vram_percent = (float(mem_info.used) / float(mem_info.total)) * 100
-                except (ValueError, TypeError, ZeroDivisionError):
-                    vram_used = 0.0
-                    vram_total = 0.0
-                    vram_percent = 0.0
-                    
-                self.vram_indicator.setValue(vram_percent, f"{vram_used:.0f}M")
-                
-                pynvml.nvmlShutdown()
-            except Exception:
+            gpu = snapshot.gpu if snapshot else None
+            if gpu:
+                self.gpu_indicator.setValue(float(gpu.utilization_gpu), f"{gpu.temperature_c:.0f}°C")
+                self.vram_indicator.setValue(gpu.vram_usage_percent, f"{gpu.vram_used_mb:.0f}M")
+            else:
                 self.gpu_indicator.setValue(0, "N/A")
                 self.vram_indicator.setValue(0, "N/A")
             
@@ -1,12 +1,10 @@
 """
 Widgets de monitoring système optimisés
-Utilise gpu_utils et core modules pour un monitoring unifié
+Abonnés à la télémétrie partagée : aucun appel NVML/psutil depuis le thread GUI
 """
 
 import sys
 import os
-import time
-import psutil
 from typing import Dict, List, Optional
 
 # Ajouter le répertoire parent pour les imports
@@ -15,6 +13,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from gui.core.qt_imports import *
 from gui.core.widgets import ModernButton
 from gpu_utils import gpu_manager
+from telemetry import TelemetrySnapshot, telemetry
 from PySide6.QtGui import QPolygon, QColor
 from PySide6.QtCore import QPoint
 
@@ -217,11 +216,14 @@ class MiniChart(QWidget):
 class SystemMonitorPanel(QWidget):
     """Panel principal de monitoring système"""
     
+    # Émis depuis le thread de télémétrie, reçu dans le thread GUI
+    snapshot_received = Signal(object)
+    
     def __init__(self):
         super().__init__()
         self.gpu_available = gpu_manager.is_available()
         self._setupUI()
-        self._setupTimer()
+        self._subscribe()
         
     def _setupUI(self):
         """Configure l'interface du panel"""
@@ -265,31 +267,27 @@ class SystemMonitorPanel(QWidget):
             self.temp_card.progress_indicator.max_value = 100  # Températures jusqu'à 100°C
             layout.addWidget(self.temp_card, 2, 2)
         
-    def _setupTimer(self):
-        """Configure le timer de mise à jour"""
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self._updateMetrics)
-        self.update_timer.start(1000)  # Mise à jour chaque seconde
-        
-        # Variables pour calculs réseau
-        self.last_network_time = time.time()
-        self.last_bytes_sent = 0
-        self.last_bytes_recv = 0
+    def _subscribe(self):
+        """Abonne le panel aux instantanés de la télémétrie"""
+        self.snapshot_received.connect(self._updateMetrics)
+        callback = telemetry.subscribe(self.snapshot_received.emit)
+        self.destroyed.connect(lambda: telemetry.unsubscribe(callback))
+        self._updateMetrics(telemetry.latest())
         
-    def _updateMetrics(self):
+    def _updateMetrics(self, snapshot: TelemetrySnapshot):
         """Met à jour toutes les métriques"""
         try:
             # CPU
-            cpu_percent = psutil.cpu_percent(interval=None)
-            self.cpu_card.updateValue(cpu_percent)
+            if snapshot.cpu_percent is not None:
+                self.cpu_card.updateValue(snapshot.cpu_percent)
             
             # RAM
-            memory = psutil.virtual_memory()
-            self.ram_card.updateValue(memory.percent)
+            if snapshot.ram_percent is not None:
+                self.ram_card.updateValue(snapshot.ram_percent)
             
             # GPU (si disponible)
             if self.gpu_available:
-                gpu_info = gpu_manager.get_gpu_info()
+                gpu_info = snapshot.gpu
                 if gpu_info:
                     self.gpu_card.updateValue(gpu_info.utilization_gpu)
                     self.vram_card.updateValue(gpu_info.vram_usage_percent)
@@ -297,29 +295,15 @@ class SystemMonitorPanel(QWidget):
                     if hasattr(gpu_info, 'temperature_c') and gpu_info.temperature_c is not None:
                         self.temp_card.updateValue(gpu_info.temperature_c)
             
-            # Réseau
-            network_stats = psutil.net_io_counters()
-            current_time = time.time()
-            
-            if hasattr(self, 'last_network_time'):
-                time_diff = current_time - self.last_network_time
-                bytes_sent_diff = network_stats.bytes_sent - self.last_bytes_sent
-                bytes_recv_diff = network_stats.bytes_recv - self.last_bytes_recv
-                
-                if time_diff > 0:
-                    # Calcul en MB/s
-                    network_speed = (bytes_sent_diff + bytes_recv_diff) / time_diff / 1024 / 1024
-                    self.network_card.updateValue(network_speed)
-                    self.network_card.unit = "MB/s"
-                    self.network_card.progress_indicator.max_value = 100  # Max 100 MB/s pour l'affichage
-            
-            self.last_network_time = current_time
-            self.last_bytes_sent = network_stats.bytes_sent
-            self.last_bytes_recv = network_stats.bytes_recv
+            # Réseau (débit calculé par la télémétrie entre deux échantillons)
+            if snapshot.net_rate_mb_s is not None:
+                self.network_card.updateValue(snapshot.net_rate_mb_s)
+                self.network_card.unit = "MB/s"
+                self.network_card.progress_indicator.max_value = 100  # Max 100 MB/s pour l'affichage
             
             # Disque
-            disk_usage = psutil.disk_usage('/')
-            self.disk_card.updateValue(disk_usage.percent)
+            if snapshot.disk_percent is not None:
+                self.disk_card.updateValue(snapshot.disk_percent)
             
         except Exception as e:
             print(f"Erreur lors de la mise à jour des métriques: {e}")
@@ -327,11 +311,14 @@ class SystemMonitorPanel(QWidget):
 class CompactSystemMonitor(QWidget):
     """Version compacte du monitoring pour la barre de statut"""
     
+    # Émis depuis le thread de télémétrie, reçu dans le thread GUI
+    snapshot_received = Signal(object)
+    
     def __init__(self):
         super().__init__()
         self.gpu_available = gpu_manager.is_available()
         self._setupUI()
-        self._setupTimer()
+        self._subscribe()
         
     def _setupUI(self):
         """Configure l'interface compacte"""
@@ -365,28 +352,29 @@ class CompactSystemMonitor(QWidget):
             }}
         """)
         
-    def _setupTimer(self):
-        """Configure le timer de mise à jour"""
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self._updateMetrics)
-        self.update_timer.start(2000)  # Mise à jour toutes les 2 secondes
+    def _subscribe(self):
+        """Abonne le moniteur aux instantanés de la télémétrie"""
+        self.snapshot_received.connect(self._updateMetrics)
+        callback = telemetry.subscribe(self.snapshot_received.emit)
+        self.destroyed.connect(lambda: telemetry.unsubscribe(callback))
+        self._updateMetrics(telemetry.latest())
         
-    def _updateMetrics(self):
+    def _updateMetrics(self, snapshot: TelemetrySnapshot):
         """Met à jour les métriques compactes"""
         try:
             # CPU
-            cpu_percent = psutil.cpu_percent(interval=None)
-            self.cpu_label.setText(f"CPU: {cpu_percent:.0f}%")
-            self._updateLabelColor(self.cpu_label, cpu_percent)
+            if snapshot.cpu_percent is not None:
+                self.cpu_label.setText(f"CPU: {snapshot.cpu_percent:.0f}%")
+                self._updateLabelColor(self.cpu_label, snapshot.cpu_percent)
             
             # RAM
-            memory = psutil.virtual_memory()
-            self.ram_label.setText(f"RAM: {memory.percent:.0f}%")
-            self._updateLabelColor(self.ram_label, memory.percent)
+            if snapshot.ram_percent is not None:
+                self.ram_label.setText(f"RAM: {snapshot.ram_percent:.0f}%")
+                self._updateLabelColor(self.ram_label, snapshot.ram_percent)
             
             # GPU
             if self.gpu_available:
-                gpu_info = gpu_manager.get_gpu_info()
+                gpu_info = snapshot.gpu
                 if gpu_info:
                     self.gpu_label.setText(f"GPU: {gpu_info.utilization_gpu:.0f}%")
                     self._updateLabelColor(self.gpu_label, gpu_info.utilization_gpu)
@@ -19,7 +19,7 @@ from PySide6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QHeaderView, QCheckBox, QSpinBox,
     QDateTimeEdit, QGroupBox, QTabWidget, QProgressBar, QSystemTrayIcon,
     QMenu, QMessageBox, QFileDialog, QFrame, QScrollArea, QGridLayout,
-    QInputDialog, QSpacerItem, QSizePolicy
+    QInputDialog, QSpacerItem, QSizePolicy, QProgressDialog
 )
 from PySide6.QtCore import (
     QTimer, Qt, QThread, Signal, QDateTime, QSize, QPropertyAnimation,
@@ -36,6 +36,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 
 from tools.advanced_logging import LogManager, LogEntry, LogLevel, get_log_manager
 
+# Id de l'entrée en base, porté par la cellule horodatage : ordre réel des logs quel que soit le tri affiché
+LOG_ID_ROLE = int(Qt.ItemDataRole.UserRole) + 1
+
 # Configuration des couleurs - reprend le thème du GUI principal
 COLOR_PALETTE = {
     'bg_primary': '#0f0f0f',       # Noir très profond
@@ -419,6 +422,7 @@ class EnhancedLogTable(QTableWidget):
         # Timestamp
         timestamp_item = QTableWidgetItem(entry.timestamp.strftime("%Y-%m-%d %H:%M:%S"))
         timestamp_item.setForeground(QColor(COLOR_PALETTE['text_secondary']))
+        timestamp_item.setData(LOG_ID_ROLE, entry.id)
         self.setItem(row, 0, timestamp_item)
         
         # Level avec couleur et icône
@@ -477,6 +481,34 @@ class EnhancedLogTable(QTableWidget):
         # Un seul scroll à la fin
         self.scrollToBottom()
 
+    def append_logs(self, logs: List[LogEntry], max_rows: int, auto_scroll: bool = True):
+        """Ajoute en bas les nouveaux logs (ordre chronologique) en gardant au plus max_rows lignes"""
+        if not logs:
+            return
+        self.setSortingEnabled(False)
+        for log in logs:
+            self.add_log_entry(log, auto_scroll=False)
+        # Les logs les plus anciens sortent, même si la vue est triée par colonne
+        self._trim_oldest(max_rows)
+        self.setSortingEnabled(True)
+        if auto_scroll:
+            self.scrollToBottom()
+
+    def _trim_oldest(self, max_rows: int):
+        """Retire les lignes des logs les plus anciens (plus petits ids), quel que soit le tri"""
+        excess = self.rowCount() - max_rows
+        if excess <= 0:
+            return
+        oldest = sorted(range(self.rowCount()), key=self._row_log_id)[:excess]
+        # Suppression de bas en haut : les indices des lignes restantes ne bougent pas
+        for row in sorted(oldest, reverse=True):
+            self.removeRow(row)
+
+    def _row_log_id(self, row: int) -> int:
+        item = self.item(row, 0)
+        log_id = item.data(LOG_ID_ROLE) if item is not None else None
+        return log_id if log_id is not None else 0
+
 class FilterPanel(QWidget):
     """Panel de filtrage moderne"""
     
@@ -527,7 +559,9 @@ class FilterPanel(QWidget):
         self.end_date = QDateTimeEdit()
         self.end_date.setDateTime(QDateTime.currentDateTime())
         self.end_date.setCalendarPopup(True)
-        self.end_date.dateTimeChanged.connect(self.filter_changed)
+        # Borne de fin ignorée tant qu'elle n'a pas été choisie (suivi des nouveaux logs)
+        self.end_date_set = False
+        self.end_date.dateTimeChanged.connect(self._on_end_date_changed)
         filter_layout.addWidget(self.end_date, 4, 1)
         
         # Limite
@@ -562,6 +596,10 @@ class FilterPanel(QWidget):
         
         layout.addStretch()
         
+    def _on_end_date_changed(self):
+        self.end_date_set = True
+        self.filter_changed.emit()
+        
     def get_filter_params(self):
         """Retourne les paramètres de filtrage"""
         level_text = self.level_combo.currentText()
@@ -575,7 +613,7 @@ class FilterPanel(QWidget):
             'level_filter': level_filter,
             'search_term': self.search_edit.text() or None,
             'start_date': self.start_date.dateTime().toPython(),
-            'end_date': self.end_date.dateTime().toPython(),
+            'end_date': self.end_date.dateTime().toPython() if self.end_date_set else None,
             'logger_filter': logger_filter
         }
     
@@ -654,6 +692,10 @@ class EnhancedLogViewer(QMainWindow):
                 # Gestionnaire par défaut si échec
                 self.log_manager = LogManager(db_path)
         
+        # Dernier id affiché : le timer ne lit que les entrées suivantes
+        self.last_log_id = 0
+        self.loggers = set()
+        
         self.setup_ui()
         self.setup_connections()
         self.setup_timers()
@@ -769,6 +811,10 @@ class EnhancedLogViewer(QMainWindow):
         
     def setup_timers(self):
         """Configure les timers"""
+        self.tail_timer = QTimer()
+        self.tail_timer.timeout.connect(self.tail_logs)
+        self.tail_timer.start(5000)
+        
         self.stats_timer = QTimer()
         self.stats_timer.timeout.connect(self.update_stats)
         self.stats_timer.start(5000)
@@ -788,51 +834,85 @@ class EnhancedLogViewer(QMainWindow):
             # Met à jour le texte
             self.update_text_view(logs)
             
+            if logs:
+                self.last_log_id = logs[0].id
+            elif self.log_manager and self.log_manager.log_db:
+                self.last_log_id = self.log_manager.log_db.get_last_id()
+            
             # Met à jour les loggers
-            loggers = list(set(log.logger_name for log in logs))
-            self.filter_panel.update_loggers(loggers)
+            self.loggers = set(log.logger_name for log in logs)
+            self.filter_panel.update_loggers(list(self.loggers))
             
             self.statusBar().showMessage(f"✨ {len(logs)} logs chargés")
             
         except Exception as e:
             QMessageBox.warning(self, "Erreur", f"Erreur lors du chargement: {e}")
+
+    def tail_logs(self):
+        """Ajoute uniquement les logs arrivés depuis le dernier chargement"""
+        if not (self.log_manager and self.log_manager.log_db):
+            return
+        try:
+            filter_params = self.filter_panel.get_filter_params()
+            logs = self.log_manager.log_db.get_logs_since(self.last_log_id, **filter_params)
+            if not logs:
+                return
+            
+            auto_scroll = self.filter_panel.auto_scroll_cb.isChecked()
+            self.log_table.append_logs(logs, filter_params['limit'], auto_scroll=auto_scroll)
+            for log in logs:
+                self.log_text.append(self._format_text_line(log))
+            self.last_log_id = logs[-1].id
+            
+            new_loggers = {log.logger_name for log in logs} - self.loggers
+            if new_loggers:
+                self.loggers |= new_loggers
+                self.filter_panel.update_loggers(list(self.loggers))
+            
+            self.statusBar().showMessage(f"✨ {len(logs)} nouveaux logs ({self.log_table.rowCount()} affichés)")
+        except Exception as e:
+            print(f"Erreur suivi des logs: {e}")
             
     def update_text_view(self, logs: List[LogEntry]):
         """Met à jour la vue texte"""
         self.log_text.clear()
         
         for log in reversed(logs):
-            timestamp = log.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-            
-            # Couleurs par niveau
-            level_colors = {
-                'DEBUG': COLOR_PALETTE['neutral'],
-                'INFO': COLOR_PALETTE['accent_blue'], 
-                'WARNING': COLOR_PALETTE['warning'],
-                'ERROR': COLOR_PALETTE['error'],
-                'CRITICAL': COLOR_PALETTE['accent_purple']
-            }
-            
-            level_color = level_colors.get(log.level.value[0], COLOR_PALETTE['text_primary'])
-            
-            # Icônes
-            level_icons = {
-                'DEBUG': '🐛',
-                'INFO': 'ℹ️',
-                'WARNING': '⚠️', 
-                'ERROR': '❌',
-                'CRITICAL': '💥'
-            }
-            icon = level_icons.get(log.level.value[0], '📝')
-            
-            html_line = (
-                f"<span style='color: {COLOR_PALETTE['text_secondary']}'>[{timestamp}]</span> "
-                f"<span style='color: {level_color}; font-weight: bold'>{icon} {log.level.value[0]}</span> "
-                f"<span style='color: {COLOR_PALETTE['accent_green']}'>{log.logger_name}</span> - "
-                f"<span style='color: {COLOR_PALETTE['text_primary']}'>{log.message}</span>"
-            )
-            
-            self.log_text.append(html_line)
+            self.log_text.append(self._format_text_line(log))
+
+    def _format_text_line(self, log: LogEntry) -> str:
+        """Ligne HTML colorée d'une entrée pour la vue texte"""
+        timestamp = log.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        
+        # Couleurs par niveau
+        level_colors = {
+            'DEBUG': COLOR_PALETTE['neutral'],
+            'INFO': COLOR_PALETTE['accent_blue'], 
+            'WARNING': COLOR_PALETTE['warning'],
+            'ERROR': COLOR_PALETTE['error'],
+            'CRITICAL': COLOR_PALETTE['accent_purple']
+        }
+        
+        level_color = level_colors.get(log.level.value[0], COLOR_PALETTE['text_primary'])
+        
+        # Icônes
+        level_icons = {
+            'DEBUG': '🐛',
+            'INFO': 'ℹ️',
+            'WARNING': '⚠️', 
+            'ERROR': '❌',
+            'CRITICAL': '💥'
+        }
+        icon = level_icons.get(log.level.value[0], '📝')
+        
+        html_line = (
+            f"<span style='color: {COLOR_PALETTE['text_secondary']}'>[{timestamp}]</span> "
+            f"<span style='color: {level_color}; font-weight: bold'>{icon} {log.level.value[0]}</span> "
+            f"<span style='color: {COLOR_PALETTE['accent_green']}'>{log.logger_name}</span> - "
+            f"<span style='color: {COLOR_PALETTE['text_primary']}'>{log.message}</span>"
+        )
+        
+        return html_line
             
     def update_stats(self):
         """Met à jour les statistiques"""
@@ -855,38 +935,52 @@ class EnhancedLogViewer(QMainWindow):
         
     def export_logs(self):
         """Exporte les logs"""
-        file_path, _ = QFileDialog.getSaveFileName(
+        file_path, selected_filter = QFileDialog.getSaveFileName(
             self,
             "Exporter les logs",
             f"kira_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-            "JSON (*.json);;CSV (*.csv);;Texte (*.txt)"
+            "JSON (*.json);;NDJSON (*.ndjson);;NDJSON compressé (*.ndjson.gz);;CSV (*.csv);;Texte (*.txt)"
         )
         
         if file_path:
             try:
+                if not (self.log_manager and hasattr(self.log_manager, 'log_db') and self.log_manager.log_db):
+                    return
+                
+                format_type = {"JSON": "json", "NDJSON": "ndjson", "CSV": "csv", "Texte": "txt"}.get(
+                    selected_filter.split(" ", 1)[0], "json"
+                )
+                # Toute la plage filtrée, écrite par blocs depuis un thread d'export
                 filter_params = self.filter_panel.get_filter_params()
-                if self.log_manager and hasattr(self.log_manager, 'log_db') and self.log_manager.log_db:
-                    logs = self.log_manager.log_db.get_logs(**filter_params)
-                else:
-                    logs = []  # Liste vide si pas de log_db
+                filter_params.pop('limit', None)
+                job = self.log_manager.start_export(
+                    file_path, format_type, compress=selected_filter.startswith("NDJSON compressé") or None,
+                    **filter_params
+                )
+                
+                progress = QProgressDialog("💾 Export des logs…", "Annuler", 0, 100, self)
+                progress.setMinimumDuration(300)
+                progress.canceled.connect(job.cancel)
+                if not job.total:
+                    progress.setRange(0, 0)
                 
-                # Export simple en JSON
-                import json
-                data = []
-                for log in logs:
-                    data.append({
-                        'timestamp': log.timestamp.isoformat(),
-                        'level': log.level.value[0],
-                        'logger': log.logger_name,
-                        'message': log.message,
-                        'module': log.module,
-                        'function': log.function
-                    })
+                self.export_timer = QTimer(self)
                 
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                def poll():
+                    if not job.is_done():
+                        if job.total:
+                            progress.setValue(int(job.progress() * 100))
+                        progress.setLabelText(f"💾 Export des logs… {job.written:,} entrées")
+                        return
+                    self.export_timer.stop()
+                    progress.reset()
+                    if job.success:
+                        QMessageBox.information(self, "Succès", f"✅ Logs exportés vers:\n{file_path}")
+                    elif not job.cancelled:
+                        QMessageBox.critical(self, "Erreur", f"❌ Erreur export: {job.error}")
                 
-                QMessageBox.information(self, "Succès", f"✅ Logs exportés vers:\n{file_path}")
+                self.export_timer.timeout.connect(poll)
+                self.export_timer.start(200)
                 
             except Exception as e:
                 QMessageBox.critical(self, "Erreur", f"❌ Erreur export: {e}")
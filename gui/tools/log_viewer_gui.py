@@ -11,6 +11,7 @@ import json
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict
 import threading
+from collections import deque
 from queue import Empty
 
 from PySide6.QtWidgets import (
@@ -19,7 +20,7 @@ from PySide6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QHeaderView, QCheckBox, QSpinBox,
     QDateTimeEdit, QGroupBox, QTabWidget, QProgressBar, QSystemTrayIcon,
     QMenu, QMessageBox, QFileDialog, QFrame, QScrollArea, QGridLayout,
-    QInputDialog, QSpacerItem, QSizePolicy
+    QInputDialog, QSpacerItem, QSizePolicy, QProgressDialog
 )
 from PySide6.QtCore import (
     QTimer, Qt, QThread, Signal, QDateTime, QSize, QPropertyAnimation,
@@ -36,6 +37,9 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 
 from tools.advanced_logging import LogManager, LogEntry, LogLevel, get_log_manager
 
+# Id de l'entrée en base, porté par la cellule horodatage : ordre réel des logs quel que soit le tri affiché
+LOG_ID_ROLE = int(Qt.ItemDataRole.UserRole) + 1
+
 # Configuration des couleurs - thème moderne Kira-Bot
 COLOR_PALETTE = {
     'bg_primary': '#0f0f0f',       # Noir très profond
@@ -369,14 +373,16 @@ class LogTableWidget(QTableWidget):
         header.setSectionResizeMode(4, QHeaderView.ResizeMode.ResizeToContents)  # Module
         header.setSectionResizeMode(5, QHeaderView.ResizeMode.ResizeToContents)  # Function
         
-    def add_log_entry(self, entry: LogEntry):
-        """Ajoute une entrée de log à la table"""
-        row = self.rowCount()
+    def add_log_entry(self, entry: LogEntry, row: Optional[int] = None):
+        """Ajoute une entrée de log à la table (en fin de table par défaut)"""
+        if row is None:
+            row = self.rowCount()
         self.insertRow(row)
         
         # Timestamp
         timestamp_item = QTableWidgetItem(entry.timestamp.strftime("%Y-%m-%d %H:%M:%S"))
         timestamp_item.setData(Qt.ItemDataRole.UserRole, entry.timestamp)
+        timestamp_item.setData(LOG_ID_ROLE, entry.id)
         self.setItem(row, 0, timestamp_item)
         
         # Level avec couleur
@@ -403,20 +409,54 @@ class LogTableWidget(QTableWidget):
         function_item = QTableWidgetItem(entry.function)
         self.setItem(row, 5, function_item)
         
-        # Scroll vers le bas si auto-scroll activé
-        parent = self.parent()
-        if hasattr(parent, 'auto_scroll_enabled') and getattr(parent, 'auto_scroll_enabled', False):
-            self.scrollToBottom()
     
     def clear_logs(self):
         """Efface tous les logs de la table"""
         self.setRowCount(0)
     
     def update_logs(self, logs: List[LogEntry]):
-        """Met à jour la table avec une liste de logs"""
+        """Met à jour la table avec une liste de logs (du plus récent au plus ancien)"""
         self.clear_logs()
-        for log in reversed(logs):  # Plus récents en haut
+        self.append_logs(list(reversed(logs)))  # Plus récents en bas
+
+    def append_logs(self, logs: List[LogEntry], max_rows: Optional[int] = None):
+        """Ajoute en bas les nouveaux logs (ordre chronologique) sans repeindre la table"""
+        if not logs:
+            return
+        # Le tri est suspendu pendant l'insertion : sinon chaque ligne déclenche un tri complet
+        self.setSortingEnabled(False)
+        for log in logs:
             self.add_log_entry(log)
+        # Fenêtre glissante : les logs les plus anciens sortent, même si la vue est triée par colonne
+        if max_rows is not None:
+            self._trim_oldest(max_rows)
+        self.setSortingEnabled(True)
+        if self.auto_scroll_enabled:
+            self.scrollToBottom()
+
+    def _trim_oldest(self, max_rows: int):
+        """Retire les lignes des logs les plus anciens (plus petits ids), quel que soit le tri"""
+        excess = self.rowCount() - max_rows
+        if excess <= 0:
+            return
+        oldest = sorted(range(self.rowCount()), key=self._row_log_id)[:excess]
+        # Suppression de bas en haut : les indices des lignes restantes ne bougent pas
+        for row in sorted(oldest, reverse=True):
+            self.removeRow(row)
+
+    def _row_log_id(self, row: int) -> int:
+        item = self.item(row, 0)
+        log_id = item.data(LOG_ID_ROLE) if item is not None else None
+        return log_id if log_id is not None else 0
+
+    def prepend_logs(self, logs: List[LogEntry]):
+        """Insère en haut une page de logs plus anciens (du plus récent au plus ancien)"""
+        if not logs:
+            return
+        self.setSortingEnabled(False)
+        for log in logs:
+            self.add_log_entry(log, row=0)
+        self.setSortingEnabled(True)
 
 class LogStatsWidget(QWidget):
     """Widget pour afficher les statistiques des logs avec cartes modernes"""
@@ -542,7 +582,9 @@ class LogFilterWidget(QWidget):
         self.end_date.setDateTime(QDateTime.currentDateTime())
         self.end_date.setCalendarPopup(True)
         self.end_date.setDisplayFormat("dd/MM/yyyy hh:mm")
-        self.end_date.dateTimeChanged.connect(lambda: self.filter_changed.emit())
+        # La borne de fin n'est appliquée qu'une fois choisie : sinon le suivi en direct s'arrêterait à l'ouverture
+        self.end_date_set = False
+        self.end_date.dateTimeChanged.connect(self._on_end_date_changed)
         filter_layout.addWidget(self.end_date, 4, 1)
         
         # Limite d'entrées
@@ -596,6 +638,10 @@ class LogFilterWidget(QWidget):
         self.purge_btn.setFixedHeight(32)
         buttons_layout.addWidget(self.purge_btn, 1, 1)
         
+        self.older_btn = QPushButton("⏪ Plus anciens")
+        self.older_btn.setFixedHeight(32)
+        buttons_layout.addWidget(self.older_btn, 2, 0, 1, 2)
+        
         layout.addWidget(action_group)
         
         # Options
@@ -614,26 +660,31 @@ class LogFilterWidget(QWidget):
         # Spacer pour pousser le contenu vers le haut
         layout.addStretch(1)
         
+    def _on_end_date_changed(self):
+        self.end_date_set = True
+        self.filter_changed.emit()
+        
     def get_filter_params(self) -> Dict:
-        """Récupère les paramètres de filtrage"""
+        """Récupère les paramètres de filtrage (noms attendus par LogDatabase.get_logs)"""
         params = {
             'limit': self.limit_spin.value(),
-            'start_date': self.start_date.dateTime().toPython(),
-            'end_date': self.end_date.dateTime().toPython()
+            'start_date': self.start_date.dateTime().toPython()
         }
+        if self.end_date_set:
+            params['end_date'] = self.end_date.dateTime().toPython()
         
         # Filtre par niveau
         if self.level_combo.currentText() != "Tous":
-            params['level'] = self.level_combo.currentText()
+            params['level_filter'] = [self.level_combo.currentText()]
             
         # Filtre par logger
         if self.logger_combo.currentText() != "Tous":
-            params['logger_name'] = self.logger_combo.currentText()
+            params['logger_filter'] = self.logger_combo.currentText()
             
         # Recherche dans le message
         search_text = self.search_edit.text().strip()
         if search_text:
-            params['message_contains'] = search_text
+            params['search_term'] = search_text
             
         return params
 
@@ -644,6 +695,9 @@ class LogViewerMainWindow(QMainWindow):
         super().__init__()
         self.log_manager = get_log_manager()
         self.auto_scroll_enabled = True
+        # Ids affichés (ordre chronologique) : suivi incrémental (> dernier) et pagination de l'historique (< premier)
+        self.displayed_ids: deque = deque()
+        self.last_log_id = 0
         
         if not self.log_manager:
             # Initialiser le LogManager si nécessaire
@@ -669,7 +723,7 @@ class LogViewerMainWindow(QMainWindow):
         self.setup_shortcuts()
         
         # Charge les logs initiaux
-        self.refresh_logs()
+        self.reload_logs()
         
     def setup_ui(self):
         """Configure l'interface utilisateur"""
@@ -756,12 +810,13 @@ class LogViewerMainWindow(QMainWindow):
     def setup_connections(self):
         """Configure les connexions de signaux"""
         # Filtres
-        self.filter_widget.filter_changed.connect(self.refresh_logs)
+        self.filter_widget.filter_changed.connect(self.reload_logs)
         
         # Boutons
         self.filter_widget.clear_btn.clicked.connect(self.clear_display)
         self.filter_widget.export_btn.clicked.connect(self.export_logs)
         self.filter_widget.purge_btn.clicked.connect(self.cleanup_logs)
+        self.filter_widget.older_btn.clicked.connect(self.load_older_logs)
         
         # Auto-scroll
         self.filter_widget.auto_scroll_cb.toggled.connect(self.set_auto_scroll)
@@ -771,7 +826,7 @@ class LogViewerMainWindow(QMainWindow):
         # Timer pour rafraîchir les logs automatiquement
         self.refresh_timer = QTimer()
         self.refresh_timer.timeout.connect(self.refresh_logs)
-        self.refresh_timer.start(5000)  # Rafraîchir toutes les 5 secondes
+        self.refresh_timer.start(5000)  # Nouveaux logs toutes les 5 secondes (lecture incrémentale)
         
         # Timer pour mettre à jour les statistiques
         self.stats_timer = QTimer()
@@ -813,7 +868,7 @@ class LogViewerMainWindow(QMainWindow):
         
         # F5: Actualiser les logs
         self.refresh_shortcut = QShortcut(QKeySequence("F5"), self)
-        self.refresh_shortcut.activated.connect(self.refresh_logs)
+        self.refresh_shortcut.activated.connect(self.reload_logs)
     
     def toggle_fullscreen(self):
         """Basculer entre plein écran et mode fenêtré"""
@@ -824,8 +879,8 @@ class LogViewerMainWindow(QMainWindow):
             self.showFullScreen()
             self.statusBar().showMessage("🖥️ Mode plein écran activé", 2000)
         
-    def refresh_logs(self):
-        """Rafraîchit l'affichage des logs"""
+    def reload_logs(self):
+        """Recharge entièrement l'affichage (ouverture, changement de filtres, F5)"""
         if not self.log_manager:
             return
         
@@ -838,14 +893,64 @@ class LogViewerMainWindow(QMainWindow):
             
             # Met à jour la table
             self.log_table.update_logs(logs)
+            # Sans filtre, les entrées futures commencent après le dernier id existant
+            self.displayed_ids = deque(log.id for log in reversed(logs))
+            self.last_log_id = logs[0].id if logs else self.log_manager.log_db.get_last_id()
+            
+            self._update_status()
+            
+        except Exception as e:
+            self.status_label.setText("🔴 Erreur")
+            self.statusBar().showMessage(f"Erreur lors du rafraîchissement: {e}")
+    
+    def refresh_logs(self):
+        """Ajoute uniquement les logs arrivés depuis le dernier rafraîchissement"""
+        if not self.log_manager:
+            return
+        
+        try:
+            filter_params = self.filter_widget.get_filter_params()
+            limit = filter_params['limit']
+            logs = self.log_manager.get_logs_since(self.last_log_id, **filter_params)
+            if not logs:
+                return
+            
+            self.log_table.append_logs(logs, max_rows=limit)
+            self.displayed_ids.extend(log.id for log in logs)
+            while len(self.displayed_ids) > limit:
+                self.displayed_ids.popleft()
+            self.last_log_id = logs[-1].id
             
-            # Met à jour le statut
-            self.status_label.setText(f"🟢 {len(logs)} logs affichés")
-            self.statusBar().showMessage(f"Dernière mise à jour: {datetime.now().strftime('%H:%M:%S')} - {len(logs)} entrées")
+            self._update_status()
             
         except Exception as e:
             self.status_label.setText("🔴 Erreur")
             self.statusBar().showMessage(f"Erreur lors du rafraîchissement: {e}")
+    
+    def load_older_logs(self):
+        """Charge la page précédente de l'historique (pagination par clé sur l'id)"""
+        if not self.log_manager or not self.displayed_ids:
+            return
+        
+        try:
+            filter_params = self.filter_widget.get_filter_params()
+            logs = self.log_manager.get_logs(before_id=self.displayed_ids[0], **filter_params)
+            if not logs:
+                self.statusBar().showMessage("Début de l'historique atteint", 3000)
+                return
+            
+            self.log_table.prepend_logs(logs)
+            self.displayed_ids.extendleft(log.id for log in logs)
+            self._update_status()
+            
+        except Exception as e:
+            self.status_label.setText("🔴 Erreur")
+            self.statusBar().showMessage(f"Erreur lors du chargement de l'historique: {e}")
+    
+    def _update_status(self):
+        count = self.log_table.rowCount()
+        self.status_label.setText(f"🟢 {count} logs affichés")
+        self.statusBar().showMessage(f"Dernière mise à jour: {datetime.now().strftime('%H:%M:%S')} - {count} entrées")
             
     def update_stats(self):
         """Met à jour les statistiques"""
@@ -866,6 +971,7 @@ class LogViewerMainWindow(QMainWindow):
     def clear_display(self):
         """Efface l'affichage"""
         self.log_table.clear_logs()
+        self.displayed_ids.clear()
         self.statusBar().showMessage("Affichage effacé")
     
     def export_logs(self):
@@ -878,7 +984,7 @@ class LogViewerMainWindow(QMainWindow):
             self,
             "Exporter les logs",
             f"kira_logs_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            "JSON (*.json);;CSV (*.csv);;Texte (*.txt)"
+            "NDJSON (*.ndjson);;NDJSON compressé (*.ndjson.gz);;JSON (*.json);;CSV (*.csv);;Texte (*.txt)"
         )
         
         if not file_path:
@@ -886,27 +992,58 @@ class LogViewerMainWindow(QMainWindow):
         
         try:
             # Détermine le format
-            if selected_filter.startswith("JSON"):
+            if selected_filter.startswith("NDJSON"):
+                format_type = "ndjson"
+            elif selected_filter.startswith("JSON"):
                 format_type = "json"
             elif selected_filter.startswith("CSV"):
                 format_type = "csv"
             else:
                 format_type = "txt"
             
-            # Récupère les paramètres de filtrage
+            # Récupère les paramètres de filtrage : toute la plage filtrée, pas seulement les lignes affichées
             filter_params = self.filter_widget.get_filter_params()
+            filter_params.pop('limit', None)
             
-            # Exporte
-            success = self.log_manager.export_logs(file_path, format_type, **filter_params)
-            
-            if success:
-                QMessageBox.information(self, "Succès", f"✅ Logs exportés vers:\n{file_path}")
-            else:
-                QMessageBox.warning(self, "Erreur", "❌ Erreur lors de l'export des logs")
+            # Export en arrière-plan : l'interface reste réactive
+            job = self.log_manager.start_export(
+                file_path, format_type, compress=selected_filter.startswith("NDJSON compressé") or None,
+                **filter_params
+            )
+            self._follow_export(job)
                 
         except Exception as e:
             QMessageBox.critical(self, "Erreur", f"❌ Erreur lors de l'export:\n{e}")
     
+    def _follow_export(self, job):
+        """Affiche la progression d'un export et permet de l'annuler"""
+        progress = QProgressDialog("💾 Export des logs…", "Annuler", 0, 100, self)
+        progress.setWindowTitle("Export des logs")
+        progress.setMinimumDuration(300)
+        progress.canceled.connect(job.cancel)
+        if not job.total:
+            progress.setRange(0, 0)  # Total inconnu : indicateur d'activité
+        
+        timer = QTimer(self)
+        
+        def poll():
+            if not job.is_done():
+                if job.total:
+                    progress.setValue(int(job.progress() * 100))
+                progress.setLabelText(f"💾 Export des logs… {job.written:,} entrées")
+                return
+            timer.stop()
+            progress.reset()
+            if job.success:
+                QMessageBox.information(self, "Succès", f"✅ {job.written:,} logs exportés vers:\n{job.filepath}")
+            elif job.cancelled:
+                self.statusBar().showMessage("Export annulé", 3000)
+            else:
+                QMessageBox.warning(self, "Erreur", f"❌ Erreur lors de l'export des logs:\n{job.error}")
+        
+        timer.timeout.connect(poll)
+        timer.start(200)
+    
     def cleanup_logs(self):
         """Nettoie les anciens logs selon le sélecteur de jours"""
         if not self.log_manager:
@@ -938,7 +1075,7 @@ class LogViewerMainWindow(QMainWindow):
                     f"✅ {deleted_count} entrées supprimées"
                 )
                 self.clear_display()
-                self.refresh_logs()
+                self.reload_logs()
             except Exception as e:
                 QMessageBox.critical(self, "Erreur", f"❌ Erreur lors de la purge:\n{e}")
     
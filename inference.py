@@ -0,0 +1,267 @@
+"""
+Ordonnanceur d'inférence mono-flux pour le modèle LLM
+Une seule génération à la fois sur le modèle (éventuellement un lot multi-séquences),
+file prioritaire avec équité par utilisateur
+"""
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from config import config, logger
+
+
+class InferenceQueueFull(Exception):
+    """La file d'inférence a atteint sa profondeur maximale"""
+
+
+class InferenceTimeout(Exception):
+    """La requête a dépassé son échéance avant ou pendant la génération"""
+
+
+@dataclass(order=True)
+class _InferenceRequest:
+    """Requête en attente dans la file (triée par priorité puis ordre d'arrivée)"""
+    priority: int
+    seq: int
+    user_id: str = field(compare=False)
+    prompt: str = field(compare=False)
+    kwargs: Dict[str, Any] = field(compare=False)
+    deadline: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    cancel_event: threading.Event = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    background: bool = field(default=False, compare=False)
+
+
+# Priorité des tâches de fond (résumés...) : toujours derrière les messages des utilisateurs
+BACKGROUND_PRIORITY = 1_000_000
+
+
+class InferenceScheduler:
+    """Worker d'inférence unique alimenté par une file prioritaire asyncio"""
+
+    def __init__(self, model_manager, max_queue: int = 8, timeout: float = 120.0, max_batch: int = 1):
+        self.model_manager = model_manager
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.max_batch = max(1, max_batch)
+
+        # Thread dédié : c'est toujours lui qui manipule l'instance Llama
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kira-inference")
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        self._seq = itertools.count()
+        self._pending_by_user: Dict[str, int] = {}
+        self._background_pending = 0
+        self._busy = False
+
+        # Métriques
+        self._wait_times = deque(maxlen=200)
+        self._service_times = deque(maxlen=200)
+        self.completed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.batches = 0
+        self.batched_requests = 0
+
+    def _ensure_worker(self):
+        """Démarre le worker sur la boucle asyncio courante si nécessaire"""
+        if self._worker_task is None or self._worker_task.done():
+            self._queue = asyncio.PriorityQueue()
+            self._pending_by_user.clear()
+            self._background_pending = 0
+            self._worker_task = asyncio.get_running_loop().create_task(self._worker())
+            logger.info(f"Worker d'inférence démarré (file max: {self.max_queue}, échéance: {self.timeout}s)")
+
+    def depth(self) -> int:
+        """Nombre de requêtes en attente (hors requête en cours)"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def is_idle(self) -> bool:
+        """Aucune génération en cours ni en attente"""
+        return not self._busy and self.depth() == 0
+
+    async def submit(self, user_id: str, prompt: str, timeout: Optional[float] = None,
+                     background: bool = False, **kwargs):
+        """
+        Place une génération dans la file et attend son résultat.
+        background=True : passe après toutes les requêtes utilisateur et ne garde pas d'état KV.
+        """
+        self._ensure_worker()
+
+        # Les tâches de fond ne comptent pas dans la profondeur vue par les utilisateurs :
+        # elles sont refusées en premier, jamais les messages
+        depth = self.depth() if background else self.depth() - self._background_pending
+        if depth >= self.max_queue:
+            self.rejected += 1
+            logger.warning(f"File d'inférence pleine ({self.max_queue}) - requête de {user_id} refusée")
+            raise InferenceQueueFull(f"File d'inférence pleine ({self.max_queue} requêtes)")
+
+        timeout = timeout if timeout is not None else self.timeout
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+
+        # Équité : un utilisateur qui a déjà des requêtes en attente passe derrière les autres
+        pending = self._pending_by_user.get(user_id, 0)
+        self._pending_by_user[user_id] = pending + 1
+
+        request = _InferenceRequest(
+            priority=BACKGROUND_PRIORITY + pending if background else pending,
+            seq=next(self._seq),
+            user_id=user_id,
+            prompt=prompt,
+            kwargs=kwargs,
+            deadline=now + timeout,
+            future=loop.create_future(),
+            cancel_event=threading.Event(),
+            enqueued_at=now,
+            background=background,
+        )
+        request.future.add_done_callback(lambda _: request.cancel_event.set())
+        if background:
+            self._background_pending += 1
+        await self._queue.put(request)
+
+        try:
+            return await asyncio.wait_for(request.future, timeout=timeout)
+        except asyncio.TimeoutError:
+            self.expired += 1
+            logger.warning(f"Échéance dépassée pour la requête de {user_id} ({timeout:.0f}s)")
+            raise InferenceTimeout(f"Échéance de {timeout:.0f}s dépassée")
+
+    async def _worker(self):
+        """Boucle du worker : traite la requête suivante et les requêtes déjà en attente par lot"""
+        loop = asyncio.get_running_loop()
+        while True:
+            requests = [await self._queue.get()]
+            # Regroupe les requêtes déjà en file (sans attendre) jusqu'à la taille de lot maximale
+            while len(requests) < self.max_batch and not self._queue.empty():
+                requests.append(self._queue.get_nowait())
+
+            try:
+                live = []
+                started = time.monotonic()
+                for request in requests:
+                    self._release_slot(request.user_id)
+                    if request.background:
+                        self._background_pending -= 1
+                    if request.future.done():
+                        # Annulée ou expirée côté appelant pendant l'attente
+                        continue
+                    self._wait_times.append(started - request.enqueued_at)
+                    if started >= request.deadline:
+                        request.future.set_exception(InferenceTimeout("Échéance dépassée dans la file"))
+                        continue
+                    live.append(request)
+
+                if live:
+                    await self._run(loop, live, started)
+            except Exception as e:
+                logger.error(f"Erreur dans le worker d'inférence: {e}", exc_info=True)
+            finally:
+                for _ in requests:
+                    self._queue.task_done()
+
+    async def _run(self, loop, requests, started: float):
+        """Exécute une requête seule ou un lot sur le thread d'inférence"""
+        def make_should_stop(req):
+            return lambda: req.cancel_event.is_set() or time.monotonic() >= req.deadline
+
+        self._busy = True
+        try:
+            if len(requests) == 1:
+                request = requests[0]
+                try:
+                    result = await loop.run_in_executor(
+                        self._executor,
+                        lambda: self.model_manager.complete(
+                            request.prompt,
+                            user_id=None if request.background else request.user_id,
+                            should_stop=make_should_stop(request),
+                            **request.kwargs
+                        )
+                    )
+                    results = [result]
+                except Exception as e:
+                    results = [e]
+            else:
+                items = []
+                for request in requests:
+                    kwargs = dict(request.kwargs)
+                    items.append({
+                        'prompt': request.prompt,
+                        'user_id': None if request.background else request.user_id,
+                        'on_token': kwargs.pop('on_token', None),
+                        'should_stop': make_should_stop(request),
+                        'kwargs': kwargs,
+                    })
+                try:
+                    results = await loop.run_in_executor(
+                        self._executor,
+                        lambda: self.model_manager.complete_batch(items)
+                    )
+                except Exception as e:
+                    results = [e] * len(requests)
+                self.batches += 1
+                self.batched_requests += len(requests)
+
+            for request, result in zip(requests, results):
+                if request.future.done():
+                    continue
+                if isinstance(result, Exception):
+                    request.future.set_exception(result)
+                else:
+                    request.future.set_result(result)
+        finally:
+            self._busy = False
+            self._service_times.append(time.monotonic() - started)
+            self.completed += len(requests)
+
+    def _release_slot(self, user_id: str):
+        remaining = self._pending_by_user.get(user_id, 0) - 1
+        if remaining > 0:
+            self._pending_by_user[user_id] = remaining
+        else:
+            self._pending_by_user.pop(user_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques de la file pour !stats"""
+        def _avg(values):
+            return sum(values) / len(values) if values else 0.0
+
+        def _p95(values):
+            if not values:
+                return 0.0
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+        waits = list(self._wait_times)
+        services = list(self._service_times)
+        return {
+            'depth': self.depth(),
+            'max_depth': self.max_queue,
+            'busy': self._busy,
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'expired': self.expired,
+            'avg_wait_s': _avg(waits),
+            'p95_wait_s': _p95(waits),
+            'avg_service_s': _avg(services),
+            'p95_service_s': _p95(services),
+            'batches': self.batches,
+            'avg_batch_size': self.batched_requests / self.batches if self.batches else 0.0,
+        }
+
+
+def create_scheduler(model_manager) -> InferenceScheduler:
+    """Crée l'ordonnanceur à partir de la configuration"""
+    return InferenceScheduler(
+        model_manager,
+        max_queue=config.INFERENCE_MAX_QUEUE,
+        timeout=config.INFERENCE_TIMEOUT,
+        max_batch=config.BATCH_MAX_SEQUENCES if config.BATCH_DECODING else 1,
+    )
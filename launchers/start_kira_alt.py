@@ -51,7 +51,6 @@ def check_requirements():
         'pynvml': 'pynvml',
         'aiohttp': 'aiohttp',
         'selectolax': 'selectolax',
-        'transformers': 'transformers',
         'pyotp': 'pyotp'
     }
     
@@ -1,5 +1,10 @@
 import json
-from database import get_db_connection
+import re
+import threading
+from collections import OrderedDict, deque
+from database import get_db_connection, db_manager, db_writer, run_read
+from utils import count_tokens
+from semantic_memory import semantic_index
 from config import config, logger
 
 # --- Réponse automatique ---
@@ -30,18 +35,180 @@ auto_reply_enabled = load_auto_reply()
 
 
 
+# --- Notifications d'écriture (compteurs de !stats...) ---
+_write_listeners = []
+
+def add_write_listener(callback):
+    """Enregistre une fonction appelée (sans argument) après chaque écriture de la mémoire"""
+    _write_listeners.append(callback)
+
+def notify_memory_write():
+    for callback in _write_listeners:
+        try:
+            callback()
+        except Exception as e:
+            logger.debug(f"Listener d'écriture en erreur: {e}")
+
+# --- Cache chaud de l'historique récent ---
+class HistoryCache:
+    """
+    Derniers échanges par utilisateur en mémoire (deque bornée par utilisateur),
+    avec un plafond global en octets et éviction LRU entre utilisateurs
+    """
+
+    def __init__(self, turns_per_user: int, max_bytes: int):
+        self.turns_per_user = turns_per_user
+        self.max_bytes = max_bytes
+        self._users = OrderedDict()  # user_id -> deque[(user_input, bot_response)]
+        self._bytes = {}
+        self._total_bytes = 0
+        # Génération globale des écritures : un chargement concurrent à une écriture n'est pas mis en cache.
+        # La dernière écriture par utilisateur n'est retenue que pendant qu'un chargement est en cours.
+        self._generation = 0
+        self._last_write = {}
+        self._cleared_at = 0
+        self._loading = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(turn) -> int:
+        return len(turn[0]) + len(turn[1]) + 64
+
+    def get(self, user_id: str, limit: int):
+        """Retourne les `limit` derniers échanges, ou None si l'utilisateur n'est pas en cache"""
+        if limit > self.turns_per_user:
+            return None
+        with self._lock:
+            turns = self._users.get(user_id)
+            if turns is None:
+                self.misses += 1
+                return None
+            self._users.move_to_end(user_id)
+            self.hits += 1
+            if limit <= 0:
+                return []
+            return list(turns)[-limit:]
+
+    def begin_load(self) -> int:
+        """Début d'une lecture en base ; le jeton retourné doit être rendu à load()"""
+        with self._lock:
+            self._loading += 1
+            return self._generation
+
+    def load(self, user_id: str, rows: list, seq: int):
+        """Installe l'historique lu en base si aucune écriture n'a eu lieu depuis `seq` (rows None : abandon)"""
+        with self._lock:
+            self._loading -= 1
+            stale = max(self._last_write.get(user_id, 0), self._cleared_at) > seq
+            if not self._loading:
+                # Plus aucun chargement en vol : l'historique des écritures n'est plus utile
+                self._last_write.clear()
+            if rows is None or stale or user_id in self._users:
+                return
+            turns = deque(rows[-self.turns_per_user:], maxlen=self.turns_per_user)
+            self._users[user_id] = turns
+            self._bytes[user_id] = sum(self._size(t) for t in turns)
+            self._total_bytes += self._bytes[user_id]
+            self._evict()
+
+    def append(self, user_id: str, user_input: str, bot_response: str):
+        """Ajoute un échange pour un utilisateur déjà en cache"""
+        with self._lock:
+            self._mark_write(user_id)
+            turns = self._users.get(user_id)
+            if turns is None:
+                return
+            turn = (user_input, bot_response)
+            delta = self._size(turn)
+            if len(turns) == turns.maxlen:
+                delta -= self._size(turns[0])
+            turns.append(turn)
+            self._bytes[user_id] += delta
+            self._total_bytes += delta
+            self._users.move_to_end(user_id)
+            self._evict()
+
+    def invalidate(self, user_id: str = None):
+        """Oublie un utilisateur, ou tout le cache si user_id est None"""
+        with self._lock:
+            if user_id is None:
+                self._generation += 1
+                self._cleared_at = self._generation
+                self._last_write.clear()
+                self._users.clear()
+                self._bytes.clear()
+                self._total_bytes = 0
+                return
+            self._mark_write(user_id)
+            if self._users.pop(user_id, None) is not None:
+                self._total_bytes -= self._bytes.pop(user_id)
+
+    def _mark_write(self, user_id: str):
+        self._generation += 1
+        if self._loading:
+            self._last_write[user_id] = self._generation
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._users) > 1:
+            user_id, _ = self._users.popitem(last=False)
+            self._total_bytes -= self._bytes.pop(user_id)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self._users),
+                'bytes': self._total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+history_cache = HistoryCache(config.HISTORY_CACHE_TURNS, config.HISTORY_CACHE_MB * 1024 * 1024)
+
+def _fetch_history(user_id: str, limit: int) -> list:
+    """Lit les derniers échanges en base (ordre chronologique)"""
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT user_input, bot_response FROM memory
+            WHERE user_id = ? ORDER BY id DESC LIMIT ?
+        """, (user_id, limit))
+        rows = cursor.fetchall()
+        logger.debug(f"Historique récupéré pour {user_id}: {len(rows)} entrées")
+        return list(reversed(rows))
+
+def _flush_pending_writes():
+    if db_writer.pending():
+        db_writer.flush(timeout=5.0)
+
 def get_history(user_id: str, limit: int = 10) -> list:
     """Récupère l'historique des conversations pour un utilisateur"""
+    cached = history_cache.get(user_id, limit)
+    if cached is not None:
+        return cached
+    return _load_history(user_id, limit)
+
+def _load_history(user_id: str, limit: int) -> list:
+    """Lecture en base après un défaut de cache, puis remplissage du cache"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT user_input, bot_response FROM memory
-                WHERE user_id = ? ORDER BY id DESC LIMIT ?
-            """, (user_id, limit))
-            rows = cursor.fetchall()
-            logger.debug(f"Historique récupéré pour {user_id}: {len(rows)} entrées")
-            return list(reversed(rows))
+        if limit > history_cache.turns_per_user:
+            # Fenêtre plus large que le cache : lecture directe, après les interactions encore en file
+            _flush_pending_writes()
+            return _fetch_history(user_id, limit)
+        seq = history_cache.begin_load()
+        rows = None
+        try:
+            # Les interactions encore en file doivent être visibles avant de remplir le cache
+            _flush_pending_writes()
+            rows = _fetch_history(user_id, history_cache.turns_per_user)
+        finally:
+            history_cache.load(user_id, rows, seq)
+        return rows[-limit:] if limit > 0 else []
     except Exception as e:
         logger.error(f"Erreur lors de la récupération de l'historique pour {user_id}: {e}")
         return []
@@ -68,21 +235,126 @@ def save_interaction(user_id: str, user_input: str, bot_response: str):
                 VALUES (?, ?, ?)
             """, (user_id, user_input, bot_response))
             conn.commit()
+            history_cache.append(user_id, user_input, bot_response)
+            semantic_index.notify()
+            notify_memory_write()
             logger.debug(f"Interaction sauvegardée pour {user_id}")
     except Exception as e:
         logger.error(f"Erreur lors de la sauvegarde de l'interaction pour {user_id}: {e}")
         raise
 
+def queue_interaction(user_id: str, user_input: str, bot_response: str):
+    """
+    Sauvegarde différée d'une interaction (ne bloque pas la boucle asyncio).
+    Retourne un Future résolu une fois la transaction validée par le thread écrivain.
+    """
+    history_cache.append(user_id, user_input, bot_response)
+    future = db_writer.submit("""
+        INSERT INTO memory (user_id, user_input, bot_response)
+        VALUES (?, ?, ?)
+    """, (user_id, user_input, bot_response))
+
+    def _on_done(f):
+        if f.exception() is not None:
+            logger.error(f"Erreur lors de la sauvegarde différée de l'interaction pour {user_id}: {f.exception()}")
+            # Le cache ne doit pas garder un échange absent de la base
+            history_cache.invalidate(user_id)
+        else:
+            logger.debug(f"Interaction sauvegardée pour {user_id}")
+            semantic_index.notify()
+            notify_memory_write()
+
+    future.add_done_callback(_on_done)
+    return future
+
+async def aget_history(user_id: str, limit: int = 10) -> list:
+    """Version asynchrone de get_history (sans aller-retour de thread si l'utilisateur est en cache)"""
+    cached = history_cache.get(user_id, limit)
+    if cached is not None:
+        return cached
+    return await run_read(_load_history, user_id, limit)
+
+def get_memory_counters() -> dict:
+    """Compteurs maintenus par triggers (messages, utilisateurs, archivés) : lecture O(1)"""
+    try:
+        with get_db_connection() as conn:
+            return dict(conn.execute("SELECT key, value FROM memory_counters").fetchall())
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture des compteurs de la mémoire: {e}")
+        return {}
+
+# --- Résumés glissants ---
+_summary_cache = {}
+_summary_lock = threading.Lock()
+
+def get_summary(user_id: str):
+    """
+    Résumé des anciens échanges d'un utilisateur.
+    Retourne (résumé ou None, nombre d'échanges postérieurs au résumé).
+    """
+    try:
+        with _summary_lock:
+            cached = _summary_cache.get(user_id)
+        if cached is None:
+            with get_db_connection() as conn:
+                row = conn.execute(
+                    "SELECT summary, last_memory_id FROM memory_summaries WHERE user_id = ?", (user_id,)
+                ).fetchone()
+            cached = row if row is not None else (None, 0)
+            with _summary_lock:
+                _summary_cache[user_id] = cached
+        summary, last_memory_id = cached
+        if summary is None:
+            return None, 0
+        # Comptage borné par l'index (user_id, id)
+        with get_db_connection() as conn:
+            newer = conn.execute(
+                "SELECT COUNT(*) FROM memory WHERE user_id = ? AND id > ?", (user_id, last_memory_id)
+            ).fetchone()[0]
+        return summary, newer
+    except Exception as e:
+        logger.error(f"Erreur lors de la récupération du résumé pour {user_id}: {e}")
+        return None, 0
+
+async def aget_summary(user_id: str):
+    """Version asynchrone de get_summary (exécutée sur le pool de lecteurs)"""
+    return await run_read(get_summary, user_id)
+
+def save_summary(user_id: str, summary: str, last_memory_id: int):
+    """Enregistre le résumé des échanges jusqu'à last_memory_id inclus"""
+    db_writer.submit("""
+        INSERT OR REPLACE INTO memory_summaries (user_id, summary, last_memory_id, updated_at)
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+    """, (user_id, summary, last_memory_id)).result()
+    with _summary_lock:
+        _summary_cache[user_id] = (summary, last_memory_id)
+    logger.info(f"Résumé mis à jour pour {user_id} (jusqu'à l'échange {last_memory_id})")
+
+def _clear_summaries(user_id: str = None):
+    if user_id is None:
+        db_writer.submit("DELETE FROM memory_summaries").result()
+        with _summary_lock:
+            _summary_cache.clear()
+    else:
+        db_writer.submit("DELETE FROM memory_summaries WHERE user_id = ?", (user_id,)).result()
+        with _summary_lock:
+            _summary_cache.pop(user_id, None)
+
+async def aget_facts(user_id: str) -> list:
+    """Version asynchrone de get_facts (exécutée sur le pool de lecteurs)"""
+    return await run_read(get_facts, user_id)
+
 def clear_memory(user_id: str):
     """Efface la mémoire conversationnelle d'un utilisateur"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM memory WHERE user_id = ?", (user_id,))
-            deleted_count = cursor.rowcount
-            conn.commit()
-            logger.info(f"Mémoire effacée pour {user_id}: {deleted_count} entrées supprimées")
-            return deleted_count
+        # Passe par le thread écrivain pour effacer aussi les interactions encore en file
+        deleted_count = db_writer.submit("DELETE FROM memory WHERE user_id = ?", (user_id,)).result()
+        history_cache.invalidate(user_id)
+        semantic_index.forget(user_id)
+        _clear_summaries(user_id)
+        notify_memory_write()
+        logger.info(f"Mémoire effacée pour {user_id}: {deleted_count} entrées supprimées")
+        return deleted_count
     except Exception as e:
         logger.error(f"Erreur lors de l'effacement de la mémoire pour {user_id}: {e}")
         raise
@@ -90,13 +362,13 @@ def clear_memory(user_id: str):
 def clear_all_memory():
     """Efface toute la mémoire conversationnelle"""
     try:
-        with get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM memory")
-            deleted_count = cursor.rowcount
-            conn.commit()
-            logger.warning(f"Toute la mémoire effacée: {deleted_count} entrées supprimées")
-            return deleted_count
+        deleted_count = db_writer.submit("DELETE FROM memory").result()
+        history_cache.invalidate()
+        semantic_index.forget()
+        _clear_summaries()
+        notify_memory_write()
+        logger.warning(f"Toute la mémoire effacée: {deleted_count} entrées supprimées")
+        return deleted_count
     except Exception as e:
         logger.error(f"Erreur lors de l'effacement de toute la mémoire: {e}")
         raise
@@ -114,6 +386,87 @@ def get_facts(user_id: str) -> list:
         logger.error(f"Erreur lors de la récupération des faits pour {user_id}: {e}")
         return []
 
+_WORD_RE = re.compile(r"\w{3,}", re.UNICODE)
+_MAX_QUERY_TERMS = 32
+_facts_fts_available = None
+
+def _fts_query(prompt: str) -> str:
+    """
+    Requête FTS5 : termes du prompt reliés par OR, entre guillemets pour neutraliser la syntaxe,
+    en préfixe pour couvrir pluriels et conjugaisons (chat -> chats)
+    """
+    terms = []
+    for word in _WORD_RE.findall(prompt.lower()):
+        if word not in terms:
+            terms.append(word)
+        if len(terms) >= _MAX_QUERY_TERMS:
+            break
+    return " OR ".join(f'"{term}"*' for term in terms)
+
+def _rank_facts_fallback(facts: list, prompt: str) -> list:
+    """Classement sans FTS5 : nombre de mots du prompt présents dans le fait"""
+    terms = set(_WORD_RE.findall(prompt.lower()))
+    scored = []
+    for fact in facts:
+        overlap = len(terms & set(_WORD_RE.findall(fact.lower())))
+        if overlap:
+            scored.append((overlap, fact))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [fact for _, fact in scored]
+
+def get_relevant_facts(user_id: str, prompt: str, k: int = 8, token_budget: int = 256) -> list:
+    """
+    Faits les plus pertinents pour le prompt (BM25 via FTS5), complétés par les plus récents,
+    dans la limite de k faits et de token_budget tokens
+    """
+    global _facts_fts_available
+    try:
+        if _facts_fts_available is None:
+            _facts_fts_available = db_manager.has_table("facts_fts")
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            ranked = []
+            query = _fts_query(prompt)
+            if query and _facts_fts_available:
+                cursor.execute("""
+                    SELECT f.fact FROM facts_fts
+                    JOIN facts f ON f.id = facts_fts.rowid
+                    WHERE facts_fts MATCH ? AND f.user_id = ?
+                    ORDER BY bm25(facts_fts) LIMIT ?
+                """, (query, user_id, k))
+                ranked = [row[0] for row in cursor.fetchall()]
+
+            # Complète avec les faits les plus récents (ou classe en mode dégradé)
+            cursor.execute("SELECT fact FROM facts WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+                           (user_id, k if _facts_fts_available else -1))
+            recent = [row[0] for row in cursor.fetchall()]
+            if not _facts_fts_available:
+                ranked = _rank_facts_fallback(recent, prompt)
+
+        selected = []
+        used = 0
+        for fact in ranked + recent:
+            if fact in selected:
+                continue
+            if len(selected) >= k:
+                break
+            fact_tokens = count_tokens(f"- {fact}\n")
+            if used + fact_tokens > token_budget:
+                continue
+            selected.append(fact)
+            used += fact_tokens
+
+        logger.debug(f"Faits pertinents pour {user_id}: {len(selected)} retenus ({len(ranked)} correspondances, {used} tokens)")
+        return selected
+    except Exception as e:
+        logger.error(f"Erreur lors de la sélection des faits pour {user_id}: {e}")
+        return []
+
+async def aget_relevant_facts(user_id: str, prompt: str, k: int = 8, token_budget: int = 256) -> list:
+    """Version asynchrone de get_relevant_facts (exécutée sur le pool de lecteurs)"""
+    return await run_read(get_relevant_facts, user_id, prompt, k, token_budget)
+
 def clear_facts(user_id: str = None):
     """Efface les faits d'un utilisateur ou tous les faits"""
     try:
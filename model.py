@@ -1,30 +1,17 @@
-from llama_cpp import Llama
 from config import config, logger
-from utils import count_tokens, truncate_text_to_tokens, shorten_response
-from memory import save_interaction, get_history, get_facts
+from utils import count_tokens, bos_tokens, truncate_text_to_tokens, shorten_response, set_tokenizer
+from memory import queue_interaction, aget_history, aget_relevant_facts, aget_summary
+from inference import create_scheduler, InferenceQueueFull, InferenceTimeout
+from semantic_memory import semantic_index
 import time
 import os
 import asyncio
+import threading
+from collections import OrderedDict
 
-# S'assurer que nvml.dll est trouvable (Windows) AVANT d'importer pynvml
-try:
-    nvml_paths = [
-        r"C:\\Program Files\\NVIDIA Corporation\\NVSMI",
-        r"C:\\Windows\\System32",
-    ]
-    for _p in nvml_paths:
-        if os.path.isdir(_p) and _p not in os.environ.get("PATH", ""):
-            os.environ["PATH"] += os.pathsep + _p
-except Exception:
-    # Ne bloque pas si on ne peut pas modifier le PATH
-    pass
-
-# Import optionnel pour la détection GPU
-try:
-    import pynvml
-    NVIDIA_AVAILABLE = True
-except ImportError:
-    NVIDIA_AVAILABLE = False
+# Télémétrie matérielle partagée : NVML est initialisé une seule fois par gpu_utils
+from gpu_utils import NVIDIA_AVAILABLE
+from telemetry import telemetry
 
 
 # Import de l'optimiseur GPU avancé
@@ -188,6 +175,105 @@ LLM_PROFILES = {
     }
 }
 
+# Prompt système fixe de Kira (préfixe commun à toutes les requêtes, mis en cache KV)
+KIRA_PERSONA_PROMPT = (
+    "Tu es Kira , une IA française drôle, vive, légèrement sarcastique mais toujours attachante et gentille. "
+    "Tu parles de façon expressive, naturelle, parfois spontanée.\n"
+    "Tu ne cites jamais de sources ni de liens externes. Tu réponds toujours en français, même si la question est en anglais.\n"
+    "Tu évites les réponses plates ou génériques.\n"
+    "Si une information t'est donnée, utilise-la naturellement dans ta réponse sans dire que tu l'as trouvée ou recherchée.\n"
+    "Kira adore plaisanter, poser des questions en retour ou rebondir de manière surprenante."
+    "\n\n"
+)
+
+def _common_prefix_length(a, b) -> int:
+    """Longueur du préfixe commun entre deux séquences de tokens"""
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+class KVStateCache:
+    """Cache LRU des états llama.cpp par utilisateur, borné par un budget mémoire"""
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # user_id -> (tokens, state, size)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def _state_size(state) -> int:
+        size = getattr(state, 'llama_state_size', None)
+        if size is None:
+            try:
+                size = len(state.llama_state)
+            except Exception:
+                size = 0
+        return int(size)
+    
+    def get(self, key: str):
+        """Retourne (tokens, state) pour la clé et la marque comme récemment utilisée"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+    
+    def put(self, key: str, tokens, state):
+        """Enregistre l'état d'un utilisateur puis évince les entrées les plus anciennes"""
+        size = self._state_size(state)
+        if size > self.max_bytes:
+            logger.debug(f"État KV de {key} trop volumineux pour le cache ({size} octets)")
+            self.invalidate(key)
+            return
+        
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[2]
+            self._entries[key] = (list(tokens), state, size)
+            self._total_bytes += size
+            
+            while self._total_bytes > self.max_bytes and self._entries:
+                evicted_key, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self.evictions += 1
+                logger.debug(f"État KV évincé (LRU): {evicted_key}")
+    
+    def invalidate(self, key: str):
+        """Supprime l'état d'un utilisateur"""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old[2]
+    
+    def clear(self):
+        """Vide complètement le cache"""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+    
+    def stats(self):
+        """Retourne les statistiques du cache"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size_mb': self._total_bytes / (1024**2),
+                'max_mb': self.max_bytes / (1024**2),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
 class ModelManager:
     """Gestionnaire du modèle LLM avec configuration automatique optimisée"""
     
@@ -195,8 +281,71 @@ class ModelManager:
         self.llm = None
         self.current_profile = 'cpu_fallback'  # Valeur par défaut sûre
         self.gpu_info = None
-        self._detect_gpu_capabilities()
-        self._initialize_model()
+        # Cache KV du préfixe persona (évalué une seule fois par instance Llama)
+        self._llm_lock = threading.RLock()
+        self._persona_tokens = None
+        self._persona_state = None
+        self.prompt_cache_stats = {
+            'requests': 0,
+            'prompt_tokens': 0,
+            'reused_tokens': 0,
+            'persona_restores': 0,
+            'user_state_restores': 0,
+        }
+        # Cache KV des conversations par utilisateur (LRU borné en mémoire)
+        self.user_state_cache = KVStateCache(config.KV_STATE_CACHE_MB * 1024**2)
+        # Moteur multi-séquences créé à la demande (contexte llama.cpp dédié)
+        self._batch_engine = None
+        self._batch_engine_failed = False
+        # Chargement en arrière-plan (voir start_loading)
+        self.loading = False
+        self.swapping = False
+        # Garde non bloquante : un seul changement de profil à la fois
+        self._swap_lock = threading.Lock()
+        self.load_error = None
+        self.load_time = None
+        self._loaded_event = threading.Event()
+    
+    def load(self):
+        """Détecte le GPU et charge le modèle (bloquant)"""
+        self.loading = True
+        self.load_error = None
+        start = time.time()
+        try:
+            self._detect_gpu_capabilities()
+            self._initialize_model()
+            self.load_time = time.time() - start
+            logger.info(f"Modèle prêt en {self.load_time:.1f}s")
+        except Exception as e:
+            self.load_error = str(e)
+            logger.error(f"Échec du chargement du modèle: {e}")
+        finally:
+            self.loading = False
+            self._loaded_event.set()
+    
+    def start_loading(self):
+        """Lance le chargement du modèle dans un thread sans bloquer l'appelant"""
+        if self.loading or self.llm is not None:
+            return
+        self.loading = True
+        self._loaded_event.clear()
+        threading.Thread(target=self.load, name="kira-model-loader", daemon=True).start()
+        logger.info("Chargement du modèle lancé en arrière-plan")
+    
+    async def wait_until_loaded(self, timeout: float = None) -> bool:
+        """Attend la fin du chargement sans bloquer l'event loop. Retourne True si le modèle est prêt"""
+        await asyncio.to_thread(self._loaded_event.wait, timeout)
+        return self.is_ready()
+    
+    def get_status(self) -> str:
+        """État du modèle : 'ready', 'swapping', 'loading' ou 'error'"""
+        if self.swapping:
+            return 'swapping'
+        if self.is_ready():
+            return 'ready'
+        if self.loading:
+            return 'loading'
+        return 'error'
     
     def _detect_gpu_capabilities(self):
         """Détecte les capacités GPU et détermine la configuration optimale"""
@@ -206,29 +355,22 @@ class ModelManager:
             return
         
         try:
-            pynvml.nvmlInit()
-            handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-            
-            # Informations GPU
-            gpu_name = pynvml.nvmlDeviceGetName(handle)
-            if isinstance(gpu_name, bytes):
-                gpu_name = gpu_name.decode()
-            
-            mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-            vram_total_mb = int(mem_info.total) // (1024**2)
-            vram_free_mb = int(mem_info.free) // (1024**2)
-            vram_used_mb = int(mem_info.used) // (1024**2)
+            gpu = telemetry.latest().gpu
+            if gpu is None:
+                raise RuntimeError("aucune métrique GPU dans la télémétrie")
+            gpu_name = gpu.name
+            vram_total_mb = gpu.vram_total_mb
+            vram_free_mb = gpu.vram_free_mb
+            vram_used_mb = gpu.vram_used_mb
             
             self.gpu_info = {
                 'name': gpu_name,
                 'vram_total_mb': vram_total_mb,
                 'vram_free_mb': vram_free_mb,
                 'vram_used_mb': vram_used_mb,
-                'vram_usage_percent': (vram_used_mb / vram_total_mb) * 100
+                'vram_usage_percent': gpu.vram_usage_percent
             }
             
-            pynvml.nvmlShutdown()
-            
             # Sélection automatique du profil optimal
             self.current_profile = self._select_optimal_profile()
             
@@ -275,12 +417,14 @@ class ModelManager:
         # Si aucun profil ne convient, utiliser le profil d'urgence
         return 'emergency_safe'
     
-    def _get_llm_config(self):
-        """Récupère la configuration LLM pour le profil actuel"""
-        if self.current_profile is None:
-            self.current_profile = 'cpu_fallback'
+    def _get_llm_config(self, profile_key=None):
+        """Récupère la configuration LLM pour un profil (par défaut le profil actuel)"""
+        if profile_key is None:
+            if self.current_profile is None:
+                self.current_profile = 'cpu_fallback'
+            profile_key = self.current_profile
             
-        profile = LLM_PROFILES[self.current_profile].copy()
+        profile = LLM_PROFILES[profile_key].copy()
         
         # Supprimer les métadonnées pour ne garder que la config LLM
         config_keys = ['name', 'description', 'min_vram_free_mb']
@@ -289,56 +433,73 @@ class ModelManager:
         
         return profile
     
+    def _create_llm(self, profile_key, use_optimizer: bool = True):
+        """Crée une instance Llama pour un profil sans toucher à l'instance en service"""
+        # Import différé : le chargement de llama.cpp (et de CUDA) ne bloque pas l'import du module
+        from llama_cpp import Llama
+        
+        llm_config = self._get_llm_config(profile_key)
+        profile_name = LLM_PROFILES[profile_key]['name']
+        
+        logger.info(f"Initialisation du modèle: {config.MODEL_PATH}")
+        logger.info(f"Configuration: {profile_name}")
+        logger.info(f"Paramètres LLM: {llm_config}")
+        
+        # Utiliser la configuration de l'optimiseur GPU si disponible
+        if use_optimizer and GPU_OPTIMIZER_AVAILABLE:
+            try:
+                optimized_config = gpu_optimizer.get_profile_config(profile_key)
+                # Fusionner avec la config existante, optimiseur priorisé
+                llm_config.update(optimized_config)
+                logger.info(f"Configuration optimiseur GPU appliquée: {optimized_config}")
+            except Exception as e:
+                logger.warning(f"Impossible d'utiliser config optimiseur: {e}")
+        
+        llm = Llama(
+            model_path=config.MODEL_PATH,
+            **llm_config
+        )
+
+        # Infos système du backend (permet de confirmer CUDA) + chemin du package
+        try:
+            import llama_cpp as _py_pkg
+            from llama_cpp import llama_cpp as _llama_cpp
+            sys_info = _llama_cpp.llama_print_system_info().decode("utf-8")
+            logger.info("llama.cpp system info:\n" + sys_info)
+            logger.info(f"llama_cpp package path: {_py_pkg.__file__}")
+            runtime_info = {
+                'system_info': sys_info,
+                'cuda': ("CUDA" in sys_info) or ("cuBLAS" in sys_info) or ("ggml-cuda" in sys_info),
+                'llm_config_used': llm_config,
+                'module_path': _py_pkg.__file__,
+            }
+        except Exception as _e:
+            logger.warning(f"Impossible de récupérer les infos système llama.cpp: {_e}")
+            runtime_info = {
+                'system_info': None,
+                'cuda': None,
+                'llm_config_used': llm_config,
+                'module_path': None,
+            }
+        
+        return llm, runtime_info
+    
+    def _install_llm(self, llm, profile_key, runtime_info):
+        """Met une instance Llama en service (caches et tokenizer réinitialisés)"""
+        with self._llm_lock:
+            self.llm = llm
+            self.current_profile = profile_key
+            self.runtime_info = runtime_info
+            set_tokenizer(llm)
+            self._prime_persona_cache()
+    
     def _initialize_model(self):
         """Initialise le modèle LLaMA avec la configuration optimisée"""
+        if self.current_profile is None:
+            self.current_profile = 'cpu_fallback'
         try:
-            llm_config = self._get_llm_config()
-            if self.current_profile is None:
-                self.current_profile = 'cpu_fallback'
-            profile_name = LLM_PROFILES[self.current_profile]['name']
-            
-            logger.info(f"Initialisation du modèle: {config.MODEL_PATH}")
-            logger.info(f"Configuration: {profile_name}")
-            logger.info(f"Paramètres LLM: {llm_config}")
-            
-            # Utiliser la configuration de l'optimiseur GPU si disponible
-            if GPU_OPTIMIZER_AVAILABLE:
-                try:
-                    if self.current_profile is not None:
-                        optimized_config = gpu_optimizer.get_profile_config(self.current_profile)
-                    # Fusionner avec la config existante, optimiseur priorisé
-                    llm_config.update(optimized_config)
-                    logger.info(f"Configuration optimiseur GPU appliquée: {optimized_config}")
-                except Exception as e:
-                    logger.warning(f"Impossible d'utiliser config optimiseur: {e}")
-            
-            self.llm = Llama(
-                model_path=config.MODEL_PATH,
-                **llm_config
-            )
-
-            # Infos système du backend (permet de confirmer CUDA) + chemin du package
-            try:
-                import llama_cpp as _py_pkg
-                from llama_cpp import llama_cpp as _llama_cpp
-                sys_info = _llama_cpp.llama_print_system_info().decode("utf-8")
-                logger.info("llama.cpp system info:\n" + sys_info)
-                logger.info(f"llama_cpp package path: {_py_pkg.__file__}")
-                self.runtime_info = {
-                    'system_info': sys_info,
-                    'cuda': ("CUDA" in sys_info) or ("cuBLAS" in sys_info) or ("ggml-cuda" in sys_info),
-                    'llm_config_used': llm_config,
-                    'module_path': _py_pkg.__file__,
-                }
-            except Exception as _e:
-                logger.warning(f"Impossible de récupérer les infos système llama.cpp: {_e}")
-                self.runtime_info = {
-                    'system_info': None,
-                    'cuda': None,
-                    'llm_config_used': llm_config,
-                    'module_path': None,
-                }
-
+            llm, runtime_info = self._create_llm(self.current_profile)
+            self._install_llm(llm, self.current_profile, runtime_info)
             logger.info("Modèle LLM initialisé avec succès")
         except Exception as e:
             logger.error(f"Erreur lors de l'initialisation du modèle: {e}")
@@ -347,11 +508,8 @@ class ModelManager:
                 logger.info("Tentative avec profil d'urgence...")
                 self.current_profile = 'emergency'
                 try:
-                    llm_config = self._get_llm_config()
-                    self.llm = Llama(
-                        model_path=config.MODEL_PATH,
-                        **llm_config
-                    )
+                    llm, runtime_info = self._create_llm('emergency', use_optimizer=False)
+                    self._install_llm(llm, 'emergency', runtime_info)
                     logger.info("Modèle initialisé avec profil d'urgence")
                 except Exception as e2:
                     logger.error(f"Échec même avec profil d'urgence: {e2}")
@@ -359,6 +517,195 @@ class ModelManager:
             else:
                 raise e
     
+    def _prime_persona_cache(self):
+        """Évalue le préfixe persona une seule fois et conserve son état KV"""
+        self._persona_tokens = None
+        self._persona_state = None
+        if self.llm is None:
+            return
+        
+        with self._llm_lock:
+            try:
+                start = time.time()
+                tokens = self.llm.tokenize(KIRA_PERSONA_PROMPT.encode("utf-8"), special=True)
+                self.llm.reset()
+                self.llm.eval(tokens)
+                self._persona_state = self.llm.save_state()
+                self._persona_tokens = list(tokens)
+                logger.info(f"Préfixe persona mis en cache KV: {len(tokens)} tokens en {time.time() - start:.2f}s")
+            except Exception as e:
+                # Pas bloquant : llama.cpp réévaluera simplement le préfixe à chaque requête
+                logger.warning(f"Impossible de mettre en cache le préfixe persona: {e}")
+                self._persona_tokens = None
+                self._persona_state = None
+    
+    def _restore_prompt_prefix(self, prompt_tokens, user_id=None) -> int:
+        """Prépare le contexte KV pour le prompt et retourne le nombre de tokens déjà évalués"""
+        try:
+            current_tokens = self.llm._input_ids.tolist()
+        except Exception:
+            current_tokens = []
+        reused = _common_prefix_length(current_tokens, prompt_tokens)
+        
+        # État de la conversation précédente de cet utilisateur
+        if user_id is not None:
+            cached = self.user_state_cache.get(user_id)
+            if cached is not None:
+                cached_tokens, cached_state = cached
+                cached_reuse = _common_prefix_length(cached_tokens, prompt_tokens)
+                if cached_reuse > reused:
+                    self.llm.load_state(cached_state)
+                    self.prompt_cache_stats['user_state_restores'] += 1
+                    reused = cached_reuse
+        
+        persona = self._persona_tokens
+        if (self._persona_state is not None and persona
+                and reused < len(persona)
+                and prompt_tokens[:len(persona)] == persona):
+            # Le contexte courant ne contient pas le persona : on recharge l'état sauvegardé
+            self.llm.load_state(self._persona_state)
+            self.prompt_cache_stats['persona_restores'] += 1
+            reused = len(persona)
+        
+        # llama.cpp réévalue toujours au moins le dernier token du prompt
+        return min(reused, max(0, len(prompt_tokens) - 1))
+    
+    def _save_user_state(self, user_id: str):
+        """Sauvegarde l'état KV après génération pour le prochain message de l'utilisateur"""
+        try:
+            tokens = self.llm._input_ids.tolist()
+            self.user_state_cache.put(user_id, tokens, self.llm.save_state())
+        except Exception as e:
+            logger.debug(f"Impossible de sauvegarder l'état KV de {user_id}: {e}")
+    
+    def complete(self, prompt: str, user_id: str = None, on_token=None, should_stop=None, **kwargs):
+        """Appel synchrone au modèle en réutilisant les états KV en cache (persona, conversation)"""
+        with self._llm_lock:
+            # Vérifié sous verrou : une bascule de profil peut être en cours
+            if self.llm is None:
+                raise RuntimeError("Modèle non initialisé")
+            reused = 0
+            prompt_tokens = []
+            try:
+                prompt_tokens = list(self.llm.tokenize(prompt.encode("utf-8"), special=True))
+                reused = self._restore_prompt_prefix(prompt_tokens, user_id)
+            except Exception as e:
+                logger.debug(f"Cache KV ignoré pour cette requête: {e}")
+            
+            self.prompt_cache_stats['requests'] += 1
+            self.prompt_cache_stats['prompt_tokens'] += len(prompt_tokens)
+            self.prompt_cache_stats['reused_tokens'] += reused
+            if prompt_tokens:
+                logger.debug(f"Prompt: {len(prompt_tokens)} tokens, {reused} réutilisés depuis le cache KV")
+            
+            # Toujours en flux, même sans callback : l'ordonnanceur passe should_stop à chaque
+            # requête pour interrompre la génération à l'échéance ou à l'annulation
+            text = ""
+            for chunk in self.llm(prompt, stream=True, **kwargs):
+                piece = chunk["choices"][0]["text"]
+                if piece:
+                    text += piece
+                    if on_token is not None:
+                        on_token(piece)
+                if should_stop is not None and should_stop():
+                    logger.warning(f"Génération interrompue (échéance ou annulation) pour {user_id}")
+                    break
+            output = {"choices": [{"text": text}]}
+            
+            if user_id is not None:
+                self._save_user_state(user_id)
+            
+            return output
+    
+    def _get_batch_engine(self):
+        """Crée à la demande le moteur multi-séquences pour le profil actuel"""
+        if not config.BATCH_DECODING or self._batch_engine_failed:
+            return None
+        if self._batch_engine is None:
+            try:
+                # Import différé : API bas niveau de llama.cpp
+                from batching import BatchedGenerator
+                context_info = self.get_context_info()
+                main_ctx = int(context_info['actual_ctx']) if context_info else LLM_PROFILES[self.current_profile]['n_ctx']
+                # Contexte dimensionné à part : le cache KV du profil n'est pas alloué une seconde fois
+                n_ctx = min(config.BATCH_N_CTX, main_ctx)
+                n_batch = min(LLM_PROFILES[self.current_profile]['n_batch'], n_ctx)
+                self._batch_engine = BatchedGenerator(self.llm, n_ctx, n_batch, config.BATCH_MAX_SEQUENCES)
+            except Exception as e:
+                logger.warning(f"Génération par lots indisponible, traitement séquentiel: {e}")
+                self._batch_engine_failed = True
+                return None
+        return self._batch_engine
+    
+    def _release_batch_engine(self):
+        """Libère le contexte de génération par lots"""
+        if self._batch_engine is not None:
+            self._batch_engine.close()
+            self._batch_engine = None
+        self._batch_engine_failed = False
+    
+    def complete_batch(self, items):
+        """
+        Génère plusieurs requêtes ensemble (une séquence llama.cpp par requête).
+        items: liste de dicts {prompt, user_id, on_token, should_stop, kwargs}.
+        Retourne une liste de sorties ou d'exceptions dans le même ordre.
+        """
+        with self._llm_lock:
+            # Vérifié sous verrou : une bascule de profil peut être en cours
+            if self.llm is None:
+                raise RuntimeError("Modèle non initialisé")
+            engine = self._get_batch_engine()
+            if engine is not None and len(items) > 1:
+                from batching import BatchRequest, BatchNotApplicable
+                requests = [
+                    BatchRequest(
+                        prompt=item['prompt'],
+                        max_tokens=item['kwargs'].get('max_tokens', 400),
+                        temperature=item['kwargs'].get('temperature', 0.8),
+                        top_p=item['kwargs'].get('top_p', 0.95),
+                        stop=item['kwargs'].get('stop') or [],
+                        on_token=item.get('on_token'),
+                        should_stop=item.get('should_stop'),
+                    )
+                    for item in items
+                ]
+                try:
+                    start = time.time()
+                    texts = engine.generate(requests)
+                    logger.info(f"Lot de {len(items)} séquences généré en {time.time() - start:.2f}s")
+                    return [{"choices": [{"text": text}]} for text in texts]
+                except BatchNotApplicable as e:
+                    # Refusé avant tout décodage (lot trop long pour le contexte partagé) : traitement séquentiel
+                    logger.info(f"Lot non applicable ({e}), traitement séquentiel")
+                except Exception as e:
+                    # Décodage entamé : des tokens ont déjà été envoyés via on_token et certaines
+                    # séquences ont pu être arrêtées, les régénérer dupliquerait le texte
+                    logger.error(f"Erreur génération par lots: {e}")
+                    return [e] * len(items)
+            
+            results = []
+            for item in items:
+                try:
+                    results.append(self.complete(
+                        item['prompt'],
+                        user_id=item.get('user_id'),
+                        on_token=item.get('on_token'),
+                        should_stop=item.get('should_stop'),
+                        **item['kwargs']
+                    ))
+                except Exception as e:
+                    results.append(e)
+            return results
+    
+    def get_prompt_cache_stats(self):
+        """Retourne les statistiques de réutilisation du cache KV du prompt"""
+        stats = dict(self.prompt_cache_stats)
+        total = stats['prompt_tokens']
+        stats['reuse_percent'] = (stats['reused_tokens'] / total) * 100 if total else 0.0
+        stats['persona_tokens'] = len(self._persona_tokens) if self._persona_tokens else 0
+        stats['user_states'] = self.user_state_cache.stats()
+        return stats
+    
     def is_ready(self) -> bool:
         """Vérifie si le modèle est prêt"""
         return self.llm is not None
@@ -396,11 +743,9 @@ class ModelManager:
         
         # Méthode classique de fallback
         try:
-            pynvml.nvmlInit()
-            handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-            mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-            vram_free_mb = int(mem_info.free) // (1024**2)
-            pynvml.nvmlShutdown()
+            vram_free_mb = self._query_vram_free_mb()
+            if vram_free_mb is None:
+                return self.current_profile
             
             # Sélection du profil optimal avec nouveaux profils
             profile_order = ['turbo_max', 'performance_optimized', 'stable_high', 
@@ -415,36 +760,122 @@ class ModelManager:
             logger.warning(f"Erreur détection VRAM: {e}")
             return self.current_profile
     
-    def change_profile(self, profile_key):
-        """Change le profil de configuration (nécessite un redémarrage du modèle)"""
-        if profile_key not in LLM_PROFILES:
-            raise ValueError(f"Profil inconnu: {profile_key}")
-        
+    def _query_vram_free_mb(self):
+        """VRAM libre actuelle en Mo d'après le dernier instantané de télémétrie (None si inconnue)"""
+        gpu = telemetry.latest().gpu
+        return gpu.vram_free_mb if gpu else None
+    
+    def _can_double_buffer(self, profile_key) -> bool:
+        """Vérifie si le nouveau profil peut être chargé à côté de l'instance actuelle"""
+        profile = LLM_PROFILES[profile_key]
+        if profile.get('n_gpu_layers', 0) == 0:
+            # Profil CPU : pas de VRAM supplémentaire
+            return True
+        vram_free = self._query_vram_free_mb()
+        if vram_free is None:
+            return False
+        required = profile['min_vram_free_mb'] + config.SWAP_VRAM_MARGIN_MB
+        batch_mb = self._pending_batch_vram_mb()
+        if batch_mb:
+            # Le contexte de lots de l'ancien profil peut être créé pendant le chargement
+            required += batch_mb
+        logger.info(f"VRAM libre: {vram_free} MB, requise pour double chargement: {required} MB"
+                    f"{f' (dont contexte de lots: {batch_mb} MB)' if batch_mb else ''}")
+        return vram_free >= required
+    
+    def _pending_batch_vram_mb(self) -> int:
+        """VRAM (Mo) que le contexte de lots peut encore allouer, 0 s'il existe déjà ou est désactivé"""
+        if not config.BATCH_DECODING or self._batch_engine is not None or self._batch_engine_failed:
+            return 0
+        if self.llm is None or self.current_profile is None:
+            return 0
+        current = LLM_PROFILES[self.current_profile]
+        if current.get('n_gpu_layers', 0) == 0 or not current.get('offload_kqv', True):
+            # Cache KV en mémoire centrale
+            return 0
+        try:
+            from batching import estimate_kv_cache_mb
+            n_ctx = min(config.BATCH_N_CTX, current['n_ctx'])
+            estimate = estimate_kv_cache_mb(self.llm, n_ctx)
+        except Exception as e:
+            logger.debug(f"Estimation VRAM du contexte de lots impossible: {e}")
+            estimate = None
+        # Sans estimation, on réserve la marge de bascule une seconde fois
+        return estimate if estimate is not None else config.SWAP_VRAM_MARGIN_MB
+    
+    def _swap_double_buffered(self, profile_key) -> bool:
+        """Charge le nouveau profil pendant que l'ancien sert encore, puis bascule atomiquement"""
         old_profile = self.current_profile
-        self.current_profile = profile_key
+        logger.info(f"Chargement de {profile_key} en parallèle du profil {old_profile}")
+        new_llm, runtime_info = self._create_llm(profile_key)
         
-        try:
-            # Libérer l'ancien modèle
+        # Le verrou attend la fin de la génération en cours (drainage) avant la bascule
+        with self._llm_lock:
+            old_llm = self.llm
+            self._release_batch_engine()
+            self.user_state_cache.clear()
+            self._install_llm(new_llm, profile_key, runtime_info)
+        del old_llm
+        logger.info(f"Profil changé sans interruption: {old_profile} → {profile_key}")
+        return True
+    
+    def _swap_drain(self, profile_key) -> bool:
+        """Attend la fin des générations, libère l'ancien modèle puis charge le nouveau"""
+        old_profile = self.current_profile
+        # Verrou limité à la libération : le chargement se fait sans bloquer la file d'inférence
+        with self._llm_lock:
             if self.llm:
+                # Le contexte multi-séquences référence le modèle : le libérer en premier
+                self._release_batch_engine()
+                set_tokenizer(None)
                 del self.llm
                 self.llm = None
-            
-            # Réinitialiser avec le nouveau profil
-            self._initialize_model()
+                self._persona_state = None
+                self._persona_tokens = None
+                self.user_state_cache.clear()
+        
+        try:
+            llm, runtime_info = self._create_llm(profile_key)
+            self._install_llm(llm, profile_key, runtime_info)
             logger.info(f"Profil changé: {old_profile} → {profile_key}")
             return True
-            
         except Exception as e:
             logger.error(f"Erreur changement de profil: {e}")
             # Restaurer l'ancien profil en cas d'échec
-            self.current_profile = old_profile
             try:
-                self._initialize_model()
+                llm, runtime_info = self._create_llm(old_profile)
+                self._install_llm(llm, old_profile, runtime_info)
                 logger.info(f"Profil restauré: {old_profile}")
             except Exception as e2:
                 logger.error(f"Impossible de restaurer le profil: {e2}")
             return False
     
+    def change_profile(self, profile_key):
+        """
+        Change le profil de configuration sans interruption de service si possible :
+        le nouveau modèle est chargé à côté de l'ancien quand la VRAM le permet,
+        sinon les générations en cours sont drainées avant le rechargement.
+        """
+        if profile_key not in LLM_PROFILES:
+            raise ValueError(f"Profil inconnu: {profile_key}")
+        
+        # Test et prise atomiques : deux !optimize simultanés ne peuvent pas basculer ensemble
+        if self.loading or not self._swap_lock.acquire(blocking=False):
+            logger.warning("Changement de profil impossible pendant un chargement du modèle")
+            return False
+        
+        self.swapping = True
+        try:
+            if self.llm is not None and self._can_double_buffer(profile_key):
+                try:
+                    return self._swap_double_buffered(profile_key)
+                except Exception as e:
+                    logger.warning(f"Double chargement impossible ({e}), bascule avec drainage")
+            return self._swap_drain(profile_key)
+        finally:
+            self.swapping = False
+            self._swap_lock.release()
+    
     def get_context_info(self):
         """Retourne les informations sur le contexte actuel"""
         if not self.is_ready():
@@ -637,92 +1068,178 @@ class ModelManager:
 
 # Instance globale du gestionnaire de modèle
 model_manager = ModelManager()
-llm = model_manager.llm
+if config.MODEL_AUTOLOAD:
+    model_manager.start_loading()
+    semantic_index.start()
+
+def get_llm():
+    """Instance Llama actuelle (None tant que le chargement n'est pas terminé)"""
+    return model_manager.llm
+
+# File d'inférence : une seule génération à la fois sur le contexte llama.cpp
+inference_scheduler = create_scheduler(model_manager)
+
+WARMING_UP_MESSAGE = "⏳ Je me réveille à peine, laisse-moi quelques secondes pour charger mon cerveau !"
+BUSY_MESSAGE = "⏳ Je suis un peu débordée là, réessaie dans quelques secondes !"
+TIMEOUT_MESSAGE = "⌛ Désolée, la réponse a pris trop de temps. Réessaie dans un instant."
+
+# Paramètres de génération partagés entre le mode normal et le mode streaming
+GENERATION_KWARGS = {
+    'temperature': 0.8,
+    'top_p': 0.95,
+    'stop': ["Utilisateur:", "\n"],
+}
+MAX_REPLY_TOKENS = 400
+
+def _get_max_context() -> int:
+    """Taille de contexte effective du modèle actuel"""
+    # Récupération sécurisée de n_ctx depuis le profil actuel
+    context_info = model_manager.get_context_info()
+    if context_info:
+        max_total = context_info['actual_ctx']
+    else:
+        # Fallback vers la configuration du profil
+        if model_manager.current_profile is not None:
+            max_total = LLM_PROFILES[model_manager.current_profile]['n_ctx']
+        else:
+            max_total = 4096  # Valeur par défaut sûre
+    
+    # S'assurer que max_total est un entier
+    return int(max_total)
+
+async def _build_prompt(user_id: str, prompt: str, context_limit: int, max_tokens: int):
+    """
+    Construit le prompt complet dans la limite de contexte. Retourne (prompt, erreur).
+    L'historique est lu une seule fois puis on garde en une passe le plus long
+    suffixe d'échanges qui tient dans n_ctx - max_tokens. Les échanges déjà
+    condensés dans le résumé glissant ne sont pas répétés.
+
+    Ordre stable d'abord : persona, résumé, historique, puis ce qui dépend du message
+    (faits pertinents, souvenirs proches) juste avant la question, pour que le préfixe reste
+    réutilisable par le cache KV d'un message à l'autre.
+    """
+    max_total = _get_max_context()
+    budget = max_total - max_tokens
+    logger.debug(f"Génération de réponse pour {user_id} avec contexte limite: {context_limit}")
+
+    # Partie fixe en tête : persona
+    header = KIRA_PERSONA_PROMPT
+
+    # Partie variable, placée après l'historique : faits de l'utilisateur les plus pertinents pour ce message
+    context = ""
+    facts = await aget_relevant_facts(user_id, prompt, config.FACTS_TOP_K, config.FACTS_TOKEN_BUDGET)
+    if facts:
+        context += "Voici ce que je sais à propos de cet utilisateur :\n"
+        for f in facts:
+            context += f"- {f}\n"
+        context += "\n"
+
+    # Résumé glissant, entre la persona et l'historique : il ne change qu'à l'enregistrement d'un
+    # nouveau résumé (l'état KV de l'utilisateur est alors invalidé). Seuls les échanges postérieurs
+    # au résumé sont repris tels quels.
+    summary, unsummarized = await aget_summary(user_id)
+    if summary:
+        header += f"Résumé de nos conversations précédentes :\n{summary}\n\n"
+        context_limit = min(context_limit, unsummarized)
+
+    history = await aget_history(user_id, limit=context_limit) if context_limit > 0 else []
+
+    # Souvenirs anciens proches du message (hors fenêtre d'historique récente)
+    memories = []
+    if semantic_index.ready:
+        recent = set(history)
+        memory_tokens = 0
+        for user_msg, bot_msg, score in await semantic_index.asearch(
+                user_id, prompt, config.SEMANTIC_TOP_K, config.SEMANTIC_MIN_SCORE):
+            if (user_msg, bot_msg) in recent:
+                continue
+            line = f"- Utilisateur: {user_msg} / Kira: {bot_msg}\n"
+            line_tokens = count_tokens(line)
+            if memory_tokens + line_tokens > config.SEMANTIC_TOKEN_BUDGET:
+                continue
+            memories.append(line)
+            memory_tokens += line_tokens
+    if memories:
+        # Comme les faits, dépendent du message : après l'historique, hors du préfixe réutilisable
+        memories_block = "Souvenirs de conversations passées avec cet utilisateur :\n" + "".join(memories) + "\n"
+        context += memories_block
+
+    question = f"Utilisateur: {prompt}\nKira:"
+    # Le BOS du prompt complet est compté une fois ici, count_tokens ne l'inclut pas
+    fixed_tokens = bos_tokens() + count_tokens(header) + count_tokens(context) + count_tokens(question)
+
+    # Sélection des échanges du plus récent au plus ancien tant que le budget le permet
+    turns = [f"Utilisateur: {user_msg}\nKira: {bot_msg}\n" for user_msg, bot_msg in history]
+    used = fixed_tokens
+    kept = 0
+    for turn in reversed(turns):
+        # count_tokens est mémoïsé : chaque échange n'est tokenisé qu'une fois
+        turn_tokens = count_tokens(turn)
+        if used + turn_tokens > budget:
+            break
+        used += turn_tokens
+        kept += 1
+    selected = turns[len(turns) - kept:]
+
+    full_prompt = header + "".join(selected) + context + question
+    prompt_tokens = bos_tokens() + count_tokens(full_prompt)
+
+    # Les frontières entre segments peuvent légèrement changer le compte : ajustement final
+    while prompt_tokens > budget and selected:
+        selected = selected[1:]
+        full_prompt = header + "".join(selected) + context + question
+        prompt_tokens = bos_tokens() + count_tokens(full_prompt)
+
+    logger.debug(
+        f"Budget prompt pour {user_id}: {prompt_tokens}/{budget} tokens "
+        f"(fixe {fixed_tokens}, {len(selected)}/{len(turns)} échanges conservés, {len(facts)} faits, {len(memories)} souvenirs)"
+    )
+    if len(selected) < len(turns):
+        logger.info(f"Historique réduit à {len(selected)}/{len(turns)} échanges pour {user_id} (budget {budget} tokens)")
+
+    # Si c'est encore trop long : on retire les souvenirs puis on tronque le message de l'utilisateur,
+    # jamais la persona ni la fin du prompt
+    if prompt_tokens > budget:
+        logger.warning(f"Troncature nécessaire: {prompt_tokens} + {max_tokens} > {max_total}")
+        if memories:
+            context = context.replace(memories_block, "")
+        room = budget - bos_tokens() - count_tokens(header) - count_tokens(context) - count_tokens("Utilisateur: \nKira:") - 8
+        if room > 0:
+            question = f"Utilisateur: {truncate_text_to_tokens(prompt, room)}\nKira:"
+        full_prompt = header + context + question
+        prompt_tokens = bos_tokens() + count_tokens(full_prompt)
+        if prompt_tokens > budget:
+            err = f"❌ Erreur modèle : prompt ({prompt_tokens}) + réponse ({max_tokens}) > {max_total} tokens"
+            logger.error(err)
+            return None, err
+
+    return full_prompt, None
 
 async def generate_reply(user_id: str, prompt: str, context_limit: int = 10) -> str:
     """Génère une réponse en utilisant le modèle LLM avec gestion d'erreurs améliorée"""
     
+    # Pendant un rechargement (chargement initial ou bascule avec drainage), réponse d'attente
     if not model_manager.is_ready():
+        if model_manager.loading or model_manager.swapping:
+            return WARMING_UP_MESSAGE
         error_msg = "❌ Modèle non initialisé"
         logger.error(error_msg)
         return error_msg
     
     try:
-        # Récupération sécurisée de n_ctx depuis le profil actuel
-        context_info = model_manager.get_context_info()
-        if context_info:
-            max_total = context_info['actual_ctx']
-        else:
-            # Fallback vers la configuration du profil
-            if model_manager.current_profile is not None:
-                max_total = LLM_PROFILES[model_manager.current_profile]['n_ctx']
-            else:
-                max_total = 4096  # Valeur par défaut sûre
-        
-        # S'assurer que max_total est un entier
-        max_total = int(max_total)
-        max_tokens = 400
-        min_context = 1
-
-        # Utilise la limite dynamique passée en argument
-        limit = context_limit
-        logger.debug(f"Génération de réponse pour {user_id} avec contexte limite: {limit}")
-
-        while limit >= min_context:
-            history = get_history(user_id, limit=limit)
-            full_prompt = (
-                "Tu es Kira , une IA française drôle, vive, légèrement sarcastique mais toujours attachante et gentille. "
-                "Tu parles de façon expressive, naturelle, parfois spontanée.\n"
-                "Tu ne cites jamais de sources ni de liens externes. Tu réponds toujours en français, même si la question est en anglais.\n"
-                "Tu évites les réponses plates ou génériques.\n"
-                "Si une information t'est donnée, utilise-la naturellement dans ta réponse sans dire que tu l'as trouvée ou recherchée.\n"
-                "Kira adore plaisanter, poser des questions en retour ou rebondir de manière surprenante."
-                "\n\n"
-            )
-
-            # Injecte les faits connus sur l'utilisateur
-            facts = get_facts(user_id)
-            if facts:
-                full_prompt += "Voici ce que je sais à propos de cet utilisateur :\n"
-                for f in facts:
-                    full_prompt += f"- {f}\n"
-                full_prompt += "\n"
-
-            # Ajouter l'historique
-            for user_msg, bot_msg in history:
-                full_prompt += f"Utilisateur: {user_msg}\nKira: {bot_msg}\n"
-
-            full_prompt += f"Utilisateur: {prompt}\nKira:"
-
-            prompt_tokens = count_tokens(full_prompt)
-            if prompt_tokens + max_tokens <= max_total:
-                break  # OK, on peut générer
-            limit -= 1  # On réduit l'historique
-            logger.debug(f"Réduction du contexte à {limit} pour respecter les limites de tokens")
-
-        # Si c'est encore trop long, tronque le prompt
-        if prompt_tokens + max_tokens > max_total:
-            logger.warning(f"Troncature nécessaire: {prompt_tokens} + {max_tokens} > {max_total}")
-            full_prompt = truncate_text_to_tokens(full_prompt, max_total - max_tokens)
-            prompt_tokens = count_tokens(full_prompt)
-            if prompt_tokens + max_tokens > max_total:
-                err = f"❌ Erreur modèle : prompt ({prompt_tokens}) + réponse ({max_tokens}) > {max_total} tokens"
-                logger.error(err)
-                return err
+        max_tokens = MAX_REPLY_TOKENS
+        full_prompt, error = await _build_prompt(user_id, prompt, context_limit, max_tokens)
+        if error:
+            return error
 
         start = time.time()
         
-        # Génération avec le modèle (exécuté dans un thread pour ne pas bloquer l'event loop)
-        if llm is None:
-            return "❌ Erreur : modèle non initialisé"
-            
-        output = await asyncio.to_thread(
-            llm,
+        # Génération via la file d'inférence (thread dédié, ne bloque pas l'event loop)
+        output = await inference_scheduler.submit(
+            user_id,
             full_prompt,
             max_tokens=max_tokens,
-            temperature=0.8,
-            top_p=0.95,
-            stop=["Utilisateur:", "\n"]
+            **GENERATION_KWARGS
         )
         
         # Extraction de la réponse selon le format de sortie
@@ -735,12 +1252,87 @@ async def generate_reply(user_id: str, prompt: str, context_limit: int = 10) ->
         generation_time = end - start
         logger.info(f"Réponse générée en {generation_time:.2f}s pour {user_id}")
 
-        # Sauvegarde de l'interaction (mémoire conversationnelle)
-        save_interaction(user_id, prompt, reply)
+        # Sauvegarde différée de l'interaction (mémoire conversationnelle)
+        queue_interaction(user_id, prompt, reply)
 
         return shorten_response(reply)
         
+    except InferenceQueueFull:
+        return BUSY_MESSAGE
+    except InferenceTimeout:
+        return TIMEOUT_MESSAGE
     except Exception as e:
         error_msg = f"❌ Erreur lors de la génération: {str(e)}"
         logger.error(f"Erreur génération pour {user_id}: {e}", exc_info=True)
-        return error_msg
\ No newline at end of file
+        return error_msg
+
+async def generate_reply_stream(user_id: str, prompt: str, context_limit: int = 10):
+    """
+    Génère une réponse en streaming.
+    Produit le texte cumulé au fur et à mesure ; la dernière valeur est la réponse finale.
+    """
+    # Pendant un rechargement (chargement initial ou bascule avec drainage), réponse d'attente
+    if not model_manager.is_ready():
+        if model_manager.loading or model_manager.swapping:
+            yield WARMING_UP_MESSAGE
+            return
+        error_msg = "❌ Modèle non initialisé"
+        logger.error(error_msg)
+        yield error_msg
+        return
+    
+    try:
+        max_tokens = MAX_REPLY_TOKENS
+        full_prompt, error = await _build_prompt(user_id, prompt, context_limit, max_tokens)
+        if error:
+            yield error
+            return
+
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+
+        def on_token(text: str):
+            # Appelé depuis le thread de génération
+            loop.call_soon_threadsafe(queue.put_nowait, text)
+
+        start = time.time()
+        task = asyncio.ensure_future(inference_scheduler.submit(
+            user_id,
+            full_prompt,
+            on_token=on_token,
+            max_tokens=max_tokens,
+            **GENERATION_KWARGS
+        ))
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+
+        reply = ""
+        first_token_time = None
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            if first_token_time is None:
+                first_token_time = time.time() - start
+            reply += chunk
+            yield reply.strip()
+
+        # Propage une éventuelle erreur du thread de génération
+        await task
+
+        reply = reply.strip()
+        if first_token_time is not None:
+            logger.info(f"Réponse streamée en {time.time() - start:.2f}s "
+                        f"(premier token: {first_token_time:.2f}s) pour {user_id}")
+
+        queue_interaction(user_id, prompt, reply)
+
+        yield shorten_response(reply)
+        
+    except InferenceQueueFull:
+        yield BUSY_MESSAGE
+    except InferenceTimeout:
+        yield TIMEOUT_MESSAGE
+    except Exception as e:
+        error_msg = f"❌ Erreur lors de la génération: {str(e)}"
+        logger.error(f"Erreur génération streaming pour {user_id}: {e}", exc_info=True)
+        yield error_msg
@@ -0,0 +1,225 @@
+"""
+Rétention et compaction de neuro.db
+Archive (compressés) les échanges trop anciens ou au-delà du plafond par utilisateur,
+puis entretient la base (PRAGMA optimize, VACUUM incrémental) à intervalle régulier.
+"""
+import json
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+from config import config, logger
+from database import db_writer, get_db_connection
+from memory import history_cache, notify_memory_write
+from semantic_memory import semantic_index
+
+
+def _compress(user_input: str, bot_response: str) -> bytes:
+    return zlib.compress(json.dumps([user_input, bot_response], ensure_ascii=False).encode("utf-8"), 6)
+
+
+def decompress_archive(payload: bytes):
+    """Retourne (user_input, bot_response) d'une ligne de memory_archive"""
+    user_input, bot_response = json.loads(zlib.decompress(payload).decode("utf-8"))
+    return user_input, bot_response
+
+
+class RetentionManager:
+    """Thread de fond : archivage par âge et par plafond utilisateur, puis maintenance SQLite"""
+
+    def __init__(self, max_age_days: int, max_per_user: int, interval_hours: float,
+                 batch_size: int = 500, vacuum_pages: int = 2000, enable_incremental_vacuum: bool = False):
+        self.max_age_days = max_age_days
+        self.max_per_user = max_per_user
+        self.interval = interval_hours * 3600
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self.enable_incremental_vacuum_on_start = enable_incremental_vacuum
+        self._auto_vacuum_warned = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_run: Optional[float] = None
+        self.last_archived = 0
+        self.total_archived = 0
+
+    def start(self):
+        """Démarre le thread de maintenance (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="kira-retention", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Rétention activée (âge max: {self.max_age_days or '∞'} j, "
+            f"plafond: {self.max_per_user or '∞'} échanges/utilisateur, toutes les {self.interval / 3600:.1f} h)"
+        )
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        # Premier passage peu après le démarrage, hors de la période de chargement du modèle
+        if self._stop.wait(300):
+            return
+        if self.enable_incremental_vacuum_on_start:
+            try:
+                self.enable_incremental_vacuum()
+            except Exception as e:
+                logger.error(f"Conversion en auto_vacuum incrémental impossible: {e}", exc_info=True)
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Erreur de la maintenance de la base: {e}", exc_info=True)
+            if self._stop.wait(self.interval):
+                return
+
+    # --- Sélection ---
+
+    def _expired_ids(self) -> List[int]:
+        if self.max_age_days <= 0:
+            return []
+        with get_db_connection() as conn:
+            rows = conn.execute(
+                "SELECT id FROM memory WHERE timestamp < datetime('now', ?) ORDER BY timestamp LIMIT ?",
+                (f"-{int(self.max_age_days)} days", self.batch_size)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _over_cap_ids(self) -> List[int]:
+        if self.max_per_user <= 0:
+            return []
+        ids: List[int] = []
+        with get_db_connection() as conn:
+            # Compteurs maintenus par triggers : pas de parcours de memory
+            users = conn.execute(
+                "SELECT user_id, messages FROM memory_user_counts WHERE messages > ? ORDER BY messages DESC",
+                (self.max_per_user,)
+            ).fetchall()
+            for user_id, messages in users:
+                excess = min(messages - self.max_per_user, self.batch_size - len(ids))
+                if excess <= 0:
+                    break
+                rows = conn.execute(
+                    "SELECT id FROM memory WHERE user_id = ? ORDER BY id LIMIT ?", (user_id, excess)
+                ).fetchall()
+                ids.extend(row[0] for row in rows)
+        return ids
+
+    # --- Archivage ---
+
+    def _archive(self, ids: List[int]) -> int:
+        """Déplace les échanges ids vers memory_archive dans une seule transaction"""
+        if not ids:
+            return 0
+        placeholders = ",".join("?" * len(ids))
+        with get_db_connection() as conn:
+            rows = conn.execute(
+                f"SELECT id, user_id, timestamp, user_input, bot_response FROM memory WHERE id IN ({placeholders})",
+                ids
+            ).fetchall()
+        if not rows:
+            return 0
+
+        # Compression hors du thread écrivain
+        archived = [(id_, user_id, ts, _compress(user_input, bot_response))
+                    for id_, user_id, ts, user_input, bot_response in rows]
+        archived_ids = [(row[0],) for row in archived]
+
+        def job(conn):
+            conn.executemany(
+                "INSERT OR IGNORE INTO memory_archive (id, user_id, timestamp, payload) VALUES (?, ?, ?, ?)",
+                archived
+            )
+            conn.executemany("DELETE FROM memory WHERE id = ?", archived_ids)
+            conn.executemany("DELETE FROM memory_vectors WHERE memory_id = ?", archived_ids)
+            return len(archived)
+
+        count = db_writer.submit_job(job).result()
+
+        users = {row[1] for row in archived}
+        for user_id in users:
+            history_cache.invalidate(user_id)
+        semantic_index.forget_memory_ids(row[0] for row in archived)
+        notify_memory_write()
+        return count
+
+    # --- Maintenance ---
+
+    def enable_incremental_vacuum(self) -> bool:
+        """Conversion unique en auto_vacuum incrémental (VACUUM complet : bloque les écritures pendant la copie)
+
+        Retourne False si la base était déjà en mode incrémental.
+        """
+        def job(conn):
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                return False
+            size_mb = (conn.execute("PRAGMA page_count").fetchone()[0]
+                       * conn.execute("PRAGMA page_size").fetchone()[0] / 1024**2)
+            logger.warning(
+                f"Conversion de la base en auto_vacuum incrémental : VACUUM complet de {size_mb:.1f} Mo, "
+                "écritures suspendues jusqu'à la fin"
+            )
+            start = time.time()
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            logger.info(f"auto_vacuum incrémental activé en {time.time() - start:.1f}s")
+            return True
+
+        return db_writer.submit_job(job).result()
+
+    def _maintenance(self):
+        def job(conn):
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+                # Chaque étape de la pragma libère une page : il faut la parcourir entièrement
+                conn.execute(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)})").fetchall()
+            elif not self._auto_vacuum_warned:
+                self._auto_vacuum_warned = True
+                logger.info(
+                    "VACUUM incrémental ignoré : la base n'est pas en auto_vacuum incrémental "
+                    "(conversion unique via RETENTION_ENABLE_INCREMENTAL_VACUUM=true)"
+                )
+            conn.execute("PRAGMA optimize")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        db_writer.submit_job(job).result()
+
+    def run_once(self) -> Dict[str, int]:
+        """Un passage complet : archivage par lots puis maintenance"""
+        start = time.time()
+        by_age = by_cap = 0
+        while not self._stop.is_set():
+            n = self._archive(self._expired_ids())
+            by_age += n
+            if n < self.batch_size:
+                break
+        while not self._stop.is_set():
+            n = self._archive(self._over_cap_ids())
+            by_cap += n
+            if n < self.batch_size:
+                break
+
+        self._maintenance()
+        self.last_run = time.time()
+        self.last_archived = by_age + by_cap
+        self.total_archived += self.last_archived
+        logger.info(
+            f"Maintenance de la base terminée en {self.last_run - start:.1f}s "
+            f"({by_age} échanges archivés par âge, {by_cap} par plafond)"
+        )
+        return {'by_age': by_age, 'by_cap': by_cap}
+
+    def get_stats(self) -> Dict:
+        return {
+            'last_run': self.last_run,
+            'last_archived': self.last_archived,
+            'total_archived': self.total_archived,
+        }
+
+
+retention_manager = RetentionManager(
+    max_age_days=config.RETENTION_MAX_AGE_DAYS,
+    max_per_user=config.RETENTION_MAX_PER_USER,
+    interval_hours=config.RETENTION_INTERVAL_HOURS,
+    enable_incremental_vacuum=config.RETENTION_ENABLE_INCREMENTAL_VACUUM,
+)
@@ -0,0 +1,327 @@
+"""
+Mémoire sémantique à long terme
+Chaque échange sauvegardé est vectorisé (llama.cpp en mode embedding) ; les vecteurs sont stockés
+dans une matrice float16 mappée en mémoire et la recherche top-k est vectorisée avec NumPy.
+"""
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from config import config, logger
+from database import db_manager, db_writer
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+class VectorStore:
+    """Matrice (capacité x dim) float16 mappée depuis le disque, agrandie par doublement"""
+
+    def __init__(self, directory: str, initial_capacity: int = 1024):
+        self.directory = directory
+        self.matrix_path = os.path.join(directory, "vectors.f16")
+        self.meta_path = os.path.join(directory, "vectors.json")
+        self.initial_capacity = initial_capacity
+        self.dim = 0
+        self.capacity = 0
+        self.model = None
+        self.matrix = None
+        os.makedirs(directory, exist_ok=True)
+
+    def open(self, dim: int, model: str) -> bool:
+        """Ouvre la matrice ; retourne False si elle a été recréée (dimension ou modèle différent)"""
+        meta = {}
+        if os.path.exists(self.meta_path) and os.path.exists(self.matrix_path):
+            try:
+                with open(self.meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except Exception as e:
+                logger.warning(f"Métadonnées des vecteurs illisibles, réindexation: {e}")
+
+        reused = meta.get("dim") == dim and meta.get("model") == model
+        self.dim = dim
+        self.model = model
+        self.capacity = meta.get("capacity", 0) if reused else 0
+        if not reused:
+            self.capacity = self.initial_capacity
+            with open(self.matrix_path, "wb") as f:
+                f.truncate(self.capacity * dim * 2)
+            self._save_meta()
+        self.matrix = np.memmap(self.matrix_path, dtype=np.float16, mode="r+", shape=(self.capacity, dim))
+        return reused
+
+    def _save_meta(self):
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "capacity": self.capacity, "model": self.model}, f)
+
+    def _grow(self, min_capacity: int):
+        capacity = self.capacity
+        while capacity < min_capacity:
+            capacity *= 2
+        self.matrix.flush()
+        self.matrix = None
+        with open(self.matrix_path, "r+b") as f:
+            f.truncate(capacity * self.dim * 2)
+        self.capacity = capacity
+        self._save_meta()
+        self.matrix = np.memmap(self.matrix_path, dtype=np.float16, mode="r+", shape=(self.capacity, self.dim))
+        logger.info(f"Matrice de vecteurs agrandie à {capacity} lignes")
+
+    def write(self, row: int, vector):
+        if row >= self.capacity:
+            self._grow(row + 1)
+        self.matrix[row] = vector
+
+    def flush(self):
+        if self.matrix is not None:
+            self.matrix.flush()
+
+
+class SemanticMemoryIndex:
+    """Indexation en arrière-plan des échanges et recherche des souvenirs les plus proches"""
+
+    def __init__(self, db_manager, db_writer, directory: str, model_path: str, enabled: bool = True):
+        self.db_manager = db_manager
+        self.db_writer = db_writer
+        self.model_path = model_path
+        self.enabled = enabled and NUMPY_AVAILABLE
+        self.store = VectorStore(directory)
+        self.embedder = None
+        self.ready = False
+        self.load_error = None
+
+        # Un seul thread manipule l'embedder (llama.cpp n'est pas réentrant)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kira-embed")
+        self._lock = threading.Lock()
+        self._user_rows: Dict[str, List[int]] = {}
+        self._row_memory_ids: Dict[int, int] = {}
+        self._next_row = 0
+        self._last_memory_id = 0
+        self._catch_up_scheduled = False
+        self.indexed = 0
+
+        if enabled and not NUMPY_AVAILABLE:
+            logger.warning("NumPy non disponible - mémoire sémantique désactivée")
+
+    # --- Démarrage ---
+
+    def start(self):
+        """Charge l'embedder et la matrice en arrière-plan puis indexe l'historique existant"""
+        if not self.enabled:
+            return
+        self._executor.submit(self._load)
+
+    def _load(self):
+        try:
+            from llama_cpp import Llama
+
+            kwargs = dict(
+                model_path=self.model_path,
+                embedding=True,
+                n_ctx=config.EMBEDDING_N_CTX,
+                n_gpu_layers=config.EMBEDDING_N_GPU_LAYERS,
+                n_threads=max(1, (os.cpu_count() or 2) // 2),
+                verbose=False,
+            )
+            try:
+                import llama_cpp
+                kwargs["pooling_type"] = llama_cpp.LLAMA_POOLING_TYPE_MEAN
+            except AttributeError:
+                pass
+            self.embedder = Llama(**kwargs)
+
+            dim = len(self._embed("test"))
+            if not self.store.open(dim, os.path.basename(self.model_path)):
+                # Nouveau modèle d'embedding : les anciens vecteurs ne sont plus comparables
+                self.db_writer.submit("DELETE FROM memory_vectors").result()
+            self._load_rows()
+            self.ready = True
+            logger.info(f"Mémoire sémantique prête ({self.indexed} échanges indexés, dimension {dim})")
+        except Exception as e:
+            self.load_error = str(e)
+            logger.error(f"Mémoire sémantique indisponible: {e}")
+            return
+        self._catch_up()
+
+    def _load_rows(self):
+        with self.db_manager.get_connection() as conn:
+            rows = conn.execute("SELECT memory_id, user_id, row FROM memory_vectors ORDER BY memory_id").fetchall()
+        with self._lock:
+            for memory_id, user_id, row in rows:
+                self._last_memory_id = max(self._last_memory_id, memory_id)
+                if row is None:
+                    continue
+                self._user_rows.setdefault(user_id, []).append(row)
+                self._row_memory_ids[row] = memory_id
+                self._next_row = max(self._next_row, row + 1)
+            self.indexed = len(self._row_memory_ids)
+
+    # --- Indexation ---
+
+    def _embed(self, text: str):
+        """Vecteur normalisé (float32) ; moyenne des tokens si le modèle ne fait pas de pooling"""
+        result = self.embedder.embed(text, truncate=True)
+        vector = np.asarray(result, dtype=np.float32)
+        if vector.ndim == 2:
+            vector = vector.mean(axis=0)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+    def notify(self):
+        """Signale de nouveaux échanges à indexer (appel non bloquant, coalescé)"""
+        if not self.ready:
+            return
+        with self._lock:
+            if self._catch_up_scheduled:
+                return
+            self._catch_up_scheduled = True
+        self._executor.submit(self._catch_up)
+
+    def _catch_up(self, chunk: int = 8):
+        """Indexe un lot d'échanges non vectorisés puis se replanifie, pour laisser passer les recherches"""
+        with self._lock:
+            self._catch_up_scheduled = False
+        with self.db_manager.get_connection() as conn:
+            rows = conn.execute("""
+                SELECT id, user_id, user_input, bot_response FROM memory
+                WHERE id > ? ORDER BY id LIMIT ?
+            """, (self._last_memory_id, chunk)).fetchall()
+        if not rows:
+            return
+
+        entries = []
+        for memory_id, user_id, user_input, bot_response in rows:
+            row = None
+            try:
+                vector = self._embed(f"Utilisateur: {user_input}\nKira: {bot_response}")
+                with self._lock:
+                    row = self._next_row
+                    self._next_row += 1
+                self.store.write(row, vector)
+            except Exception as e:
+                logger.warning(f"Échange {memory_id} non vectorisé: {e}")
+            entries.append((memory_id, user_id, row))
+        self.store.flush()
+
+        # Vecteurs écrits avant les métadonnées : une ligne orpheline est simplement réutilisée
+        for memory_id, user_id, row in entries:
+            self.db_writer.submit(
+                "INSERT OR REPLACE INTO memory_vectors (memory_id, user_id, row) VALUES (?, ?, ?)",
+                (memory_id, user_id, row)
+            )
+        with self._lock:
+            for memory_id, user_id, row in entries:
+                self._last_memory_id = max(self._last_memory_id, memory_id)
+                if row is not None:
+                    self._user_rows.setdefault(user_id, []).append(row)
+                    self._row_memory_ids[row] = memory_id
+            self.indexed = len(self._row_memory_ids)
+
+        if len(rows) == chunk:
+            self.notify()
+
+    def forget(self, user_id: Optional[str] = None):
+        """Oublie les vecteurs d'un utilisateur (ou de tous) après un effacement de la mémoire"""
+        with self._lock:
+            users = [user_id] if user_id is not None else list(self._user_rows)
+            for uid in users:
+                for row in self._user_rows.pop(uid, []):
+                    self._row_memory_ids.pop(row, None)
+            self.indexed = len(self._row_memory_ids)
+        if user_id is None:
+            self.db_writer.submit("DELETE FROM memory_vectors")
+        else:
+            self.db_writer.submit("DELETE FROM memory_vectors WHERE user_id = ?", (user_id,))
+
+    def forget_memory_ids(self, memory_ids):
+        """Retire des échanges archivés de l'index en mémoire (les lignes de la matrice sont abandonnées)"""
+        memory_ids = set(memory_ids)
+        if not memory_ids:
+            return
+        with self._lock:
+            dropped = {row for row, memory_id in self._row_memory_ids.items() if memory_id in memory_ids}
+            if not dropped:
+                return
+            for row in dropped:
+                del self._row_memory_ids[row]
+            for user_id in list(self._user_rows):
+                rows = [row for row in self._user_rows[user_id] if row not in dropped]
+                if rows:
+                    self._user_rows[user_id] = rows
+                else:
+                    del self._user_rows[user_id]
+            self.indexed = len(self._row_memory_ids)
+
+    # --- Recherche ---
+
+    def search(self, user_id: str, text: str, k: int = 3, min_score: float = 0.3) -> List[Tuple[str, str, float]]:
+        """Les k échanges passés de l'utilisateur les plus proches de text (similarité cosinus)"""
+        if not self.ready:
+            return []
+        with self._lock:
+            rows = self._user_rows.get(user_id, [])
+            if not rows:
+                return []
+            rows = np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+        query = self._embed(text)
+        scores = np.asarray(self.store.matrix[rows], dtype=np.float32) @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        with self._lock:
+            picked = [(self._row_memory_ids.get(int(rows[i])), float(scores[i])) for i in top if scores[i] >= min_score]
+        picked = [(memory_id, score) for memory_id, score in picked if memory_id is not None]
+        if not picked:
+            return []
+
+        score_by_id = dict(picked)
+        placeholders = ",".join("?" * len(picked))
+        with self.db_manager.get_connection() as conn:
+            found = conn.execute(
+                f"SELECT id, user_input, bot_response FROM memory WHERE id IN ({placeholders})",
+                list(score_by_id)
+            ).fetchall()
+        results = [(user_input, bot_response, score_by_id[memory_id]) for memory_id, user_input, bot_response in found]
+        results.sort(key=lambda item: item[2], reverse=True)
+        return results
+
+    async def asearch(self, user_id: str, text: str, k: int = 3, min_score: float = 0.3) -> List[Tuple[str, str, float]]:
+        """Version asynchrone de search (exécutée sur le thread de l'embedder)"""
+        if not self.ready:
+            return []
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, lambda: self.search(user_id, text, k, min_score)
+        )
+
+    def get_stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'ready': self.ready,
+            'indexed': self.indexed,
+            'dim': self.store.dim,
+            'capacity': self.store.capacity,
+            'error': self.load_error,
+        }
+
+
+def create_semantic_index(db_manager, db_writer) -> SemanticMemoryIndex:
+    """Crée l'index sémantique à partir de la configuration"""
+    return SemanticMemoryIndex(
+        db_manager,
+        db_writer,
+        directory=os.path.join(config.data_dir, "semantic"),
+        model_path=config.EMBEDDING_MODEL_PATH or config.MODEL_PATH,
+        enabled=config.SEMANTIC_MEMORY,
+    )
+
+
+# Instance globale (démarrée par model.py avec le modèle)
+semantic_index = create_semantic_index(db_manager, db_writer)
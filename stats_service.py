@@ -0,0 +1,54 @@
+"""
+Service de statistiques pour !stats
+Compteurs de la mémoire mis à jour à chaque écriture : la commande répond depuis le cache
+sans bloquer la boucle asyncio. Les métriques matérielles viennent de telemetry.
+"""
+import threading
+from typing import Dict, Optional
+from config import logger
+from memory import get_memory_counters, add_write_listener
+from telemetry import telemetry
+
+
+class StatsService:
+    """Thread de fond : compteurs rafraîchis après écriture"""
+
+    def __init__(self):
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._counters_dirty = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        add_write_listener(self._counters_dirty.set)
+
+    def start(self):
+        """Démarre l'échantillonnage en arrière-plan (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        telemetry.start()
+        self._refresh_counters()
+        self._thread = threading.Thread(target=self._loop, name="kira-stats", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            # Réveillé uniquement par les écritures qui modifient les compteurs
+            self._counters_dirty.wait()
+            try:
+                self._counters_dirty.clear()
+                self._refresh_counters()
+            except Exception as e:
+                logger.warning(f"Échantillonnage des statistiques impossible: {e}")
+
+    def _refresh_counters(self):
+        counters = get_memory_counters()
+        if counters:
+            with self._lock:
+                self._counters = counters
+
+    def get_counters(self) -> Dict[str, int]:
+        """Messages, utilisateurs et échanges archivés (valeurs en cache)"""
+        with self._lock:
+            return dict(self._counters)
+
+
+stats_service = StatsService()
@@ -0,0 +1,150 @@
+"""
+Résumés glissants des conversations
+Pendant que le modèle est inactif, les anciens échanges de chaque utilisateur sont condensés
+dans un résumé stocké ; le prompt utilise alors « résumé + derniers échanges ».
+"""
+import asyncio
+from typing import Optional
+from config import config, logger
+from database import get_db_connection, run_read
+from memory import get_summary, save_summary
+from model import model_manager, inference_scheduler
+from utils import count_tokens, truncate_text_to_tokens
+
+SUMMARY_PROMPT = (
+    "Tu es Kira. Résume en quelques phrases, à la troisième personne, ce que tu dois retenir "
+    "de tes conversations avec cet utilisateur : faits importants, préférences, sujets en cours. "
+    "Reste factuelle et concise.\n\n"
+)
+
+
+class ConversationSummarizer:
+    """Tâche de fond qui met à jour les résumés quand la file d'inférence est vide"""
+
+    def __init__(self, interval: float, keep_turns: int, min_turns: int,
+                 batch_turns: int, max_tokens: int):
+        self.interval = interval
+        self.keep_turns = keep_turns
+        self.min_turns = min_turns
+        self.batch_turns = batch_turns
+        self.max_tokens = max_tokens
+        self._task: Optional[asyncio.Task] = None
+        # Plus grand id de memory déjà examiné : seuls les utilisateurs actifs depuis sont candidats
+        self._watermark = 0
+        self._candidates = set()
+        self.summaries = 0
+
+    def start(self):
+        """Démarre la boucle sur l'event loop courante (idempotent)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+            logger.info(f"Résumés glissants activés (toutes les {self.interval:.0f}s si le modèle est inactif)")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                if not model_manager.is_ready() or model_manager.swapping or not inference_scheduler.is_idle():
+                    continue
+                user_id = await run_read(self._next_candidate)
+                if user_id is not None:
+                    await self.summarize_user(user_id)
+            except Exception as e:
+                logger.error(f"Erreur du résumé glissant: {e}", exc_info=True)
+
+    def _next_candidate(self) -> Optional[str]:
+        """Utilisateur ayant assez d'échanges anciens non résumés (lecture bornée aux nouvelles lignes)"""
+        with get_db_connection() as conn:
+            row = conn.execute("SELECT COALESCE(MAX(id), 0) FROM memory").fetchone()
+            top = row[0]
+            if top > self._watermark:
+                users = conn.execute(
+                    "SELECT DISTINCT user_id FROM memory WHERE id > ? AND id <= ?", (self._watermark, top)
+                ).fetchall()
+                self._candidates.update(user_id for (user_id,) in users)
+                self._watermark = top
+
+        for user_id in list(self._candidates):
+            summary, newer = get_summary(user_id)
+            if summary is None:
+                with get_db_connection() as conn:
+                    newer = conn.execute("SELECT COUNT(*) FROM memory WHERE user_id = ?", (user_id,)).fetchone()[0]
+            if newer - self.keep_turns >= self.min_turns:
+                return user_id
+            # Redeviendra candidat à sa prochaine activité
+            self._candidates.discard(user_id)
+        return None
+
+    def _load_turns(self, user_id: str):
+        """Résumé actuel et échanges à y intégrer (les keep_turns derniers restent bruts)"""
+        with get_db_connection() as conn:
+            row = conn.execute(
+                "SELECT summary, last_memory_id FROM memory_summaries WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            summary, last_memory_id = row if row is not None else (None, 0)
+            # Borne en SQL : au plus un lot plus les keep_turns échanges qui restent bruts
+            turns = conn.execute("""
+                SELECT id, user_input, bot_response FROM memory
+                WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?
+            """, (user_id, last_memory_id, self.batch_turns + self.keep_turns)).fetchall()
+        # Moins de lignes que la limite : les keep_turns dernières sont les plus récentes de l'utilisateur
+        return summary, turns[:max(0, len(turns) - self.keep_turns)]
+
+    def _build_summary_prompt(self, summary: Optional[str], turns, n_ctx: int) -> str:
+        budget = n_ctx - self.max_tokens - 64
+        prompt = SUMMARY_PROMPT
+        if summary:
+            prompt += f"Résumé précédent :\n{summary}\n\n"
+        prompt += "Nouveaux échanges :\n"
+        closing = "\nRésumé mis à jour :"
+        remaining = budget - count_tokens(prompt) - count_tokens(closing)
+        # Chaque échange est tronqué à une part égale du budget restant
+        per_turn = max(32, remaining // max(1, len(turns)))
+        for _, user_input, bot_response in turns:
+            turn = truncate_text_to_tokens(f"Utilisateur: {user_input}\nKira: {bot_response}\n", per_turn)
+            prompt += turn if turn.endswith("\n") else turn + "\n"
+        return prompt + closing
+
+    async def summarize_user(self, user_id: str) -> bool:
+        """Intègre les anciens échanges de user_id dans son résumé"""
+        summary, turns = await run_read(self._load_turns, user_id)
+        if not turns:
+            self._candidates.discard(user_id)
+            return False
+
+        # Le modèle peut être en chargement ou en bascule de profil depuis le début de la passe
+        context_info = model_manager.get_context_info() if model_manager.is_ready() else None
+        if context_info is None:
+            return False
+
+        prompt = self._build_summary_prompt(summary, turns, context_info['actual_ctx'])
+        output = await inference_scheduler.submit(
+            user_id,
+            prompt,
+            background=True,
+            max_tokens=self.max_tokens,
+            temperature=0.3,
+            top_p=0.9,
+            stop=["Utilisateur:", "Nouveaux échanges"],
+        )
+        text = output["choices"][0]["text"].strip() if isinstance(output, dict) else str(output).strip()
+        if not text:
+            logger.warning(f"Résumé vide pour {user_id}, nouvel essai plus tard")
+            return False
+
+        await asyncio.to_thread(save_summary, user_id, text, turns[-1][0])
+        # Le résumé précède l'historique dans le prompt : l'état KV de l'utilisateur ne partage
+        # plus que la persona avec son prochain prompt, inutile de le garder en cache
+        model_manager.user_state_cache.invalidate(user_id)
+        self.summaries += 1
+        logger.info(f"{len(turns)} échanges résumés pour {user_id}")
+        return True
+
+
+conversation_summarizer = ConversationSummarizer(
+    interval=config.SUMMARY_INTERVAL,
+    keep_turns=config.SUMMARY_KEEP_TURNS,
+    min_turns=config.SUMMARY_MIN_TURNS,
+    batch_turns=config.SUMMARY_BATCH_TURNS,
+    max_tokens=config.SUMMARY_MAX_TOKENS,
+)
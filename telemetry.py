@@ -0,0 +1,187 @@
+"""
+Télémétrie matérielle partagée (NVML + psutil)
+Un seul thread échantillonne GPU et système à cadence fixe ; le bot, l'optimiseur GPU et la GUI
+lisent le dernier instantané ou s'y abonnent au lieu d'interroger chacun le pilote.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+from config import config, logger
+from gpu_utils import GPUInfo, gpu_manager
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+
+@dataclass(frozen=True)
+class TelemetrySnapshot:
+    """Instantané matériel cohérent (None lorsque la source est indisponible)"""
+    timestamp: float
+    gpu: Optional[GPUInfo] = None
+    cpu_percent: Optional[float] = None
+    cpu_temp_c: Optional[float] = None
+    ram_percent: Optional[float] = None
+    ram_used_gb: Optional[float] = None
+    ram_total_gb: Optional[float] = None
+    ram_available_gb: Optional[float] = None
+    disk_percent: Optional[float] = None
+    disk_used_gb: Optional[float] = None
+    disk_total_gb: Optional[float] = None
+    net_bytes_sent: Optional[int] = None
+    net_bytes_recv: Optional[int] = None
+    net_rate_mb_s: Optional[float] = None
+    boot_time: Optional[float] = None
+
+
+class TelemetryService:
+    """Thread d'échantillonnage unique : chaque métrique est lue une fois par intervalle puis publiée"""
+
+    def __init__(self, interval: float = 2.0, disk_path: Optional[str] = None):
+        self.interval = max(0.5, float(interval))
+        self.disk_path = disk_path or config.data_dir
+        self._snapshot: Optional[TelemetrySnapshot] = None
+        self._subscribers: List[Callable[[TelemetrySnapshot], None]] = []
+        self._lock = threading.Lock()
+        self._sample_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_net = None
+        self.samples = 0
+        self.last_sample_ms = 0.0
+
+    def start(self):
+        """Démarre l'échantillonnage en arrière-plan (idempotent)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            if PSUTIL_AVAILABLE:
+                # Premier appel non bloquant : sert de référence au calcul suivant
+                psutil.cpu_percent(interval=None)
+            self._thread = threading.Thread(target=self._loop, name="kira-telemetry", daemon=True)
+            self._thread.start()
+        logger.info(f"Télémétrie matérielle démarrée (intervalle: {self.interval}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while True:
+            try:
+                self._publish(self.sample())
+            except Exception as e:
+                logger.warning(f"Échantillonnage de la télémétrie impossible: {e}")
+            if self._stop.wait(self.interval):
+                return
+
+    # --- Échantillonnage ---
+
+    def sample(self) -> TelemetrySnapshot:
+        """Lit toutes les sources une fois et remplace le dernier instantané"""
+        with self._sample_lock:
+            start = time.perf_counter()
+            now = time.time()
+            values: Dict[str, Any] = {'gpu': gpu_manager.get_gpu_info() if gpu_manager.is_available() else None}
+            if PSUTIL_AVAILABLE:
+                values.update(self._sample_system(now))
+            snapshot = TelemetrySnapshot(timestamp=now, **values)
+            self.last_sample_ms = (time.perf_counter() - start) * 1000
+            self.samples += 1
+            self._snapshot = snapshot
+            return snapshot
+
+    def _sample_system(self, now: float) -> Dict[str, Any]:
+        ram = psutil.virtual_memory()
+        values: Dict[str, Any] = {
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'cpu_temp_c': self._cpu_temperature(),
+            'ram_percent': ram.percent,
+            'ram_used_gb': ram.used / 1024**3,
+            'ram_total_gb': ram.total / 1024**3,
+            'ram_available_gb': ram.available / 1024**3,
+            'boot_time': psutil.boot_time(),
+        }
+        try:
+            disk = psutil.disk_usage(self.disk_path)
+            values.update({
+                'disk_percent': disk.percent,
+                'disk_used_gb': disk.used / 1024**3,
+                'disk_total_gb': disk.total / 1024**3,
+            })
+        except OSError as e:
+            logger.debug(f"Espace disque indisponible pour {self.disk_path}: {e}")
+        net = psutil.net_io_counters()
+        if net is not None:
+            values['net_bytes_sent'] = net.bytes_sent
+            values['net_bytes_recv'] = net.bytes_recv
+            if self._last_net is not None:
+                last_time, last_total = self._last_net
+                elapsed = now - last_time
+                if elapsed > 0:
+                    values['net_rate_mb_s'] = max(0, net.bytes_sent + net.bytes_recv - last_total) / elapsed / 1024**2
+            self._last_net = (now, net.bytes_sent + net.bytes_recv)
+        return values
+
+    @staticmethod
+    def _cpu_temperature() -> Optional[float]:
+        sensors_temperatures = getattr(psutil, 'sensors_temperatures', None)
+        if not sensors_temperatures:
+            return None
+        try:
+            temps = sensors_temperatures()
+        except Exception:
+            return None
+        if 'coretemp' in temps and temps['coretemp']:
+            return max(temp.current for temp in temps['coretemp'])
+        return None
+
+    def _publish(self, snapshot: TelemetrySnapshot):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.debug(f"Abonné de télémétrie en erreur: {e}")
+
+    # --- Lecture ---
+
+    def latest(self) -> TelemetrySnapshot:
+        """Dernier instantané (échantillonné immédiatement s'il n'en existe pas encore)"""
+        if self._thread is None:
+            self.start()
+        return self._snapshot or self.sample()
+
+    def subscribe(self, callback: Callable[[TelemetrySnapshot], None]) -> Callable[[TelemetrySnapshot], None]:
+        """Appelle callback(snapshot) depuis le thread de télémétrie à chaque échantillon"""
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+        self.start()
+        return callback
+
+    def unsubscribe(self, callback: Callable[[TelemetrySnapshot], None]):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscribers = len(self._subscribers)
+        return {
+            'interval': self.interval,
+            'samples': self.samples,
+            'subscribers': subscribers,
+            'last_sample_ms': self.last_sample_ms,
+        }
+
+
+telemetry = TelemetryService(
+    interval=config.TELEMETRY_INTERVAL,
+    disk_path=os.path.dirname(os.path.abspath(config.DB_PATH)),
+)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Environnement commun des tests : aucune base, aucun log ni modèle du dépôt n'est touché
+
+config.py lit ses chemins une seule fois, à l'import : l'environnement de session est donc
+posé ici avant la collecte des modules de test. Chaque test reçoit en plus son propre
+dossier temporaire (tmp_path) pour les bases qu'il crée.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Ajouter le répertoire du projet au path
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+_session_env = pytest.MonkeyPatch()
+_SESSION_DIR = tempfile.mkdtemp(prefix="kira-tests-")
+
+
+def _isolated_env(base_dir: str) -> dict:
+    """Variables qui redirigent bases, logs et modèle vers base_dir"""
+    model_path = os.path.join(base_dir, "model.gguf")
+    if not os.path.exists(model_path):
+        open(model_path, "wb").close()
+    return {
+        "DATA_DIR": base_dir,
+        "DB_PATH": os.path.join(base_dir, "neuro.db"),
+        "MODEL_PATH": model_path,
+        "LOG_DIR": base_dir,
+        "LOG_DB_PATH": os.path.join(base_dir, "logs.db"),
+        "ADVANCED_LOGGING": "false",
+        "MODEL_AUTOLOAD": "false",
+    }
+
+
+def pytest_configure(config):
+    for key, value in _isolated_env(_SESSION_DIR).items():
+        _session_env.setenv(key, value)
+    if not os.getenv("DISCORD_TOKEN"):
+        _session_env.setenv("DISCORD_TOKEN", "test")
+    if not os.getenv("AUTH_SECRET"):
+        _session_env.setenv("AUTH_SECRET", "test")
+
+
+def pytest_unconfigure(config):
+    _session_env.undo()
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _check_isolation():
+    """Un .env (chargé avec override) ne doit pas rediriger les tests vers la vraie base"""
+    from config import config
+    if not os.path.abspath(config.DB_PATH).startswith(_SESSION_DIR):
+        pytest.exit(f"DB_PATH pointe vers {config.DB_PATH} (fichier .env ?) - tests annulés", returncode=1)
+
+
+@pytest.fixture
+def kira_env(tmp_path, monkeypatch):
+    """Environnement propre au test, pour le code qui relit les variables à l'appel"""
+    for key, value in _isolated_env(str(tmp_path)).items():
+        monkeypatch.setenv(key, value)
+    return tmp_path
+
+
+@pytest.fixture
+def db_manager_factory(tmp_path):
+    """Crée des DatabaseManager sur des bases neuves dans le dossier du test"""
+    from database import DatabaseManager
+
+    def factory(name: str = "neuro.db"):
+        return DatabaseManager(str(tmp_path / name))
+    return factory
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de l'assemblage du prompt : la partie qui dépend du message est placée après l'historique,
+le préfixe (persona + historique) reste commun d'un message à l'autre pour le cache KV
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import model
+import utils
+from benchmarks.fake_llama import FakeLlama
+
+HISTORY = [
+    ("Salut Kira, tu te souviens de mon chat ?", "Bien sûr, il s'appelle Pixel !"),
+    ("Il a encore renversé mon café ce matin.", "Ce Pixel est incorrigible."),
+    ("Je pense l'emmener chez le vétérinaire.", "Bonne idée, il a l'air en forme mais un contrôle rassure."),
+]
+
+
+@pytest.fixture
+def conversation(monkeypatch):
+    """Mémoire factice : faits et souvenirs dépendant du message, historique qui s'allonge à chaque échange"""
+    llm = FakeLlama(n_ctx=4096)
+    utils.set_tokenizer(llm)
+    history = list(HISTORY)
+
+    async def facts(user_id, prompt, k, token_budget):
+        return [f"Fait le plus proche de « {prompt} »"]
+
+    async def summary(user_id):
+        return None, 0
+
+    async def get_history(user_id, limit=10):
+        return history[-limit:]
+
+    async def search(user_id, text, k, min_score):
+        return [(f"Ancienne question sur {text}", "Ancienne réponse", 0.9)]
+
+    monkeypatch.setattr(model, "_get_max_context", lambda: 4096)
+    monkeypatch.setattr(model, "aget_relevant_facts", facts)
+    monkeypatch.setattr(model, "aget_summary", summary)
+    monkeypatch.setattr(model, "aget_history", get_history)
+    monkeypatch.setattr(model, "semantic_index", SimpleNamespace(ready=True, asearch=search))
+    yield SimpleNamespace(llm=llm, history=history)
+    utils.set_tokenizer(None)
+
+
+def _tokens(llm, text):
+    return llm.tokenize(text.encode("utf-8"), special=True)
+
+
+def _build(user_id, message):
+    prompt, error = asyncio.run(model._build_prompt(user_id, message, context_limit=10, max_tokens=200))
+    assert error is None
+    return prompt
+
+
+def test_consecutive_prompts_share_more_than_the_persona(conversation):
+    """Deux messages successifs du même utilisateur partagent persona + historique commun"""
+    first = _build("u", "Quel vaccin pour un chat ?")
+    conversation.history.append(("Quel vaccin pour un chat ?", "Le typhus et le coryza, en général."))
+    second = _build("u", "Et pour un chien ?")
+
+    llm = conversation.llm
+    shared = model._common_prefix_length(_tokens(llm, first), _tokens(llm, second))
+    persona = len(_tokens(llm, model.KIRA_PERSONA_PROMPT))
+    stable = len(_tokens(llm, model.KIRA_PERSONA_PROMPT + "".join(
+        f"Utilisateur: {u}\nKira: {b}\n" for u, b in HISTORY)))
+    assert shared > persona
+    # Au découpage près du dernier token, tout l'historique commun est réutilisable
+    assert shared >= stable - 1
+
+
+def test_message_dependent_context_sits_before_the_question(conversation):
+    """Faits pertinents et souvenirs proches suivent l'historique et précèdent directement la question"""
+    prompt = _build("u", "Quel vaccin pour un chat ?")
+    last_turn = prompt.index(HISTORY[-1][1])
+    facts = prompt.index("Voici ce que je sais à propos de cet utilisateur")
+    memories = prompt.index("Souvenirs de conversations passées avec cet utilisateur")
+    question = prompt.rindex("Utilisateur: Quel vaccin pour un chat ?\nKira:")
+    assert prompt.startswith(model.KIRA_PERSONA_PROMPT)
+    assert last_turn < facts < memories < question
+    assert prompt.endswith("Kira:")
+
+
+def test_summary_sits_between_the_persona_and_the_recent_turns(conversation, monkeypatch):
+    """Le résumé fait partie du préfixe stable : deux messages successifs le partagent"""
+    async def summary(user_id):
+        return "Pixel est le chat de l'utilisateur.", len(conversation.history)
+
+    monkeypatch.setattr(model, "aget_summary", summary)
+    first = _build("u", "Quel vaccin pour un chat ?")
+    conversation.history.append(("Quel vaccin pour un chat ?", "Le typhus et le coryza, en général."))
+    second = _build("u", "Et pour un chien ?")
+
+    summary_at = first.index("Résumé de nos conversations précédentes")
+    assert len(model.KIRA_PERSONA_PROMPT) <= summary_at < first.index(HISTORY[0][0])
+    llm = conversation.llm
+    shared = model._common_prefix_length(_tokens(llm, first), _tokens(llm, second))
+    assert shared >= len(_tokens(llm, first[:first.index(HISTORY[-1][1])])) - 1
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test des migrations du schéma neuro.db (PRAGMA user_version)
+"""
+
+import sqlite3
+
+from database import DatabaseManager, MIGRATIONS
+
+HISTORY_QUERY = "SELECT user_input, bot_response FROM memory WHERE user_id = ? ORDER BY id DESC LIMIT ?"
+
+
+def test_migrations_set_user_version(db_manager_factory):
+    """Une base neuve est amenée à la dernière version du schéma"""
+    manager = db_manager_factory()
+    assert manager.get_schema_version() == MIGRATIONS[-1][0]
+
+
+def test_migrations_are_idempotent(db_manager_factory):
+    """Réinitialiser une base déjà migrée ne rejoue rien et ne casse rien"""
+    manager = db_manager_factory()
+    manager._init_database()
+    assert manager.get_schema_version() == MIGRATIONS[-1][0]
+
+
+def test_legacy_database_is_upgraded(tmp_path):
+    """Une base créée par l'ancien code (user_version = 0) reçoit les migrations"""
+    path = str(tmp_path / "legacy.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("""
+            CREATE TABLE memory (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                user_input TEXT NOT NULL,
+                bot_response TEXT NOT NULL,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("CREATE INDEX idx_memory_user_id ON memory(user_id)")
+        conn.execute("INSERT INTO memory (user_id, user_input, bot_response) VALUES ('u', 'a', 'b')")
+
+    manager = DatabaseManager(path)
+    assert manager.get_schema_version() == MIGRATIONS[-1][0]
+    with manager.get_connection() as conn:
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(memory)")}
+        count = conn.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+    assert "idx_memory_user_id_id" in indexes
+    assert "idx_memory_user_id" not in indexes
+    assert count == 1
+
+
+def test_history_query_uses_composite_index(db_manager_factory):
+    """L'historique par utilisateur passe par l'index (user_id, id) sans tri temporaire"""
+    manager = db_manager_factory()
+    with manager.get_connection() as conn:
+        plan = " | ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + HISTORY_QUERY, ("u", 10)))
+    print(f"  Plan: {plan}")
+    assert "idx_memory_user_id_id" in plan
+    assert "TEMP B-TREE" not in plan.upper()
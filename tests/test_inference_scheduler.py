@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de l'ordonnanceur d'inférence (équité, file pleine, échéances, tâches de fond)
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from inference import InferenceScheduler, InferenceQueueFull, InferenceTimeout
+
+
+class FakeModelManager:
+    """Imite complete()/complete_batch() de ModelManager ; le prompt "block" attend release"""
+
+    def __init__(self):
+        self.calls = []
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def complete(self, prompt, user_id=None, should_stop=None, **kwargs):
+        self.calls.append((prompt, user_id))
+        if prompt == "block":
+            self.started.set()
+            self.release.wait(5)
+        elif prompt == "slow":
+            # Génère jusqu'à ce que l'ordonnanceur demande l'arrêt
+            while not should_stop():
+                time.sleep(0.01)
+        return f"réponse:{prompt}"
+
+    def complete_batch(self, items):
+        self.batches.append([item['prompt'] for item in items])
+        return [self.complete(item['prompt'], user_id=item['user_id'], should_stop=item['should_stop'])
+                for item in items]
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+async def _start_blocker(scheduler, model):
+    """Occupe le worker avec une génération bloquée pour accumuler des requêtes en file"""
+    task = asyncio.create_task(scheduler.submit("x", "block"))
+    await asyncio.to_thread(model.started.wait, 5)
+    return task
+
+
+async def _enqueue(coro):
+    """Lance une soumission et lui laisse le temps d'entrer dans la file"""
+    task = asyncio.create_task(coro)
+    await asyncio.sleep(0)
+    return task
+
+
+def test_user_with_pending_requests_goes_behind_others():
+    """Un utilisateur qui a déjà des requêtes en attente passe derrière les nouveaux venus"""
+    async def scenario():
+        model = FakeModelManager()
+        scheduler = InferenceScheduler(model, max_queue=10)
+        blocker = await _start_blocker(scheduler, model)
+        tasks = [
+            await _enqueue(scheduler.submit("a", "a1")),
+            await _enqueue(scheduler.submit("a", "a2")),
+            await _enqueue(scheduler.submit("a", "a3")),
+            await _enqueue(scheduler.submit("b", "b1")),
+        ]
+        model.release.set()
+        await asyncio.gather(blocker, *tasks)
+        return [prompt for prompt, _ in model.calls]
+
+    assert _run(scenario()) == ["block", "a1", "b1", "a2", "a3"]
+
+
+def test_full_queue_rejects_requests():
+    """Au-delà de max_queue requêtes en attente, submit lève InferenceQueueFull"""
+    async def scenario():
+        model = FakeModelManager()
+        scheduler = InferenceScheduler(model, max_queue=2)
+        blocker = await _start_blocker(scheduler, model)
+        tasks = [await _enqueue(scheduler.submit(user, user)) for user in ("a", "b")]
+        with pytest.raises(InferenceQueueFull):
+            await scheduler.submit("c", "c")
+        model.release.set()
+        await asyncio.gather(blocker, *tasks)
+        return scheduler.get_stats()
+
+    stats = _run(scenario())
+    assert stats['rejected'] == 1
+    assert stats['completed'] == 3
+
+
+def test_background_requests_do_not_fill_the_user_queue():
+    """Les tâches de fond passent en dernier et sont refusées avant les messages"""
+    async def scenario():
+        model = FakeModelManager()
+        scheduler = InferenceScheduler(model, max_queue=1)
+        blocker = await _start_blocker(scheduler, model)
+        background = await _enqueue(scheduler.submit("summary", "bg", background=True))
+        # La file est pleine pour les tâches de fond mais pas pour les utilisateurs
+        with pytest.raises(InferenceQueueFull):
+            await scheduler.submit("summary", "bg2", background=True)
+        user = await _enqueue(scheduler.submit("a", "a1"))
+        model.release.set()
+        await asyncio.gather(blocker, background, user)
+        return model.calls
+
+    calls = _run(scenario())
+    assert [prompt for prompt, _ in calls] == ["block", "a1", "bg"]
+    # Aucune sauvegarde d'état KV pour les tâches de fond
+    assert calls[-1] == ("bg", None)
+
+
+def test_deadline_expires_in_queue():
+    """Une requête dont l'échéance passe pendant l'attente n'est jamais générée"""
+    async def scenario():
+        model = FakeModelManager()
+        scheduler = InferenceScheduler(model, max_queue=10)
+        blocker = await _start_blocker(scheduler, model)
+        with pytest.raises(InferenceTimeout):
+            await scheduler.submit("a", "late", timeout=0.05)
+        model.release.set()
+        await blocker
+        # Laisse le worker dépiler la requête expirée
+        await scheduler._queue.join()
+        return model.calls, scheduler.get_stats()
+
+    calls, stats = _run(scenario())
+    assert ("late", "a") not in calls
+    assert stats['expired'] == 1
+
+
+def test_deadline_stops_running_generation():
+    """L'échéance interrompt la génération en cours via should_stop et wait_for"""
+    async def scenario():
+        model = FakeModelManager()
+        scheduler = InferenceScheduler(model, max_queue=10)
+        start = time.monotonic()
+        with pytest.raises(InferenceTimeout):
+            await scheduler.submit("a", "slow", timeout=0.1)
+        elapsed = time.monotonic() - start
+        await scheduler._queue.join()
+        return elapsed
+
+    assert _run(scenario()) < 2
+
+
+def test_waiting_requests_are_batched():
+    """Avec max_batch > 1, les requêtes déjà en file partent dans un même lot"""
+    async def scenario():
+        model = FakeModelManager()
+        scheduler = InferenceScheduler(model, max_queue=10, max_batch=3)
+        blocker = await _start_blocker(scheduler, model)
+        tasks = [await _enqueue(scheduler.submit(user, user)) for user in ("a", "b", "c")]
+        model.release.set()
+        results = await asyncio.gather(blocker, *tasks)
+        return model.batches, results
+
+    batches, results = _run(scenario())
+    assert batches == [["a", "b", "c"]]
+    assert results[1:] == ["réponse:a", "réponse:b", "réponse:c"]
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test des lectures de LogDatabase sur plusieurs partitions journalières
+(pagination par clé, suivi en direct, parcours par blocs, avec et sans filtres)
+"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+from tools.advanced_logging import LogDatabase, LogEntry, LogLevel
+
+DAYS = 3
+PER_DAY = 10
+
+
+def _new_database(tmp_path):
+    """Base de logs sur trois jours : 10 entrées par jour, une sur trois en ERROR, loggers alternés"""
+    db = LogDatabase(str(tmp_path / "logs.db"))
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    entries = []
+    for day in range(DAYS):
+        for i in range(PER_DAY):
+            n = day * PER_DAY + i
+            entries.append(LogEntry(
+                timestamp=start + timedelta(days=day, minutes=i),
+                level=LogLevel.ERROR if n % 3 == 0 else LogLevel.INFO,
+                logger_name="bot" if n % 2 == 0 else "gui",
+                message=f"message {n}",
+            ))
+    # Ordre chronologique : les ids croissent avec le temps, comme en production
+    assert db.add_logs(entries) == len(entries)
+    return db, entries
+
+
+def _messages(entries):
+    return [entry.message for entry in entries]
+
+
+def test_entries_are_split_into_daily_partitions(tmp_path):
+    """Une table par jour, et add_logs renseigne les ids attribués"""
+    db, entries = _new_database(tmp_path)
+    with sqlite3.connect(db.db_path) as conn:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    db.close()
+    assert {"logs_p20260101", "logs_p20260102", "logs_p20260103"} <= tables
+    assert [entry.id for entry in entries] == list(range(1, DAYS * PER_DAY + 1))
+
+
+def test_before_id_pages_across_partitions(tmp_path):
+    """Les pages successives (id < plus petit id reçu) couvrent tout l'historique sans doublon"""
+    db, entries = _new_database(tmp_path)
+    pages = []
+    before_id = None
+    while True:
+        page = db.get_logs(limit=7, before_id=before_id)
+        if not page:
+            break
+        pages.append(page)
+        before_id = page[-1].id
+    db.close()
+
+    assert [len(page) for page in pages] == [7, 7, 7, 7, 2]
+    ids = [entry.id for page in pages for entry in page]
+    assert ids == sorted(ids, reverse=True)
+    assert _messages(entry for page in pages for entry in page) == _messages(reversed(entries))
+
+
+def test_before_id_pages_with_filters(tmp_path):
+    """Les filtres s'appliquent dans chaque partition traversée par la pagination"""
+    db, entries = _new_database(tmp_path)
+    expected = [entry.message for entry in reversed(entries)
+                if entry.level == LogLevel.ERROR and entry.logger_name == "bot"]
+    seen = []
+    before_id = None
+    while True:
+        page = db.get_logs(limit=2, level_filter=["ERROR"], logger_filter="bot", before_id=before_id)
+        if not page:
+            break
+        seen.extend(page)
+        before_id = page[-1].id
+    db.close()
+
+    assert _messages(seen) == expected
+    assert len({entry.timestamp.date() for entry in seen}) == DAYS
+
+
+def test_get_logs_since_crosses_partitions_in_order(tmp_path):
+    """get_logs_since rend les entrées postérieures à last_id, de la plus ancienne à la plus récente"""
+    db, entries = _new_database(tmp_path)
+    # Trois entrées avant la fin du premier jour
+    last_id = entries[PER_DAY - 3].id
+    newer = db.get_logs_since(last_id, limit=5)
+    everything = db.get_logs_since(last_id)
+    filtered = db.get_logs_since(last_id, level_filter=["ERROR"], search_term="message")
+    assert db.get_logs_since(db.get_last_id()) == []
+    db.close()
+
+    assert _messages(newer) == _messages(entries[PER_DAY - 2:PER_DAY + 3])
+    assert _messages(everything) == _messages(entries[PER_DAY - 2:])
+    assert _messages(filtered) == [entry.message for entry in entries[PER_DAY - 2:]
+                                   if entry.level == LogLevel.ERROR]
+
+
+def test_iter_logs_yields_bounded_chunks_across_partitions(tmp_path):
+    """iter_logs parcourt toutes les partitions par blocs de chunk_size, avec ou sans filtres"""
+    db, entries = _new_database(tmp_path)
+    chunks = list(db.iter_logs(chunk_size=8))
+    limited = list(db.iter_logs(chunk_size=8, limit=12))
+    filtered = list(db.iter_logs(chunk_size=3, logger_filter="gui",
+                                 start_date=datetime(2026, 1, 2), end_date=datetime(2026, 1, 3, 23, 59)))
+    db.close()
+
+    assert [len(chunk) for chunk in chunks] == [8, 8, 8, 6]
+    assert _messages(entry for chunk in chunks for entry in chunk) == _messages(reversed(entries))
+    assert [len(chunk) for chunk in limited] == [8, 4]
+    assert all(len(chunk) <= 3 for chunk in filtered)
+    assert _messages(entry for chunk in filtered for entry in chunk) == [
+        entry.message for entry in reversed(entries[PER_DAY:]) if entry.logger_name == "gui"
+    ]
+
+
+def test_add_logs_recovers_partitions_dropped_by_another_process(tmp_path):
+    """Une partition supprimée par une autre connexion (visionneur) est recréée à l'écriture suivante"""
+    db, entries = _new_database(tmp_path)
+    viewer = LogDatabase(db.db_path)
+    assert viewer.delete_all_logs() == len(entries)
+    viewer.close()
+
+    late = LogEntry(timestamp=datetime(2026, 1, 3, 18, 0), level=LogLevel.INFO,
+                    logger_name="bot", message="après suppression")
+    written = db.add_logs([late])
+    logs = db.get_logs()
+    db.close()
+
+    assert written == 1
+    assert _messages(logs) == ["après suppression"]
+
+
+def test_add_logs_does_not_retry_other_operational_errors(tmp_path, monkeypatch):
+    """Une base verrouillée n'est tentée qu'une fois : le lot est compté perdu par l'appelant"""
+    db, _ = _new_database(tmp_path)
+    attempts = []
+
+    def locked(entries):
+        attempts.append(len(entries))
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(db, "_insert_logs", locked)
+    late = LogEntry(timestamp=datetime(2026, 1, 3, 18, 0), level=LogLevel.INFO,
+                    logger_name="bot", message="verrouillée")
+    written = db.add_logs([late])
+    db.close()
+
+    assert written == 0
+    assert attempts == [1]
+    assert late.id is None
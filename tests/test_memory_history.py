@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test de la lecture d'historique face aux écritures différées encore en file
+"""
+
+import pytest
+
+import memory
+from database import WriteBehindQueue
+
+
+@pytest.fixture
+def slow_writer(db_manager_factory, monkeypatch):
+    """Thread écrivain à longue fenêtre : une interaction reste en file pendant la lecture"""
+    manager = db_manager_factory()
+    writer = WriteBehindQueue(manager, flush_interval=1.0)
+    monkeypatch.setattr(memory, "db_writer", writer)
+    monkeypatch.setattr(memory, "get_db_connection", manager.get_connection)
+    yield writer
+    writer.close()
+
+
+@pytest.mark.parametrize("extra", [0, 10])
+def test_history_includes_queued_interaction(slow_writer, extra):
+    """Dans la fenêtre du cache comme au-delà, la dernière interaction en file est lue"""
+    user_id = f"user-{extra}"
+    memory.queue_interaction(user_id, "question", "réponse")
+    # Le cache ne doit pas servir la réponse : on force la lecture en base
+    memory.history_cache.invalidate(user_id)
+    assert slow_writer.pending() == 1
+
+    limit = memory.history_cache.turns_per_user + extra
+    assert memory.get_history(user_id, limit=limit) == [("question", "réponse")]
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test du tampon circulaire de métriques (moyenne glissante, valeurs absentes, statistiques de fenêtre)
+"""
+
+import math
+
+import pytest
+
+import tools.metrics_ring as metrics_ring
+from tools.metrics_ring import MetricsRingBuffer
+
+
+def _filled(values, capacity=8, window=4, field="gpu"):
+    buffer = MetricsRingBuffer([field], capacity=capacity, window=window)
+    for i, value in enumerate(values):
+        buffer.append(float(i), {field: value})
+    return buffer
+
+
+def test_rolling_mean_before_wrap():
+    """Moins d'échantillons que la fenêtre, puis fenêtre pleine avant le premier tour"""
+    buffer = _filled([])
+    assert buffer.rolling_mean("gpu") is None
+    buffer = _filled([1, 2, 3])
+    assert buffer.rolling_mean("gpu") == pytest.approx(2.0)
+    buffer = _filled([1, 2, 3, 4, 5, 6])
+    assert buffer.rolling_mean("gpu") == pytest.approx((3 + 4 + 5 + 6) / 4)
+    assert len(buffer) == 6
+
+
+def test_rolling_mean_after_wrap():
+    """Après plusieurs tours, la moyenne reste celle des `window` derniers échantillons"""
+    values = [float(i * i % 17) for i in range(29)]
+    buffer = _filled(values)
+    assert len(buffer) == 8
+    assert buffer.rolling_mean("gpu") == pytest.approx(sum(values[-4:]) / 4)
+    assert buffer.series("gpu") == values[-8:]
+    assert buffer.timestamps() == [float(i) for i in range(21, 29)]
+    assert buffer.latest("gpu") == values[-1]
+
+
+def test_missing_values_are_skipped():
+    """None est stocké en NaN et ignoré par la moyenne, y compris quand il sort de la fenêtre"""
+    buffer = _filled([1, None, 3])
+    assert buffer.rolling_mean("gpu") == pytest.approx(2.0)
+    assert buffer.latest("gpu") == 3
+    assert math.isnan(buffer.series("gpu")[1])
+
+    buffer = _filled([None, None, None, None])
+    assert buffer.rolling_mean("gpu") is None
+    assert buffer.latest("gpu") is None
+    assert buffer.window_stats("gpu") == {"mean": None, "min": None, "max": None, "p95": None}
+
+    # Les None sortent de la fenêtre et du tampon au fil des tours
+    buffer = _filled([None, 2, None, 4, 6, None, 8, 10, None, 12])
+    assert buffer.rolling_mean("gpu") == pytest.approx((8 + 10 + 12) / 3)
+
+
+def test_missing_fields_are_stored_as_nan():
+    buffer = MetricsRingBuffer(["gpu", "vram"], capacity=4, window=2)
+    buffer.append(0.0, {"gpu": 50})
+    buffer.append(1.0, {"gpu": 70, "vram": 30})
+    assert buffer.rolling_mean("gpu") == pytest.approx(60.0)
+    assert buffer.rolling_mean("vram") == pytest.approx(30.0)
+
+
+WINDOW_CASES = [
+    ([5.0, 1.0, 9.0], None),
+    ([float(i * 7 % 11) for i in range(23)], None),
+    ([float(i * 7 % 11) for i in range(23)], 8),
+    ([None, 3.0, None, 1.0, 4.0, 1.0, 5.0, None, 9.0, 2.0, 6.0], 6),
+    ([2.5] * 13, 3),
+]
+
+
+def _window_stats(values, n, numpy_enabled, monkeypatch):
+    monkeypatch.setattr(metrics_ring, "NUMPY_AVAILABLE", numpy_enabled)
+    buffer = _filled(values, capacity=8, window=5)
+    return buffer.window_stats("gpu", n)
+
+
+@pytest.mark.parametrize("values,n", WINDOW_CASES)
+def test_window_stats_fallback(values, n, monkeypatch):
+    """Sans NumPy : statistiques exactes des n derniers échantillons valides"""
+    stats = _window_stats(values, n, False, monkeypatch)
+    n = 5 if n is None else n
+    window = sorted(v for v in values[-min(n, 8):] if v is not None)
+    assert stats["mean"] == pytest.approx(sum(window) / len(window))
+    assert stats["min"] == window[0]
+    assert stats["max"] == window[-1]
+    assert window[0] <= stats["p95"] <= window[-1]
+
+
+@pytest.mark.skipif(not metrics_ring.NUMPY_AVAILABLE, reason="NumPy non installé")
+@pytest.mark.parametrize("values,n", WINDOW_CASES)
+def test_window_stats_same_with_and_without_numpy(values, n, monkeypatch):
+    """Le chemin vectorisé et le repli en Python pur donnent les mêmes statistiques"""
+    import numpy as np
+
+    expected = _window_stats(values, n, False, monkeypatch)
+    stats = _window_stats(values, n, True, monkeypatch)
+    assert stats == pytest.approx(expected)
+    window = [v for v in values[-min(5 if n is None else n, 8):] if v is not None]
+    assert stats["p95"] == pytest.approx(float(np.percentile(window, 95)))
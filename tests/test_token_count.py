@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test du comptage des tokens avec le tokenizer du modèle (BOS compté une fois par prompt)
+"""
+
+import pytest
+
+import utils
+from benchmarks.fake_llama import FakeLlama
+
+
+@pytest.fixture
+def fake_tokenizer():
+    llm = FakeLlama(n_ctx=2048)
+    utils.set_tokenizer(llm)
+    yield llm
+    utils.set_tokenizer(None)
+
+
+def test_segments_plus_bos_match_the_full_prompt(fake_tokenizer):
+    """La somme des segments plus bos_tokens() égale le compte du prompt tel que tokenisé"""
+    segments = ["Persona de Kira.\n", "Utilisateur: bonjour\nKira: salut\n", "Utilisateur: ça va ?\nKira:"]
+    full = "".join(segments)
+    full_tokens = len(fake_tokenizer.tokenize(full.encode("utf-8"), special=True))
+    assert utils.bos_tokens() == 1
+    assert utils.count_tokens(full) + utils.bos_tokens() == full_tokens
+
+
+def test_model_without_bos(fake_tokenizer, monkeypatch):
+    """Un modèle qui n'ajoute pas de BOS ne réserve aucun token de tête"""
+    original = FakeLlama.tokenize
+    monkeypatch.setattr(FakeLlama, "tokenize",
+                        lambda self, text, add_bos=True, special=False: original(self, text, False, special))
+    utils.set_tokenizer(fake_tokenizer)
+    assert utils.bos_tokens() == 0
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Test du thread écrivain WriteBehindQueue (lots, rejeu après échec, flush, jobs isolés)
+"""
+
+import sqlite3
+
+import pytest
+
+from database import WriteBehindQueue
+
+INSERT = "INSERT INTO memory (user_id, user_input, bot_response) VALUES (?, ?, ?)"
+
+
+@pytest.fixture
+def new_writer(db_manager_factory):
+    """Thread écrivain sur une base neuve du dossier du test"""
+    writers = []
+
+    def factory(flush_interval=0.2):
+        manager = db_manager_factory()
+        writer = WriteBehindQueue(manager, flush_interval=flush_interval)
+        writers.append(writer)
+        return manager, writer
+    yield factory
+    for writer in writers:
+        writer.close()
+
+
+def _count(manager):
+    with manager.get_connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+
+
+def test_writes_are_grouped_in_one_transaction(new_writer):
+    """Les écritures soumises pendant la fenêtre de flush partagent une transaction"""
+    manager, writer = new_writer()
+    futures = [writer.submit(INSERT, ("u", f"q{i}", f"r{i}")) for i in range(5)]
+    assert [future.result(timeout=5) for future in futures] == [1] * 5
+    stats = writer.get_stats()
+    writer.close()
+    assert stats['batches'] == 1
+    assert stats['committed'] == 5
+    assert _count(manager) == 5
+
+
+def test_failed_batch_is_replayed_one_by_one(new_writer):
+    """Une écriture invalide n'emporte pas les autres écritures du lot"""
+    manager, writer = new_writer()
+    ok_before = writer.submit(INSERT, ("u", "a", "b"))
+    broken = writer.submit(INSERT, ("u", None, "b"))  # user_input NOT NULL
+    ok_after = writer.submit(INSERT, ("u", "c", "d"))
+    assert ok_before.result(timeout=5) == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        broken.result(timeout=5)
+    assert ok_after.result(timeout=5) == 1
+    stats = writer.get_stats()
+    writer.close()
+    assert stats['failed'] == 1
+    assert stats['committed'] == 2
+    assert _count(manager) == 2
+
+
+def test_flush_waits_for_writes_already_submitted(new_writer):
+    """flush() ne rend la main qu'une fois les écritures antérieures validées"""
+    manager, writer = new_writer(flush_interval=0.05)
+    futures = [writer.submit(INSERT, ("u", f"q{i}", "r")) for i in range(300)]
+    assert writer.flush(timeout=5)
+    assert all(future.done() for future in futures)
+    assert writer.pending() == 0
+    writer.close()
+    assert _count(manager) == 300
+
+
+def test_job_runs_alone_after_the_current_batch(new_writer):
+    """Un job voit le lot précédent validé, s'exécute hors transaction et précède les écritures suivantes"""
+    manager, writer = new_writer()
+    seen = {}
+
+    def job(conn):
+        seen['in_transaction'] = conn.in_transaction
+        seen['rows'] = conn.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+        # VACUUM échoue dans une transaction ouverte
+        conn.execute("VACUUM")
+        return "ok"
+
+    first = writer.submit(INSERT, ("u", "a", "b"))
+    job_future = writer.submit_job(job)
+    last = writer.submit(INSERT, ("u", "c", "d"))
+    assert job_future.result(timeout=5) == "ok"
+    assert first.result(timeout=5) == 1 and last.result(timeout=5) == 1
+    stats = writer.get_stats()
+    writer.close()
+    assert seen == {'in_transaction': False, 'rows': 1}
+    # Le job coupe la fenêtre : deux lots d'écritures distincts
+    assert stats['batches'] == 2
+    assert _count(manager) == 2
@@ -4,15 +4,21 @@ Fournit un système de logs structuré avec interface graphique
 """
 
 import os
+import csv
+import gzip
 import json
 import logging
+import re
 import sqlite3
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Callable
+from typing import List, Dict, Optional, Callable, Iterator
+from collections import Counter
+from contextlib import contextmanager
 from dataclasses import dataclass
 from enum import Enum
 import threading
-from queue import Queue, Empty
+import time
+from queue import Queue, Empty, Full
 
 class LogLevel(Enum):
     """Niveaux de log avec couleurs associées"""
@@ -22,6 +28,12 @@ class LogLevel(Enum):
     ERROR = ("ERROR", "#dc3545")
     CRITICAL = ("CRITICAL", "#6f42c1")
 
+# Correspondance nom -> niveau (évite de parcourir l'énumération pour chaque ligne lue)
+_LEVELS_BY_NAME = {level.value[0]: level for level in LogLevel}
+# Identifiants de la table log_levels : valeurs numériques du module logging
+_LEVEL_IDS = {name: getattr(logging, name) for name in _LEVELS_BY_NAME}
+_LEVELS_BY_ID = {_LEVEL_IDS[name]: level for name, level in _LEVELS_BY_NAME.items()}
+
 @dataclass
 class LogEntry:
     """Structure d'une entrée de log"""
@@ -35,68 +47,494 @@ class LogEntry:
     thread_id: int = 0
     user_id: Optional[str] = None
     session_id: Optional[str] = None
+    id: Optional[int] = None  # Renseigné à la lecture depuis la base
+
+def _migrate_logs_fts(conn: sqlite3.Connection):
+    """Index plein texte FTS5 des messages, synchronisé par triggers (ignoré si FTS5 est absent)"""
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(
+                message, content='logs', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"FTS5 indisponible, recherche des logs par LIKE: {e}")
+        return
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS logs_fts_ai AFTER INSERT ON logs BEGIN
+            INSERT INTO logs_fts(rowid, message) VALUES (new.id, new.message);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS logs_fts_ad AFTER DELETE ON logs BEGIN
+            INSERT INTO logs_fts(logs_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        END
+    """)
+    # Indexe les logs existants
+    conn.execute("INSERT INTO logs_fts(logs_fts) VALUES ('rebuild')")
+
+
+# Partitions quotidiennes : logs_pAAAAMMJJ (+ index plein texte logs_pAAAAMMJJ_fts)
+_PARTITION_PREFIX = "logs_p"
+_PARTITION_RE = re.compile(r"^logs_p\d{8}$")
+_LOG_COLUMNS = ("id, timestamp, level_id, logger_name, message, module, function, "
+                "line_number, thread_id, user_id, session_id")
+# SQLite limite le nombre de SELECT d'une requête composée (500 par défaut)
+_VIEW_MAX_PARTITIONS = 400
+
+
+def _fts5_available() -> bool:
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE probe USING fts5(x)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _partition_name(day: str) -> str:
+    """Nom de la partition d'un jour ISO (AAAA-MM-JJ)"""
+    return _PARTITION_PREFIX + day.replace("-", "")
+
+
+def _list_log_tables(conn: sqlite3.Connection) -> set:
+    """Partitions et index plein texte présents dans la base"""
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB 'logs_p*'"
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def _list_partitions(tables: set) -> List[str]:
+    """Partitions triées de la plus ancienne à la plus récente"""
+    return sorted(name for name in tables if _PARTITION_RE.match(name))
+
+
+def _create_partition(conn: sqlite3.Connection, name: str, with_fts: bool):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            level_id INTEGER NOT NULL,
+            logger_name TEXT NOT NULL,
+            message TEXT NOT NULL,
+            module TEXT,
+            function TEXT,
+            line_number INTEGER,
+            thread_id INTEGER,
+            user_id TEXT,
+            session_id TEXT
+        )
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_timestamp ON {name}(timestamp)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_level ON {name}(level_id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_logger ON {name}(logger_name)")
+    if not with_fts:
+        return
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {name}_fts USING fts5(
+            message, content='{name}', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    # Les partitions ne sont jamais modifiées ligne à ligne : seule l'insertion est indexée
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {name}_fts_ai AFTER INSERT ON {name} BEGIN
+            INSERT INTO {name}_fts(rowid, message) VALUES (new.id, new.message);
+        END
+    """)
+
+
+def _drop_partition(conn: sqlite3.Connection, name: str):
+    """Supprime une partition entière (pages libérées sans suppression ligne à ligne)"""
+    conn.execute(f"DROP TABLE IF EXISTS {name}")
+    conn.execute(f"DROP TABLE IF EXISTS {name}_fts")
+
+
+def _refresh_logs_view(conn: sqlite3.Connection, partitions: List[str]):
+    """Recrée la vue logs (niveau en texte) pour les lecteurs directs de la base"""
+    conn.execute("DROP VIEW IF EXISTS logs")
+    selects = [
+        f"SELECT p.id, p.timestamp, l.name AS level, p.logger_name, p.message, p.module, p.function, "
+        f"p.line_number, p.thread_id, p.user_id, p.session_id FROM {name} p JOIN log_levels l ON l.id = p.level_id"
+        for name in partitions[-_VIEW_MAX_PARTITIONS:]
+    ]
+    if not selects:
+        selects = [
+            "SELECT NULL AS id, NULL AS timestamp, NULL AS level, NULL AS logger_name, NULL AS message, "
+            "NULL AS module, NULL AS function, NULL AS line_number, NULL AS thread_id, NULL AS user_id, "
+            "NULL AS session_id WHERE 0"
+        ]
+    conn.execute("CREATE VIEW logs AS " + " UNION ALL ".join(selects))
+
+
+def _migrate_logs_partitions(conn: sqlite3.Connection):
+    """Répartit la table logs historique par jour puis la remplace par une vue"""
+    conn.execute("CREATE TABLE IF NOT EXISTS log_sequence (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL)")
+    top = 0
+    legacy = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'logs'").fetchone()
+    if legacy is not None:
+        with_fts = _fts5_available()
+        days = [row[0] for row in conn.execute("SELECT DISTINCT substr(timestamp, 1, 10) FROM logs")]
+        for day in days:
+            name = _partition_name(day)
+            _create_partition(conn, name, with_fts)
+            # Plage sur l'index du timestamp : AAAA-MM-JJ <= t < AAAA-MM-JJU (les heures suivent un « T »)
+            conn.execute(f"""
+                INSERT INTO {name} ({_LOG_COLUMNS})
+                SELECT logs.id, logs.timestamp, COALESCE(log_levels.id, 20), logs.logger_name, logs.message,
+                       logs.module, logs.function, logs.line_number, logs.thread_id, logs.user_id, logs.session_id
+                FROM logs LEFT JOIN log_levels ON log_levels.name = logs.level
+                WHERE logs.timestamp >= ? AND logs.timestamp < ?
+            """, (day, day + "U"))
+        # Les ids ne sont jamais réutilisés, même ceux des logs déjà supprimés
+        row = conn.execute("""
+            SELECT MAX(COALESCE((SELECT MAX(id) FROM logs), 0),
+                       COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'logs'), 0))
+        """).fetchone()
+        top = row[0]
+        conn.execute("DROP TRIGGER IF EXISTS logs_fts_ai")
+        conn.execute("DROP TRIGGER IF EXISTS logs_fts_ad")
+        conn.execute("DROP TABLE IF EXISTS logs_fts")
+        conn.execute("DROP TABLE logs")
+    conn.execute("INSERT OR IGNORE INTO log_sequence (id, value) VALUES (1, ?)", (top,))
+    _refresh_logs_view(conn, _list_partitions(_list_log_tables(conn)))
+
+# Migrations du schéma de logs.db : (version, description, instructions SQL idempotentes ou fonction(conn))
+# Ne jamais modifier une migration publiée, en ajouter une nouvelle à la suite
+LOG_MIGRATIONS = [
+    (1, "table de correspondance des niveaux", [
+        "CREATE TABLE IF NOT EXISTS log_levels (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)",
+        "INSERT OR IGNORE INTO log_levels (id, name) VALUES "
+        + ", ".join(f"({level_id}, '{name}')" for name, level_id in _LEVEL_IDS.items()),
+    ]),
+    (2, "index plein texte FTS5 des messages", _migrate_logs_fts),
+    (3, "agrégats par minute, niveau et logger pour les statistiques", [
+        """CREATE TABLE IF NOT EXISTS log_rollup_minute (
+            minute TEXT NOT NULL,
+            level_id INTEGER NOT NULL,
+            logger_name TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (minute, level_id, logger_name)
+        ) WITHOUT ROWID""",
+        # Reprise des logs existants (parcours unique)
+        """INSERT OR IGNORE INTO log_rollup_minute (minute, level_id, logger_name, count)
+            SELECT substr(logs.timestamp, 1, 16), COALESCE(log_levels.id, 20), logs.logger_name, COUNT(*)
+            FROM logs LEFT JOIN log_levels ON log_levels.name = logs.level
+            GROUP BY 1, 2, 3""",
+    ]),
+    (4, "partitions quotidiennes derrière la vue logs", _migrate_logs_partitions),
+]
+
+_SEARCH_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts_query(search_term: str) -> Optional[str]:
+    """Requête FTS5 : chaque mot comme préfixe, tous requis (None si aucun mot exploitable)"""
+    words = _SEARCH_WORD_RE.findall(search_term)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words[:16])
+
 
 class LogDatabase:
-    """Gestionnaire de base de données pour les logs"""
+    """Gestionnaire de base de données pour les logs
+
+    Les logs sont stockés dans une table par jour (logs_pAAAAMMJJ) ; la vue logs les réunit
+    pour les lecteurs externes. Les lectures ne parcourent que les partitions de leur plage
+    de dates et la rétention supprime des partitions entières.
+    """
     
     def __init__(self, db_path: str):
         self.db_path = db_path
+        self._write_conn: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+        self._known_partitions: set = set()
+        self.fts_available = _fts5_available()
         self.init_database()
     
     def init_database(self):
         """Initialise la base de données des logs"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    CREATE TABLE IF NOT EXISTS logs (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        timestamp TEXT NOT NULL,
-                        level TEXT NOT NULL,
-                        logger_name TEXT NOT NULL,
-                        message TEXT NOT NULL,
-                        module TEXT,
-                        function TEXT,
-                        line_number INTEGER,
-                        thread_id INTEGER,
-                        user_id TEXT,
-                        session_id TEXT,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                # Index pour améliorer les performances
-                conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs(timestamp)")
-                conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_level ON logs(level)")
-                conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_logger ON logs(logger_name)")
-                conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_user ON logs(user_id)")
-                
-                conn.commit()
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            try:
+                if conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+                    # Schéma d'origine (table unique), repris ensuite par les migrations
+                    conn.execute("""
+                        CREATE TABLE IF NOT EXISTS logs (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            timestamp TEXT NOT NULL,
+                            level TEXT NOT NULL,
+                            logger_name TEXT NOT NULL,
+                            message TEXT NOT NULL,
+                            module TEXT,
+                            function TEXT,
+                            line_number INTEGER,
+                            thread_id INTEGER,
+                            user_id TEXT,
+                            session_id TEXT,
+                            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                        )
+                    """)
+                    conn.execute("CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs(timestamp)")
+                self._apply_migrations(conn)
+            finally:
+                conn.close()
         except Exception as e:
             print(f"Erreur initialisation base logs: {e}")
+
+    def _apply_migrations(self, conn: sqlite3.Connection):
+        """Applique dans l'ordre les migrations dont la version dépasse user_version"""
+        current = conn.execute("PRAGMA user_version").fetchone()[0]
+        latest = LOG_MIGRATIONS[-1][0]
+        if current > latest:
+            print(f"Base de logs en version {current}, plus récente que ce code (version {latest})")
+            return
+        
+        for version, description, statements in LOG_MIGRATIONS:
+            if version <= current:
+                continue
+            # Une transaction par migration : le schéma et user_version avancent ensemble
+            conn.execute("BEGIN")
+            try:
+                if callable(statements):
+                    statements(conn)
+                else:
+                    for statement in statements:
+                        conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                print(f"Échec de la migration des logs {version} ({description})")
+                raise
     
-    def add_log(self, entry: LogEntry):
-        """Ajoute une entrée de log à la base"""
+    @staticmethod
+    def _row(log_id: int, entry: LogEntry) -> tuple:
+        return (
+            log_id,
+            entry.timestamp.isoformat(),
+            _LEVEL_IDS.get(entry.level.value[0], logging.INFO),
+            entry.logger_name,
+            entry.message,
+            entry.module,
+            entry.function,
+            entry.line_number,
+            entry.thread_id,
+            entry.user_id,
+            entry.session_id
+        )
+
+    def _get_write_connection(self) -> sqlite3.Connection:
+        """Connexion d'écriture persistante (partagée sous verrou, ouverte à la demande)"""
+        if self._write_conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            # WAL : les lectures du visionneur ne bloquent plus l'écrivain
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._write_conn = conn
+        return self._write_conn
+
+    @contextmanager
+    def _write_transaction(self):
+        """Transaction d'écriture exclusive sur la connexion persistante"""
+        with self._write_lock:
+            conn = self._get_write_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+    def _ensure_partition(self, conn: sqlite3.Connection, name: str):
+        if name in self._known_partitions:
+            return
+        tables = _list_log_tables(conn)
+        if name not in tables:
+            _create_partition(conn, name, self.fts_available)
+            tables.add(name)
+            _refresh_logs_view(conn, _list_partitions(tables))
+        self._known_partitions.add(name)
+
+    def _insert_logs(self, entries: List[LogEntry]) -> int:
+        """Insère le lot dans ses partitions en une transaction ; retourne la séquence avant le lot"""
+        with self._write_transaction() as conn:
+            # Ids globaux croissants, partagés par toutes les partitions (et tous les processus)
+            first = conn.execute("SELECT value FROM log_sequence WHERE id = 1").fetchone()[0]
+            conn.execute("UPDATE log_sequence SET value = ? WHERE id = 1", (first + len(entries),))
+            
+            by_partition: Dict[str, list] = {}
+            for offset, entry in enumerate(entries, 1):
+                row = self._row(first + offset, entry)
+                by_partition.setdefault(_partition_name(row[1][:10]), []).append(row)
+            
+            for name, rows in by_partition.items():
+                self._ensure_partition(conn, name)
+                conn.executemany(
+                    f"INSERT INTO {name} ({_LOG_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+                )
+            
+            # Agrégats par minute calculés sur le lot : une mise à jour par clé, pas par log
+            rollup = Counter(
+                (row[1][:16], row[2], row[3]) for rows in by_partition.values() for row in rows
+            )
+            conn.executemany("""
+                INSERT INTO log_rollup_minute (minute, level_id, logger_name, count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (minute, level_id, logger_name) DO UPDATE SET count = count + excluded.count
+            """, [(*key, count) for key, count in rollup.items()])
+        return first
+
+    def add_logs(self, entries: List[LogEntry]) -> int:
+        """Ajoute un lot d'entrées en une seule transaction"""
+        if not entries:
+            return 0
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    INSERT INTO logs (timestamp, level, logger_name, message, module, 
-                                    function, line_number, thread_id, user_id, session_id)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    entry.timestamp.isoformat(),
-                    entry.level.value[0],
-                    entry.logger_name,
-                    entry.message,
-                    entry.module,
-                    entry.function,
-                    entry.line_number,
-                    entry.thread_id,
-                    entry.user_id,
-                    entry.session_id
-                ))
-                conn.commit()
+            try:
+                first = self._insert_logs(entries)
+            except sqlite3.OperationalError as e:
+                # Partition supprimée par un autre processus (nettoyage depuis le visionneur) :
+                # le cache local est périmé, on le vide et on réessaie une fois. Les autres
+                # erreurs (base verrouillée, disque) ne sont pas rejouées.
+                if "no such table" not in str(e):
+                    raise
+                self._known_partitions.clear()
+                first = self._insert_logs(entries)
+            
+            for offset, entry in enumerate(entries, 1):
+                entry.id = first + offset
+            return len(entries)
         except Exception as e:
-            print(f"Erreur ajout log: {e}")
+            print(f"Erreur ajout logs ({len(entries)} entrées): {e}")
+            return 0
+
+    def add_log(self, entry: LogEntry):
+        """Ajoute une entrée de log à la base"""
+        self.add_logs([entry])
+
+    def close(self):
+        """Ferme la connexion d'écriture"""
+        with self._write_lock:
+            if self._write_conn is not None:
+                self._write_conn.close()
+                self._write_conn = None
+
+    # --- Lecture ---
+
+    def _build_filters(self, fts_table: Optional[str],
+                       level_filter: Optional[List[str]] = None,
+                       search_term: Optional[str] = None,
+                       start_date: Optional[datetime] = None,
+                       end_date: Optional[datetime] = None,
+                       logger_filter: Optional[str] = None):
+        """Clause WHERE et paramètres d'une lecture filtrée sur une partition"""
+        query = " WHERE 1=1"
+        params = []
+        
+        if level_filter:
+            placeholders = ','.join(['?' for _ in level_filter])
+            query += f" AND level_id IN ({placeholders})"
+            params.extend(_LEVEL_IDS.get(level, -1) for level in level_filter)
+        
+        if search_term:
+            match = _fts_query(search_term) if fts_table else None
+            if match:
+                query += f" AND id IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ?)"
+                params.append(match)
+            else:
+                query += " AND message LIKE ?"
+                params.append(f"%{search_term}%")
+        
+        if start_date:
+            query += " AND timestamp >= ?"
+            params.append(start_date.isoformat())
+        
+        if end_date:
+            query += " AND timestamp <= ?"
+            params.append(end_date.isoformat())
+        
+        if logger_filter:
+            query += " AND logger_name = ?"
+            params.append(logger_filter)
+        
+        return query, params
+
+    @staticmethod
+    def _partitions_in_range(tables: set,
+                             start_date: Optional[datetime],
+                             end_date: Optional[datetime]) -> List[str]:
+        """Partitions couvrant [start_date, end_date], de la plus récente à la plus ancienne"""
+        partitions = _list_partitions(tables)
+        if start_date:
+            first = _partition_name(start_date.date().isoformat())
+            partitions = [name for name in partitions if name >= first]
+        if end_date:
+            last = _partition_name(end_date.date().isoformat())
+            partitions = [name for name in partitions if name <= last]
+        return partitions[::-1]
+
+    @staticmethod
+    def _row_to_entry(row) -> LogEntry:
+        return LogEntry(
+            timestamp=datetime.fromisoformat(row[1]),
+            level=_LEVELS_BY_ID.get(row[2], LogLevel.INFO),
+            logger_name=row[3],
+            message=row[4],
+            module=row[5] or "",
+            function=row[6] or "",
+            line_number=row[7] or 0,
+            thread_id=row[8] or 0,
+            user_id=row[9],
+            session_id=row[10],
+            id=row[0]
+        )
+
+    def _query_partitions(self, filters: Dict, limit: int, newer_than: Optional[int] = None,
+                          older_than: Optional[int] = None) -> List[LogEntry]:
+        """Lecture partition par partition, de la plus récente à la plus ancienne
+
+        Les ids croissent avec le temps : dès que `limit` lignes sont réunies, une partition
+        dont le plus grand id est inférieur à la dernière ligne retenue (ou à newer_than)
+        termine le parcours.
+        """
+        ascending = newer_than is not None
+        rows: list = []
+        with sqlite3.connect(self.db_path) as conn:
+            tables = _list_log_tables(conn)
+            for name in self._partitions_in_range(tables, filters.get('start_date'), filters.get('end_date')):
+                top = conn.execute(f"SELECT MAX(id) FROM {name}").fetchone()[0]
+                if top is None:
+                    continue
+                if ascending and top <= newer_than:
+                    break
+                if not ascending and len(rows) >= limit and top < rows[-1][0]:
+                    break
+                
+                fts_table = f"{name}_fts" if f"{name}_fts" in tables else None
+                where, params = self._build_filters(fts_table, **filters)
+                if newer_than is not None:
+                    where += " AND id > ?"
+                    params.append(newer_than)
+                if older_than is not None:
+                    where += " AND id < ?"
+                    params.append(older_than)
+                order = "ASC" if ascending else "DESC"
+                params.append(limit)
+                rows.extend(conn.execute(
+                    f"SELECT {_LOG_COLUMNS} FROM {name}{where} ORDER BY id {order} LIMIT ?", params
+                ).fetchall())
+                
+                if ascending:
+                    # Les partitions plus anciennes ne contiennent que des ids plus petits
+                    continue
+                rows.sort(key=lambda row: row[0], reverse=True)
+                del rows[limit:]
+        
+        if ascending:
+            rows.sort(key=lambda row: row[0])
+            del rows[limit:]
+        return [self._row_to_entry(row) for row in rows]
     
     def get_logs(self, 
                  limit: int = 1000,
@@ -104,104 +542,133 @@ class LogDatabase:
                  search_term: Optional[str] = None,
                  start_date: Optional[datetime] = None,
                  end_date: Optional[datetime] = None,
-                 logger_filter: Optional[str] = None) -> List[LogEntry]:
-        """Récupère les logs avec filtres"""
+                 logger_filter: Optional[str] = None,
+                 before_id: Optional[int] = None) -> List[LogEntry]:
+        """Récupère les logs avec filtres, du plus récent au plus ancien
+
+        before_id permet de paginer l'historique par clé (page suivante : id < plus petit id reçu)
+        sans OFFSET, à coût constant quelle que soit la profondeur.
+        """
         try:
-            query = "SELECT * FROM logs WHERE 1=1"
-            params = []
-            
-            if level_filter:
-                placeholders = ','.join(['?' for _ in level_filter])
-                query += f" AND level IN ({placeholders})"
-                params.extend(level_filter)
-            
-            if search_term:
-                query += " AND message LIKE ?"
-                params.append(f"%{search_term}%")
-            
-            if start_date:
-                query += " AND timestamp >= ?"
-                params.append(start_date.isoformat())
-            
-            if end_date:
-                query += " AND timestamp <= ?"
-                params.append(end_date.isoformat())
-            
-            if logger_filter:
-                query += " AND logger_name = ?"
-                params.append(logger_filter)
-            
-            query += " ORDER BY timestamp DESC LIMIT ?"
-            params.append(limit)
-            
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(query, params)
-                rows = cursor.fetchall()
-                
-                logs = []
-                for row in rows:
-                    # Trouve le niveau correspondant
-                    level = LogLevel.INFO  # défaut
-                    for log_level in LogLevel:
-                        if log_level.value[0] == row[2]:
-                            level = log_level
-                            break
-                    
-                    logs.append(LogEntry(
-                        timestamp=datetime.fromisoformat(row[1]),
-                        level=level,
-                        logger_name=row[3],
-                        message=row[4],
-                        module=row[5] or "",
-                        function=row[6] or "",
-                        line_number=row[7] or 0,
-                        thread_id=row[8] or 0,
-                        user_id=row[9],
-                        session_id=row[10]
-                    ))
-                
-                return logs
-                
+            filters = dict(level_filter=level_filter, search_term=search_term, start_date=start_date,
+                           end_date=end_date, logger_filter=logger_filter)
+            return self._query_partitions(filters, limit, older_than=before_id)
         except Exception as e:
             print(f"Erreur récupération logs: {e}")
             return []
+
+    def get_logs_since(self,
+                       last_id: int,
+                       limit: int = 1000,
+                       level_filter: Optional[List[str]] = None,
+                       search_term: Optional[str] = None,
+                       start_date: Optional[datetime] = None,
+                       end_date: Optional[datetime] = None,
+                       logger_filter: Optional[str] = None) -> List[LogEntry]:
+        """Logs postérieurs à last_id, du plus ancien au plus récent (suivi en direct)"""
+        try:
+            filters = dict(level_filter=level_filter, search_term=search_term, start_date=start_date,
+                           end_date=end_date, logger_filter=logger_filter)
+            return self._query_partitions(filters, limit, newer_than=last_id)
+        except Exception as e:
+            print(f"Erreur récupération nouveaux logs: {e}")
+            return []
+
+    def get_last_id(self) -> int:
+        """Identifiant de la dernière entrée écrite (0 si aucune)"""
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                return int(conn.execute("SELECT value FROM log_sequence WHERE id = 1").fetchone()[0])
+        except Exception as e:
+            print(f"Erreur lecture dernier id: {e}")
+            return 0
+
+    def iter_logs(self, chunk_size: int = 1000, limit: Optional[int] = None,
+                  **filters) -> Iterator[List[LogEntry]]:
+        """Parcourt les logs filtrés par blocs, du plus récent au plus ancien
+
+        Chaque bloc est une courte lecture paginée par clé (id < dernier id reçu) : la mémoire
+        reste bornée à chunk_size entrées et aucune transaction de lecture ne reste ouverte.
+        Les erreurs sont propagées à l'appelant.
+        """
+        remaining = limit
+        before_id = None
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = self._query_partitions(filters, size, older_than=before_id)
+            if not chunk:
+                return
+            yield chunk
+            before_id = chunk[-1].id
+            if remaining is not None:
+                remaining -= len(chunk)
+
+    def estimate_count(self,
+                       level_filter: Optional[List[str]] = None,
+                       search_term: Optional[str] = None,
+                       start_date: Optional[datetime] = None,
+                       end_date: Optional[datetime] = None,
+                       logger_filter: Optional[str] = None) -> Optional[int]:
+        """Nombre de logs correspondant aux filtres, lu dans les agrégats (None si recherche texte)"""
+        if search_term:
+            return None
+        query = "SELECT COALESCE(SUM(count), 0) FROM log_rollup_minute WHERE 1=1"
+        params = []
+        if level_filter:
+            query += f" AND level_id IN ({','.join('?' for _ in level_filter)})"
+            params.extend(_LEVEL_IDS.get(level, -1) for level in level_filter)
+        if start_date:
+            query += " AND minute >= ?"
+            params.append(start_date.isoformat()[:16])
+        if end_date:
+            query += " AND minute <= ?"
+            params.append(end_date.isoformat()[:16])
+        if logger_filter:
+            query += " AND logger_name = ?"
+            params.append(logger_filter)
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                return int(conn.execute(query, params).fetchone()[0])
+        except Exception as e:
+            print(f"Erreur estimation du nombre de logs: {e}")
+            return None
     
     def get_log_stats(self, days: int = 7) -> Dict:
-        """Récupère les statistiques des logs"""
+        """Récupère les statistiques des logs (depuis les agrégats par minute, sans parcourir logs)"""
         try:
-            start_date = datetime.now() - timedelta(days=days)
+            start_minute = (datetime.now() - timedelta(days=days)).isoformat()[:16]
             
             with sqlite3.connect(self.db_path) as conn:
                 # Statistiques par niveau
                 cursor = conn.execute("""
-                    SELECT level, COUNT(*) 
-                    FROM logs 
-                    WHERE timestamp >= ? 
-                    GROUP BY level
-                """, (start_date.isoformat(),))
+                    SELECT log_levels.name, SUM(r.count)
+                    FROM log_rollup_minute r JOIN log_levels ON log_levels.id = r.level_id
+                    WHERE r.minute >= ?
+                    GROUP BY r.level_id
+                """, (start_minute,))
                 
                 level_stats = dict(cursor.fetchall())
                 
                 # Statistiques par jour
                 cursor = conn.execute("""
-                    SELECT DATE(timestamp) as date, COUNT(*) 
-                    FROM logs 
-                    WHERE timestamp >= ? 
-                    GROUP BY DATE(timestamp)
+                    SELECT substr(minute, 1, 10) as date, SUM(count)
+                    FROM log_rollup_minute
+                    WHERE minute >= ?
+                    GROUP BY date
                     ORDER BY date
-                """, (start_date.isoformat(),))
+                """, (start_minute,))
                 
                 daily_stats = dict(cursor.fetchall())
                 
                 # Top loggers
                 cursor = conn.execute("""
-                    SELECT logger_name, COUNT(*) 
-                    FROM logs 
-                    WHERE timestamp >= ? 
+                    SELECT logger_name, SUM(count)
+                    FROM log_rollup_minute
+                    WHERE minute >= ?
                     GROUP BY logger_name
-                    ORDER BY COUNT(*) DESC
+                    ORDER BY SUM(count) DESC
                     LIMIT 10
-                """, (start_date.isoformat(),))
+                """, (start_minute,))
                 
                 logger_stats = dict(cursor.fetchall())
                 
@@ -217,67 +684,90 @@ class LogDatabase:
             print(f"Erreur statistiques logs: {e}")
             return {}
     
+    def _count_before(self, conn: sqlite3.Connection, minute: str) -> int:
+        """Nombre de logs antérieurs à une minute ISO, lu dans les agrégats"""
+        row = conn.execute(
+            "SELECT COALESCE(SUM(count), 0) FROM log_rollup_minute WHERE minute < ?", (minute,)
+        ).fetchone()
+        return int(row[0])
+
     def cleanup_old_logs(self, days_to_keep: int = 30):
-        """Nettoie les anciens logs"""
+        """Nettoie les anciens logs en supprimant les partitions des jours expirés
+
+        La coupure se fait au jour : le jour de la date limite est conservé en entier.
+        """
         try:
-            cutoff_date = datetime.now() - timedelta(days=days_to_keep)
+            cutoff_day = (datetime.now() - timedelta(days=days_to_keep)).date().isoformat()
+            cutoff_partition = _partition_name(cutoff_day)
             
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.execute(
-                    """
-                    DELETE FROM logs 
-                    WHERE timestamp < ?
-                    """,
-                    (cutoff_date.isoformat(),)
-                )
-                deleted_count = cursor.rowcount if cursor.rowcount != -1 else conn.total_changes
-                conn.commit()
-                return deleted_count
+            with self._write_transaction() as conn:
+                tables = _list_log_tables(conn)
+                expired = [name for name in _list_partitions(tables) if name < cutoff_partition]
+                deleted_count = self._count_before(conn, cutoff_day)
+                for name in expired:
+                    _drop_partition(conn, name)
+                    tables.discard(name)
+                conn.execute("DELETE FROM log_rollup_minute WHERE minute < ?", (cutoff_day,))
+                if expired:
+                    _refresh_logs_view(conn, _list_partitions(tables))
+            self._known_partitions.difference_update(expired)
+            return deleted_count
         except Exception as e:
             print(f"Erreur nettoyage logs: {e}")
             return 0
 
     def count_logs_older_than(self, cutoff_iso: str) -> int:
-        """Compte le nombre de logs plus vieux qu'une date ISO"""
+        """Compte le nombre de logs plus vieux qu'une date ISO (à la minute près)"""
         try:
             with sqlite3.connect(self.db_path) as conn:
-                cur = conn.execute(
-                    "SELECT COUNT(*) FROM logs WHERE timestamp < ?",
-                    (cutoff_iso,)
-                )
-                return int(cur.fetchone()[0] or 0)
+                return self._count_before(conn, cutoff_iso[:16])
         except Exception as e:
             print(f"Erreur comptage logs anciens: {e}")
             return 0
 
     def delete_all_logs(self) -> int:
-        """Supprime toutes les entrées de la table des logs et renvoie le nombre supprimé"""
+        """Supprime toutes les partitions de logs et renvoie le nombre d'entrées supprimées"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                # Compte avant suppression pour un retour fiable
-                cur = conn.execute("SELECT COUNT(*) FROM logs")
-                total = cur.fetchone()[0] or 0
-                conn.execute("DELETE FROM logs")
-                conn.commit()
-                return total
+            with self._write_transaction() as conn:
+                tables = _list_log_tables(conn)
+                total = self._count_before(conn, "9999")
+                for name in _list_partitions(tables):
+                    _drop_partition(conn, name)
+                conn.execute("DELETE FROM log_rollup_minute")
+                _refresh_logs_view(conn, [])
+            self._known_partitions.clear()
+            return total
         except Exception as e:
             print(f"Erreur suppression totale des logs: {e}")
             return 0
 
+_STOP = object()
+
 class AdvancedLogHandler(logging.Handler):
-    """Handler personnalisé pour capturer les logs dans la base"""
+    """Handler personnalisé pour capturer les logs dans la base
+
+    emit() ne fait que mettre l'entrée en file : un thread écrivain unique la vide et
+    insère les entrées par lots (taille ou délai atteint, et à la fermeture).
+    """
     
-    def __init__(self, log_db: LogDatabase, gui_callback: Optional[Callable] = None):
+    def __init__(self, log_db: LogDatabase, gui_callback: Optional[Callable] = None,
+                 batch_size: int = 200, flush_interval: float = 0.5, max_queue: int = 50000):
         super().__init__()
         self.log_db = log_db
         self.gui_callback = gui_callback
         self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue: Queue = Queue(maxsize=max_queue)
+        self._writer = threading.Thread(target=self._run, name="kira-log-writer", daemon=True)
+        self._writer.start()
     
     def emit(self, record):
-        """Traite un enregistrement de log"""
+        """Traite un enregistrement de log (mise en file, sans accès disque)"""
         try:
             # Détermine le niveau
-            level = LogLevel.INFO
             if record.levelno >= logging.CRITICAL:
                 level = LogLevel.CRITICAL
             elif record.levelno >= logging.ERROR:
@@ -289,7 +779,7 @@ class AdvancedLogHandler(logging.Handler):
             else:
                 level = LogLevel.DEBUG
             
-            # Crée l'entrée de log
+            # Crée l'entrée de log (le message est figé ici : les arguments peuvent changer ensuite)
             entry = LogEntry(
                 timestamp=datetime.fromtimestamp(record.created),
                 level=level,
@@ -303,16 +793,222 @@ class AdvancedLogHandler(logging.Handler):
                 session_id=self.session_id
             )
             
-            # Sauvegarde en base
-            self.log_db.add_log(entry)
-            
-            # Notifie l'interface graphique
-            if self.gui_callback:
-                self.gui_callback(entry)
+            try:
+                self._queue.put_nowait(entry)
+            except Full:
+                # Base saturée : on perd l'entrée plutôt que de bloquer l'appelant
+                self.dropped += 1
                 
         except Exception as e:
             print(f"Erreur dans AdvancedLogHandler: {e}")
 
+    def _run(self):
+        """Thread écrivain : accumule les entrées et les insère par lots"""
+        batch: List[LogEntry] = []
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except Empty:
+                item = None
+            if isinstance(item, LogEntry):
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+                if len(batch) < self.batch_size and time.monotonic() < deadline:
+                    continue
+            if batch:
+                self._write_batch(batch)
+                batch = []
+            if item is _STOP:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+
+    def _write_batch(self, batch: List[LogEntry]):
+        written = self.log_db.add_logs(batch)
+        self.written += written
+        # Lot rejeté par la base : perdu au même titre qu'une file saturée
+        self.dropped += len(batch) - written
+        # Notifie l'interface graphique une fois les entrées visibles en base
+        if self.gui_callback:
+            for entry in batch:
+                if entry.id is None:
+                    continue
+                try:
+                    self.gui_callback(entry)
+                except Exception as e:
+                    print(f"Erreur dans AdvancedLogHandler: {e}")
+
+    def flush(self, timeout: float = 5.0):
+        """Attend l'écriture de toutes les entrées déjà en file"""
+        if not self._writer.is_alive():
+            return
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except Full:
+            return
+        done.wait(timeout)
+
+    def close(self):
+        """Vide la file puis arrête le thread écrivain (appelé par logging.shutdown)"""
+        if self._writer.is_alive():
+            try:
+                self._queue.put(_STOP, timeout=5.0)
+            except Full:
+                pass
+            self._writer.join(5.0)
+        self.log_db.close()
+        super().close()
+
+    def get_stats(self) -> Dict:
+        return {
+            'pending': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+        }
+
+EXPORT_FORMATS = ("json", "ndjson", "csv", "txt")
+
+_CSV_HEADER = ["Timestamp", "Level", "Logger", "Message",
+               "Module", "Function", "Line", "Thread", "User ID", "Session ID"]
+
+
+def _entry_to_dict(log: LogEntry) -> Dict:
+    return {
+        "timestamp": log.timestamp.isoformat(),
+        "level": log.level.value[0],
+        "logger": log.logger_name,
+        "message": log.message,
+        "module": log.module,
+        "function": log.function,
+        "line": log.line_number,
+        "thread": log.thread_id,
+        "user_id": log.user_id,
+        "session_id": log.session_id
+    }
+
+
+class LogExportJob:
+    """Export de logs exécuté dans un thread dédié, avec progression et annulation
+
+    Le fichier est écrit sous un nom temporaire (.part) puis renommé une fois complet :
+    un export annulé ou en échec ne laisse pas de fichier tronqué.
+    """
+
+    def __init__(self, filepath: str, format_type: str, compress: bool, total: Optional[int],
+                 progress_callback: Optional[Callable[[int, Optional[int]], None]] = None):
+        self.filepath = filepath
+        self.format_type = format_type
+        self.compress = compress
+        self.total = total
+        self.written = 0
+        self.error: Optional[str] = None
+        self.cancelled = False
+        self.progress_callback = progress_callback
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, chunks: Iterator[List[LogEntry]]) -> "LogExportJob":
+        self._thread = threading.Thread(target=self._run, args=(chunks,), name="kira-log-export", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Demande l'arrêt de l'export (pris en compte entre deux blocs)"""
+        self._cancel.set()
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def success(self) -> bool:
+        return self._done.is_set() and self.error is None and not self.cancelled
+
+    def progress(self) -> float:
+        """Avancement entre 0 et 1 (0 tant que le total est inconnu)"""
+        if not self.total:
+            return 1.0 if self.is_done() else 0.0
+        return min(1.0, self.written / self.total)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Attend la fin de l'export et indique s'il a réussi"""
+        self._done.wait(timeout)
+        return self.success
+
+    def _open(self, path: str):
+        if self.compress:
+            return gzip.open(path, 'wt', encoding='utf-8', newline='')
+        return open(path, 'w', encoding='utf-8', newline='')
+
+    def _run(self, chunks: Iterator[List[LogEntry]]):
+        temp_path = self.filepath + ".part"
+        try:
+            with self._open(temp_path) as f:
+                self._write(f, chunks)
+            if self.cancelled:
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, self.filepath)
+        except Exception as e:
+            self.error = str(e)
+            print(f"Erreur export logs: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        finally:
+            self._done.set()
+
+    def _write(self, f, chunks: Iterator[List[LogEntry]]):
+        writer = csv.writer(f) if self.format_type == "csv" else None
+        if writer:
+            writer.writerow(_CSV_HEADER)
+        elif self.format_type == "json":
+            f.write("[")
+        
+        first = True
+        for chunk in chunks:
+            if self._cancel.is_set():
+                self.cancelled = True
+                break
+            
+            if self.format_type == "json":
+                # Tableau JSON écrit élément par élément
+                for log in chunk:
+                    f.write(("\n" if first else ",\n") + json.dumps(_entry_to_dict(log), ensure_ascii=False))
+                    first = False
+            elif self.format_type == "ndjson":
+                f.writelines(json.dumps(_entry_to_dict(log), ensure_ascii=False) + "\n" for log in chunk)
+            elif writer:
+                writer.writerows([
+                    log.timestamp.isoformat(),
+                    log.level.value[0],
+                    log.logger_name,
+                    log.message,
+                    log.module,
+                    log.function,
+                    log.line_number,
+                    log.thread_id,
+                    log.user_id or "",
+                    log.session_id or ""
+                ] for log in chunk)
+            else:
+                f.writelines(
+                    f"[{log.timestamp.strftime('%Y-%m-%d %H:%M:%S')}] "
+                    f"{log.level.value[0]} - {log.logger_name} - {log.message}\n"
+                    for log in chunk
+                )
+            
+            self.written += len(chunk)
+            if self.progress_callback:
+                self.progress_callback(self.written, self.total)
+        
+        if self.format_type == "json":
+            f.write("\n]\n")
+
+
 class LogManager:
     """Gestionnaire principal du système de logs avancé"""
     
@@ -345,6 +1041,9 @@ class LogManager:
             "notifications_enabled": True,
             "notification_levels": ["ERROR", "CRITICAL"],
             "gui_max_entries": 1000,
+            "db_batch_size": 200,
+            "db_flush_interval_ms": 500,
+            "db_queue_max": 50000,
             "auto_scroll": True,
             "dark_theme": True
         }
@@ -374,7 +1073,14 @@ class LogManager:
     def setup_logging(self):
         """Configure le système de logging"""
         # Handler pour la base de données
-        db_handler = AdvancedLogHandler(self.log_db, self.notify_gui)
+        db_handler = AdvancedLogHandler(
+            self.log_db,
+            self.notify_gui,
+            batch_size=int(self.config.get("db_batch_size", 200)),
+            flush_interval=float(self.config.get("db_flush_interval_ms", 500)) / 1000,
+            max_queue=int(self.config.get("db_queue_max", 50000)),
+        )
+        self.db_handler = db_handler
         db_handler.setLevel(getattr(logging, self.config.get("log_level", "INFO")))
         
         # Format des logs
@@ -426,9 +1132,17 @@ class LogManager:
         if callback in self.gui_callbacks:
             self.gui_callbacks.remove(callback)
     
+    def flush(self):
+        """Force l'écriture en base des logs encore en file"""
+        self.db_handler.flush()
+    
     def get_logs(self, **kwargs) -> List[LogEntry]:
         """Récupère les logs avec filtres"""
         return self.log_db.get_logs(**kwargs)
+
+    def get_logs_since(self, last_id: int, **kwargs) -> List[LogEntry]:
+        """Récupère uniquement les logs postérieurs à last_id"""
+        return self.log_db.get_logs_since(last_id, **kwargs)
     
     def get_stats(self, days: int = 7) -> Dict:
         """Récupère les statistiques"""
@@ -456,64 +1170,41 @@ class LogManager:
         """Compte les logs plus vieux que cutoff_dt"""
         return self.log_db.count_logs_older_than(cutoff_dt.isoformat())
     
+    def start_export(self,
+                     filepath: str,
+                     format_type: str = "ndjson",
+                     compress: Optional[bool] = None,
+                     progress_callback: Optional[Callable[[int, Optional[int]], None]] = None,
+                     chunk_size: int = 2000,
+                     limit: Optional[int] = None,
+                     **filter_kwargs) -> LogExportJob:
+        """Lance un export en arrière-plan (json, ndjson, csv ou txt, gzip si compress ou .gz)
+
+        Les logs sont lus et écrits par blocs de chunk_size : la mémoire utilisée ne dépend
+        pas du nombre de logs exportés. progress_callback(écrits, total estimé ou None) est
+        appelé depuis le thread d'export après chaque bloc.
+        """
+        format_type = format_type.lower()
+        if format_type not in EXPORT_FORMATS:
+            raise ValueError(f"Format d'export inconnu: {format_type}")
+        if compress is None:
+            compress = filepath.lower().endswith(".gz")
+        
+        # Les logs écrits juste avant l'export doivent en faire partie
+        self.flush()
+        total = self.log_db.estimate_count(**filter_kwargs)
+        if total is not None and limit is not None:
+            total = min(total, limit)
+        job = LogExportJob(filepath, format_type, compress, total, progress_callback)
+        return job.start(self.log_db.iter_logs(chunk_size=chunk_size, limit=limit, **filter_kwargs))
+    
     def export_logs(self, 
                    filepath: str, 
                    format_type: str = "json",
                    **filter_kwargs) -> bool:
-        """Exporte les logs vers un fichier"""
+        """Exporte les logs vers un fichier (bloquant, voir start_export pour la version asynchrone)"""
         try:
-            logs = self.get_logs(**filter_kwargs)
-            
-            if format_type.lower() == "json":
-                data = []
-                for log in logs:
-                    data.append({
-                        "timestamp": log.timestamp.isoformat(),
-                        "level": log.level.value[0],
-                        "logger": log.logger_name,
-                        "message": log.message,
-                        "module": log.module,
-                        "function": log.function,
-                        "line": log.line_number,
-                        "thread": log.thread_id,
-                        "user_id": log.user_id,
-                        "session_id": log.session_id
-                    })
-                
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
-            
-            elif format_type.lower() == "csv":
-                import csv
-                with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow([
-                        "Timestamp", "Level", "Logger", "Message", 
-                        "Module", "Function", "Line", "Thread", "User ID", "Session ID"
-                    ])
-                    
-                    for log in logs:
-                        writer.writerow([
-                            log.timestamp.isoformat(),
-                            log.level.value[0],
-                            log.logger_name,
-                            log.message,
-                            log.module,
-                            log.function,
-                            log.line_number,
-                            log.thread_id,
-                            log.user_id or "",
-                            log.session_id or ""
-                        ])
-            
-            elif format_type.lower() == "txt":
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    for log in logs:
-                        f.write(f"[{log.timestamp.strftime('%Y-%m-%d %H:%M:%S')}] "
-                               f"{log.level.value[0]} - {log.logger_name} - {log.message}\n")
-            
-            return True
-            
+            return self.start_export(filepath, format_type, **filter_kwargs).wait()
         except Exception as e:
             print(f"Erreur export logs: {e}")
             return False
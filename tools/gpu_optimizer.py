@@ -6,28 +6,15 @@ Optimise automatiquement les performances GPU et gère les profils adaptatifs
 
 import os
 import sys
-import time
 import json
-import threading
+import math
 from pathlib import Path
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 from config import logger
-
-try:
-    import pynvml
-    NVIDIA_AVAILABLE = True
-except ImportError:
-    NVIDIA_AVAILABLE = False
-    logger.warning("pynvml non disponible - fonctionnalités GPU limitées")
-
-try:
-    import psutil
-    PSUTIL_AVAILABLE = True
-except ImportError:
-    PSUTIL_AVAILABLE = False
-    logger.warning("psutil non disponible - monitoring système limité")
+from telemetry import TelemetrySnapshot, telemetry
+from tools.metrics_ring import MetricsRingBuffer
 
 @dataclass
 class GPUMetrics:
@@ -54,6 +41,17 @@ class SystemMetrics:
     cpu_temp_c: Optional[float]
     timestamp: datetime
 
+# Champs numériques conservés dans l'historique (le nom du GPU ne varie pas)
+GPU_HISTORY_FIELDS = (
+    "vram_total_mb", "vram_used_mb", "vram_free_mb", "usage_percent", "temperature_c",
+    "power_usage_w", "clock_graphics_mhz", "clock_memory_mhz", "utilization_gpu", "utilization_memory",
+)
+SYSTEM_HISTORY_FIELDS = ("cpu_percent", "ram_percent", "ram_available_gb", "cpu_temp_c")
+
+# Historique de 24 h ; moyennes et statistiques du rapport sur les 5 dernières minutes
+HISTORY_SECONDS = 24 * 3600
+REPORT_WINDOW_SECONDS = 5 * 60
+
 @dataclass
 class PerformanceProfile:
     """Profil de performance avancé avec métriques d'optimisation"""
@@ -86,23 +84,19 @@ class GPUOptimizer:
     """Optimiseur GPU avancé avec profils adaptatifs et monitoring en temps réel"""
     
     def __init__(self):
-        self.gpu_handle = None
         self.monitoring_active = False
-        self.metrics_history: List[GPUMetrics] = []
-        self.system_metrics_history: List[SystemMetrics] = []
+        self.monitoring_interval = 5.0
+        self._last_recorded = 0.0
+        self._init_history(self.monitoring_interval)
         self.current_metrics: Optional[GPUMetrics] = None
         self.current_system_metrics: Optional[SystemMetrics] = None
         self.performance_data = {}
         self.auto_optimization_enabled = True
-        self.monitoring_thread = None
         
         # Profils de performance optimisés pour RTX 4050 6GB
         self.performance_profiles = self._create_optimized_profiles()
         
-        # Initialiser le monitoring GPU
-        self._init_gpu_monitoring()
-        
-        # Démarrer le monitoring automatique
+        # Démarrer le monitoring automatique (abonnement à la télémétrie partagée)
         self.start_monitoring()
     
     def _create_optimized_profiles(self) -> Dict[str, PerformanceProfile]:
@@ -271,170 +265,110 @@ class GPUOptimizer:
             )
         }
     
-    def _init_gpu_monitoring(self):
-        """Initialise le monitoring GPU"""
-        if not NVIDIA_AVAILABLE:
-            logger.warning("GPU monitoring indisponible - NVIDIA GPU non détectée")
-            return
-        
-        try:
-            pynvml.nvmlInit()
-            self.gpu_handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-            logger.info("GPU monitoring initialisé avec succès")
-        except Exception as e:
-            logger.error(f"Erreur initialisation GPU monitoring: {e}")
-            self.gpu_handle = None
-    
-    def get_gpu_metrics(self) -> Optional[GPUMetrics]:
-        """Récupère les métriques GPU détaillées"""
-        if not self.gpu_handle:
+    @staticmethod
+    def _gpu_metrics_from(snapshot: TelemetrySnapshot) -> Optional[GPUMetrics]:
+        gpu = snapshot.gpu
+        if gpu is None:
             return None
-        
-        try:
-            # Informations mémoire
-            mem_info = pynvml.nvmlDeviceGetMemoryInfo(self.gpu_handle)
-            
-            # Informations GPU
-            gpu_name = pynvml.nvmlDeviceGetName(self.gpu_handle)
-            if isinstance(gpu_name, bytes):
-                gpu_name = gpu_name.decode()
-            
-            # Température
-            try:
-                temperature = pynvml.nvmlDeviceGetTemperature(self.gpu_handle, pynvml.NVML_TEMPERATURE_GPU)
-            except:
-                temperature = 0
-            
-            # Consommation électrique
-            try:
-                power_usage = pynvml.nvmlDeviceGetPowerUsage(self.gpu_handle) // 1000  # mW -> W
-            except:
-                power_usage = 0
-            
-            # Fréquences
-            try:
-                clock_info = pynvml.nvmlDeviceGetClockInfo(self.gpu_handle, pynvml.NVML_CLOCK_GRAPHICS)
-                memory_clock = pynvml.nvmlDeviceGetClockInfo(self.gpu_handle, pynvml.NVML_CLOCK_MEM)
-            except:
-                clock_info = 0
-                memory_clock = 0
-            
-            # Utilisation
-            try:
-                utilization = pynvml.nvmlDeviceGetUtilizationRates(self.gpu_handle)
-                gpu_util = utilization.gpu
-                mem_util = utilization.memory
-            except:
-                gpu_util = 0
-                mem_util = 0
-            
-            return GPUMetrics(
-                name=gpu_name,
-                vram_total_mb=int(mem_info.total) // (1024**2),
-                vram_used_mb=int(mem_info.used) // (1024**2),
-                vram_free_mb=int(mem_info.free) // (1024**2),
-                usage_percent=(int(mem_info.used) / int(mem_info.total)) * 100,
-                temperature_c=temperature,
-                power_usage_w=power_usage,
-                clock_graphics_mhz=clock_info,
-                clock_memory_mhz=memory_clock,
-                utilization_gpu=int(gpu_util),
-                utilization_memory=int(mem_util),
-                timestamp=datetime.now()
-            )
-            
-        except Exception as e:
-            logger.error(f"Erreur récupération métriques GPU: {e}")
+        return GPUMetrics(
+            name=gpu.name,
+            vram_total_mb=gpu.vram_total_mb,
+            vram_used_mb=gpu.vram_used_mb,
+            vram_free_mb=gpu.vram_free_mb,
+            usage_percent=gpu.vram_usage_percent,
+            temperature_c=gpu.temperature_c,
+            power_usage_w=gpu.power_usage_w,
+            clock_graphics_mhz=gpu.clock_graphics_mhz,
+            clock_memory_mhz=gpu.clock_memory_mhz,
+            utilization_gpu=gpu.utilization_gpu,
+            utilization_memory=gpu.utilization_memory,
+            timestamp=datetime.fromtimestamp(snapshot.timestamp)
+        )
+    
+    @staticmethod
+    def _system_metrics_from(snapshot: TelemetrySnapshot) -> Optional[SystemMetrics]:
+        if snapshot.cpu_percent is None:
             return None
+        return SystemMetrics(
+            cpu_percent=snapshot.cpu_percent,
+            ram_percent=snapshot.ram_percent,
+            ram_available_gb=snapshot.ram_available_gb,
+            cpu_temp_c=snapshot.cpu_temp_c,
+            timestamp=datetime.fromtimestamp(snapshot.timestamp)
+        )
+    
+    def get_gpu_metrics(self) -> Optional[GPUMetrics]:
+        """Métriques GPU du dernier instantané de télémétrie"""
+        return self._gpu_metrics_from(telemetry.latest())
     
     def get_system_metrics(self) -> Optional[SystemMetrics]:
-        """Récupère les métriques système"""
-        if not PSUTIL_AVAILABLE:
-            return None
-        
-        try:
-            cpu_percent = psutil.cpu_percent(interval=0.1)
-            memory = psutil.virtual_memory()
-            
-            # Température CPU si disponible
-            cpu_temp = None
-            try:
-                sensors_temperatures = getattr(psutil, 'sensors_temperatures', None)
-                if sensors_temperatures:
-                    temps = sensors_temperatures()
-                    if 'coretemp' in temps:
-                        cpu_temp = max(temp.current for temp in temps['coretemp'])
-            except:
-                pass
-            
-            return SystemMetrics(
-                cpu_percent=cpu_percent,
-                ram_percent=memory.percent,
-                ram_available_gb=memory.available / (1024**3),
-                cpu_temp_c=cpu_temp,
-                timestamp=datetime.now()
-            )
-            
-        except Exception as e:
-            logger.error(f"Erreur récupération métriques système: {e}")
-            return None
+        """Métriques système du dernier instantané de télémétrie"""
+        return self._system_metrics_from(telemetry.latest())
+    
+    def _init_history(self, interval: float):
+        """Alloue les historiques circulaires (taille fixe pour 24 h à cet intervalle)"""
+        capacity = int(HISTORY_SECONDS / interval)
+        window = max(1, int(REPORT_WINDOW_SECONDS / interval))
+        self.metrics_history = MetricsRingBuffer(GPU_HISTORY_FIELDS, capacity, window)
+        self.system_metrics_history = MetricsRingBuffer(SYSTEM_HISTORY_FIELDS, capacity, window)
     
     def start_monitoring(self, interval: float = 5.0):
-        """Démarre le monitoring en arrière-plan"""
+        """Démarre le monitoring : historique alimenté par la télémétrie toutes les `interval` secondes"""
         if self.monitoring_active:
             return
         
+        # Multiple de la cadence de la télémétrie (arrondi au supérieur) : sinon le seuil de
+        # sous-échantillonnage tombe entre deux instantanés et l'historique saute un pas sur deux
+        steps = max(1, math.ceil(interval / telemetry.interval - 1e-9))
+        interval = steps * telemetry.interval
+        if self.metrics_history.capacity != int(HISTORY_SECONDS / interval) and not len(self.metrics_history):
+            self._init_history(interval)
+        self.monitoring_interval = interval
+        
         self.monitoring_active = True
-        self.monitoring_thread = threading.Thread(
-            target=self._monitoring_loop, 
-            args=(interval,), 
-            daemon=True
-        )
-        self.monitoring_thread.start()
+        telemetry.subscribe(self._on_snapshot)
         logger.info(f"Monitoring GPU démarré (intervalle: {interval}s)")
     
     def stop_monitoring(self):
         """Arrête le monitoring"""
         self.monitoring_active = False
-        if self.monitoring_thread:
-            self.monitoring_thread.join(timeout=10)
+        telemetry.unsubscribe(self._on_snapshot)
         logger.info("Monitoring GPU arrêté")
     
-    def _monitoring_loop(self, interval: float):
-        """Boucle principale de monitoring"""
-        while self.monitoring_active:
-            try:
-                # Récupérer les métriques
-                gpu_metrics = self.get_gpu_metrics()
-                system_metrics = self.get_system_metrics()
-                
-                # Limiter l'historique (dernières 24h avec échantillon toutes les 5s)
-                max_history = int(24 * 3600 / interval)
-                
-                if gpu_metrics:
-                    self.current_metrics = gpu_metrics
-                    self.metrics_history.append(gpu_metrics)
-                    
-                    if len(self.metrics_history) > max_history:
-                        self.metrics_history = self.metrics_history[-max_history:]
-                
-                if system_metrics:
-                    self.current_system_metrics = system_metrics
-                    self.system_metrics_history.append(system_metrics)
-                    
-                    # Limiter l'historique système
-                    if len(self.system_metrics_history) > max_history:
-                        self.system_metrics_history = self.system_metrics_history[-max_history:]
-                
-                # Optimisation automatique si activée
-                if self.auto_optimization_enabled and gpu_metrics:
-                    self._check_auto_optimization(gpu_metrics, system_metrics)
-                
-                time.sleep(interval)
-                
-            except Exception as e:
-                logger.error(f"Erreur dans la boucle de monitoring: {e}")
-                time.sleep(interval)
+    def _on_snapshot(self, snapshot: TelemetrySnapshot):
+        """Reçoit chaque instantané de télémétrie (thread kira-telemetry)"""
+        try:
+            gpu_metrics = self._gpu_metrics_from(snapshot)
+            system_metrics = self._system_metrics_from(snapshot)
+            if gpu_metrics:
+                self.current_metrics = gpu_metrics
+            if system_metrics:
+                self.current_system_metrics = system_metrics
+            
+            # Historiques sous-échantillonnés à l'intervalle du monitoring (marge pour la gigue du thread)
+            if snapshot.timestamp - self._last_recorded < self.monitoring_interval * 0.9:
+                return
+            self._last_recorded = snapshot.timestamp
+            
+            # Historiques circulaires : taille fixe, le plus ancien échantillon est écrasé
+            if gpu_metrics:
+                self.metrics_history.append(
+                    snapshot.timestamp,
+                    {field: getattr(gpu_metrics, field) for field in GPU_HISTORY_FIELDS}
+                )
+            
+            if system_metrics:
+                self.system_metrics_history.append(
+                    snapshot.timestamp,
+                    {field: getattr(system_metrics, field) for field in SYSTEM_HISTORY_FIELDS}
+                )
+            
+            # Optimisation automatique si activée
+            if self.auto_optimization_enabled and gpu_metrics:
+                self._check_auto_optimization(gpu_metrics, system_metrics)
+        
+        except Exception as e:
+            logger.error(f"Erreur dans le monitoring GPU: {e}")
     
     def _check_auto_optimization(self, gpu_metrics: GPUMetrics, system_metrics: Optional[SystemMetrics]):
         """Vérifie si une optimisation automatique est nécessaire"""
@@ -556,12 +490,14 @@ class GPUOptimizer:
         metrics = self.current_metrics
         optimal_profile = self.select_optimal_profile()
         
-        # Analyse des performances récentes
-        recent_metrics = self.metrics_history[-60:] if len(self.metrics_history) >= 60 else self.metrics_history
-        
-        avg_temp = sum(m.temperature_c for m in recent_metrics) / len(recent_metrics) if recent_metrics else 0
-        avg_vram_usage = sum(m.usage_percent for m in recent_metrics) / len(recent_metrics) if recent_metrics else 0
-        avg_gpu_util = sum(m.utilization_gpu for m in recent_metrics) / len(recent_metrics) if recent_metrics else 0
+        # Analyse des performances récentes : moyennes glissantes maintenues à chaque échantillon
+        history = self.metrics_history
+        avg_temp = history.rolling_mean("temperature_c") or 0
+        avg_vram_usage = history.rolling_mean("usage_percent") or 0
+        avg_gpu_util = history.rolling_mean("utilization_gpu") or 0
+        temp_stats = history.window_stats("temperature_c")
+        vram_stats = history.window_stats("usage_percent")
+        util_stats = history.window_stats("utilization_gpu")
         
         return {
             "timestamp": datetime.now().isoformat(),
@@ -578,6 +514,11 @@ class GPUOptimizer:
                 "vram_usage": f"{avg_vram_usage:.1f}%",
                 "gpu_utilization": f"{avg_gpu_util:.1f}%"
             },
+            "peaks_last_5min": {
+                "temperature": f"p95 {temp_stats['p95'] or 0:.1f}°C, max {temp_stats['max'] or 0:.0f}°C",
+                "vram_usage": f"p95 {vram_stats['p95'] or 0:.1f}%, max {vram_stats['max'] or 0:.1f}%",
+                "gpu_utilization": f"min {util_stats['min'] or 0:.0f}%, p95 {util_stats['p95'] or 0:.1f}%"
+            },
             "optimal_profile": {
                 "name": optimal_profile,
                 "description": self.performance_profiles[optimal_profile].description,
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Historique de métriques à taille fixe pour le monitoring
+Colonnes array('d') préallouées (mémoire bornée) et statistiques de fenêtre vectorisées avec NumPy
+"""
+
+import math
+from array import array
+from typing import Dict, List, Mapping, Optional, Sequence
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+class MetricsRingBuffer:
+    """Tampon circulaire de métriques numériques : une colonne par champ plus l'horodatage
+
+    append() est en O(1) et ne copie rien ; la moyenne glissante sur les `window` derniers
+    échantillons est maintenue incrémentalement. Les valeurs absentes (None) sont stockées
+    en NaN et ignorées par les statistiques.
+    """
+
+    def __init__(self, fields: Sequence[str], capacity: int, window: int = 60):
+        self.fields = tuple(fields)
+        self.capacity = max(1, int(capacity))
+        self.window = max(1, min(int(window), self.capacity))
+        # Allocation unique : 8 octets par valeur, jamais redimensionnée
+        self._columns = {field: array('d', bytes(8 * self.capacity)) for field in self.fields}
+        self._timestamps = array('d', bytes(8 * self.capacity))
+        self._head = 0
+        self._count = 0
+        self._sums = dict.fromkeys(self.fields, 0.0)
+        self._valid = dict.fromkeys(self.fields, 0)
+        if NUMPY_AVAILABLE:
+            # Vues sans copie sur les mêmes tampons
+            self._views = {field: np.frombuffer(column, dtype=np.float64) for field, column in self._columns.items()}
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    def append(self, timestamp: float, values: Mapping[str, Optional[float]]):
+        """Ajoute un échantillon (écrase le plus ancien une fois la capacité atteinte)"""
+        slot = self._head
+        leaving = (slot - self.window) % self.capacity if self._count >= self.window else None
+        for field in self.fields:
+            column = self._columns[field]
+            if leaving is not None:
+                old = column[leaving]
+                if not math.isnan(old):
+                    self._sums[field] -= old
+                    self._valid[field] -= 1
+            value = values.get(field)
+            value = math.nan if value is None else float(value)
+            column[slot] = value
+            if not math.isnan(value):
+                self._sums[field] += value
+                self._valid[field] += 1
+        self._timestamps[slot] = timestamp
+        self._head = (slot + 1) % self.capacity
+        self._count += 1
+        if self._head == 0:
+            # Un tour complet : recalcul exact pour éviter la dérive des sommes flottantes
+            self._resync()
+
+    def _resync(self):
+        for field in self.fields:
+            values = [v for v in self._series(self._columns[field], self.window) if not math.isnan(v)]
+            self._sums[field] = math.fsum(values)
+            self._valid[field] = len(values)
+
+    def _series(self, column, n: int):
+        """Les n dernières valeurs d'une colonne, dans l'ordre chronologique"""
+        n = min(n, len(self))
+        if n <= 0:
+            return column[0:0]
+        start = self._head - n
+        if start >= 0:
+            return column[start:self._head]
+        return column[start % self.capacity:] + column[:self._head]
+
+    def rolling_mean(self, field: str) -> Optional[float]:
+        """Moyenne des `window` derniers échantillons, en O(1) (None sans valeur)"""
+        valid = self._valid[field]
+        return self._sums[field] / valid if valid else None
+
+    def latest(self, field: str) -> Optional[float]:
+        if not self._count:
+            return None
+        value = self._columns[field][self._head - 1]
+        return None if math.isnan(value) else value
+
+    def series(self, field: str, n: Optional[int] = None) -> List[float]:
+        """Copie des n dernières valeurs (toutes par défaut), pour les graphiques"""
+        return list(self._series(self._columns[field], len(self) if n is None else n))
+
+    def timestamps(self, n: Optional[int] = None) -> List[float]:
+        return list(self._series(self._timestamps, len(self) if n is None else n))
+
+    def window_stats(self, field: str, n: Optional[int] = None) -> Dict[str, Optional[float]]:
+        """Moyenne, minimum, maximum et 95e centile des n derniers échantillons (fenêtre par défaut)"""
+        n = self.window if n is None else n
+        if NUMPY_AVAILABLE:
+            view = self._views[field]
+            n = min(n, len(self))
+            start = self._head - n
+            values = view[start:self._head] if start >= 0 else np.concatenate((view[start:], view[:self._head]))
+            values = values[~np.isnan(values)]
+            if not values.size:
+                return dict.fromkeys(("mean", "min", "max", "p95"))
+            return {
+                "mean": float(values.mean()),
+                "min": float(values.min()),
+                "max": float(values.max()),
+                "p95": float(np.percentile(values, 95)),
+            }
+
+        values = sorted(v for v in self._series(self._columns[field], n) if not math.isnan(v))
+        if not values:
+            return dict.fromkeys(("mean", "min", "max", "p95"))
+        # Interpolation linéaire, comme numpy.percentile
+        rank = 0.95 * (len(values) - 1)
+        low = int(rank)
+        high = min(low + 1, len(values) - 1)
+        return {
+            "mean": math.fsum(values) / len(values),
+            "min": values[0],
+            "max": values[-1],
+            "p95": values[low] + (values[high] - values[low]) * (rank - low),
+        }
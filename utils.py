@@ -1,37 +1,86 @@
+import hashlib
+import threading
+from collections import OrderedDict
 from config import logger
 
-try:
-    from transformers import GPT2TokenizerFast
-    tokenizer = GPT2TokenizerFast.from_pretrained("gpt2")
-    logger.info("Tokenizer GPT-2 initialisé avec succès")
-except Exception as e:
-    tokenizer = None
-    logger.warning(f"Tokenizer non disponible : {e}")
+# Tokenizer du modèle chargé (enregistré par ModelManager), None tant que le modèle n'est pas prêt.
+# Le comptage se fait hors du thread d'inférence, sans _llm_lock : llama_tokenize ne lit que le
+# vocabulaire (figé après le chargement) et ne touche ni au contexte ni au cache KV. La référence
+# locale prise à chaque appel garde l'instance en vie si une bascule de profil la remplace entre-temps.
+_tokenizer_llm = None
+_bos_tokens = 1
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+TOKEN_CACHE_SIZE = 8192
+
+def set_tokenizer(llm):
+    """Utilise le tokenizer du modèle llama.cpp chargé pour le comptage des tokens"""
+    global _tokenizer_llm, _bos_tokens
+    _tokenizer_llm = llm
+    with _token_cache_lock:
+        _token_cache.clear()
+    _bos_tokens = 1
+    if llm is not None:
+        try:
+            # Le prompt complet est tokenisé avec BOS si le modèle en ajoute un
+            _bos_tokens = len(llm.tokenize(b"", add_bos=True, special=True))
+        except Exception as e:
+            logger.debug(f"Token BOS du modèle indéterminé: {e}")
+        logger.info("Comptage des tokens via le tokenizer du modèle")
+
+def bos_tokens() -> int:
+    """Tokens ajoutés en tête du prompt complet (BOS), à compter une seule fois par prompt"""
+    return _bos_tokens
+
+def _tokenize(text: str) -> list:
+    return _tokenizer_llm.tokenize(text.encode("utf-8"), add_bos=False, special=True)
 
 def count_tokens(text: str) -> int:
-    if tokenizer:
-        return len(tokenizer.encode(text))
-    else:
+    """Tokens du texte seul, sans BOS (voir bos_tokens pour un prompt complet)"""
+    llm = _tokenizer_llm
+    if llm is None:
         # fallback approximatif
         return max(1, len(text) // 3)
 
+    key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+    with _token_cache_lock:
+        cached = _token_cache.get(key)
+        if cached is not None:
+            _token_cache.move_to_end(key)
+            return cached
+
+    try:
+        count = len(_tokenize(text))
+    except Exception as e:
+        logger.debug(f"Tokenizer du modèle indisponible: {e}")
+        return max(1, len(text) // 3)
+
+    with _token_cache_lock:
+        _token_cache[key] = count
+        if len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return count
+
 def truncate_text_to_tokens(text: str, max_tokens: int) -> str:
     """
-    Tronque text à max_tokens tokens en utilisant tokenizer si disponible,
+    Tronque text à max_tokens tokens en utilisant le tokenizer du modèle si disponible,
     sinon tronque en caractères (approx).
     """
-    if tokenizer:
-        tokens = tokenizer.encode(text)
-        if len(tokens) <= max_tokens:
-            return text
-        truncated = tokenizer.decode(tokens[:max_tokens], clean_up_tokenization_spaces=True, skip_special_tokens=True)
-        return truncated
-    else:
-        # fallback approximatif : coupe aux max_tokens*3 caractères
-        approx_chars = max_tokens * 3
-        if len(text) <= approx_chars:
-            return text
-        return text[:approx_chars].rsplit(" ", 1)[0]
+    llm = _tokenizer_llm
+    if llm is not None:
+        try:
+            tokens = _tokenize(text)
+            if len(tokens) <= max_tokens:
+                return text
+            return llm.detokenize(tokens[:max_tokens]).decode("utf-8", errors="ignore")
+        except Exception as e:
+            logger.debug(f"Tokenizer du modèle indisponible: {e}")
+
+    # fallback approximatif : coupe aux max_tokens*3 caractères
+    approx_chars = max_tokens * 3
+    if len(text) <= approx_chars:
+        return text
+    return text[:approx_chars].rsplit(" ", 1)[0]
 
 def shorten_response(text: str, max_length: int | None = None) -> str:
     """
@@ -40,7 +89,7 @@ def shorten_response(text: str, max_length: int | None = None) -> str:
     """
     from config import config
     import json
-    
+
     if max_length is None:
         try:
             with open(config.LIMITS_FILE, "r", encoding="utf-8") as f:
@@ -60,4 +109,4 @@ def shorten_response(text: str, max_length: int | None = None) -> str:
 
     truncated = text[:cut_point].rstrip()
     logger.debug(f"Réponse tronquée de {len(text)} à {len(truncated)} caractères")
-    return truncated
\ No newline at end of file
+    return truncated